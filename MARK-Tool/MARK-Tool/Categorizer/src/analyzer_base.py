@@ -1,13 +1,72 @@
+import contextlib
 import os
 import re
+import shutil
 import time
 import pandas as pd
 from abc import ABC, abstractmethod
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from components.static_analysis.keyword_matcher import build_keyword_pattern
+from components.static_analysis.library_dictionary import get_library_dictionary
+from components.results_writer import StreamingResultsWriter
+from components.static_analysis.source_file import SourceFile
+from components.file_manifest import get_file_manifest
+from components.path_filter import PathFilter
+from components.analysis_metrics import AnalysisMetrics
+from components.profiler import profile_label
+
+# Analyzer del processo worker, inizializzato una sola volta per worker (vedi map_projects)
+_worker_analyzer = None
+
+# Task inviati al pool per worker in anticipo sul prossimo risultato da restituire (vedi map_projects)
+PARALLEL_WINDOW = 2
+
+
+def _init_worker(analyzer):
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+
+def _run_in_worker(method_name, args):
+    # Le metriche del task tornano al processo principale insieme al risultato
+    _worker_analyzer.metrics = AnalysisMetrics()
+    result = getattr(_worker_analyzer, method_name)(*args)
+    return result, _worker_analyzer.metrics
+
+
+# Intestazione degli script scritti da jupyter nbconvert / NotebookConverter
+CONVERTED_NOTEBOOK_HEADER = b"#!/usr/bin/env python\n# coding: utf-8\n"
+
 
 class MLAnalyzerBase(ABC):
-    def __init__(self, output_folder, analysis_type):
+    # Versione della logica di analisi dei file: va incrementata quando cambia il risultato
+    # dell'analisi di un file, cosi' le voci della AnalysisCache precedenti non vengono riusate
+    analysis_version = 4
+
+    def __init__(self, output_folder, analysis_type, cache=None, mmap_threshold=None, path_filter=None,
+                 projects=None):
         self.output_folder = output_folder
         self.analysis_type = analysis_type
+        # AnalysisCache opzionale condivisa tra esecuzioni (vedi cached_file_analysis)
+        self.cache = cache
+        # File di almeno mmap_threshold byte sono analizzati tramite mmap (vedi SourceFile)
+        self.mmap_threshold = mmap_threshold
+        # Regole di esclusione applicate durante l'attraversamento dei progetti
+        self.path_filter = path_filter or PathFilter()
+        # Contatori e tempi per fase dell'analisi (vedi AnalysisMetrics)
+        self.metrics = AnalysisMetrics()
+        # Progetti "owner/repo" da analizzare; None analizza tutti quelli della cartella di input
+        self.projects = frozenset(projects) if projects is not None else None
+        # Writer dei risultati tenuto aperto tra piu' analisi (vedi hold_results_writer)
+        self.results_writer = None
+
+    def __getstate__(self):
+        # I worker restituiscono solo le righe: il writer dei risultati resta nel processo principale
+        state = self.__dict__.copy()
+        state["results_writer"] = None
+        return state
 
     def init_analysis_folder(self):
         analysis_path = os.path.join(self.output_folder, f"{self.analysis_type}_Analysis")
@@ -21,6 +80,8 @@ class MLAnalyzerBase(ABC):
             results_filename = 'results_consumer.csv'
 
         self.results_file = os.path.join(self.output_folder, results_filename)
+        # Indice dei progetti completati, usato per riprendere l'analisi senza rileggere i risultati
+        self.results_index_file = os.path.join(analysis_path, results_filename.replace('.csv', '.index.jsonl'))
 
         if not os.path.exists(self.results_file):
             df = pd.DataFrame(columns=[
@@ -31,25 +92,181 @@ class MLAnalyzerBase(ABC):
                 "line_number"
             ])
             df.to_csv(self.results_file, index=False)
-        else:
-            df = pd.read_csv(self.results_file)
+        elif self.projects is None:
+            # Un'analisi ristretta ad alcuni progetti (es. la pipeline clone -> analisi) estende solo i risultati
             backup_file = os.path.join(self.output_folder, f'results_backup_{int(time.time())}.csv')
             if not os.path.exists(backup_file):
-                df.to_csv(backup_file, index=False)
+                shutil.copyfile(self.results_file, backup_file)
 
     @staticmethod
     def build_regex_pattern(keyword: str):
-        keyword = re.escape(keyword)
-        keyword = keyword.replace(r"\ ", r"\\s*")
-        return re.compile(keyword, re.IGNORECASE)
+        return re.compile(build_keyword_pattern(keyword), re.IGNORECASE)
 
     @staticmethod
-    def baseline_check(project: str, dir: str, df: pd.DataFrame):
-        return f"{project}/{dir}" in df['ProjectName'].values
+    def baseline_check(project: str, dir: str, completed):
+        # completed: insieme dei progetti gia' analizzati (o DataFrame dei risultati)
+        if isinstance(completed, pd.DataFrame):
+            completed = completed['ProjectName'].values
+        return f"{project}/{dir}" in completed
+
+    def in_scope(self, project: str, dir: str = None):
+        """Whether project/dir (or any repository of the project, without dir) is to be analyzed."""
+        if self.projects is None:
+            return True
+        if dir is None:
+            return any(name.split("/", 1)[0] == project for name in self.projects)
+        return f"{project}/{dir}" in self.projects
+
+    @contextlib.contextmanager
+    def open_results_writer(self):
+        """Yield the append-only writer of the results file: the one held open, or a new one closed on exit."""
+        if self.results_writer is not None:
+            yield self.results_writer
+            return
+        with StreamingResultsWriter(self.results_file, self.results_index_file) as writer:
+            yield writer
+
+    @contextlib.contextmanager
+    def hold_results_writer(self):
+        """
+        Keep one results writer open across several analyze_projects_set_* calls,
+        so the index of the results is read once (see ExecAnalyzer.run_batches).
+        """
+        with StreamingResultsWriter(self.results_file, self.results_index_file) as writer:
+            self.results_writer = writer
+            try:
+                yield writer
+            finally:
+                self.results_writer = None
 
     @staticmethod
     def load_library_dict(input_file: str):
-        return pd.read_csv(input_file, delimiter=",")
+        # Il dizionario viene letto una sola volta per processo (vedi LibraryDictionaryRegistry)
+        return get_library_dictionary(input_file).frame
+
+    @staticmethod
+    def get_keyword_matcher(library_dict_path: str, flexible_whitespace: bool = True):
+        """Return the KeywordMatcher of a dictionary, built once and reused for every file."""
+        return get_library_dictionary(library_dict_path).matcher(flexible_whitespace)
+
+    def cached_file_analysis(self, source, key_parts, analyze):
+        """
+        Return analyze() for a SourceFile, reusing the result cached for its content.
+
+        analyze must return (libraries, keywords, load_keywords); the cache key
+        is the content hash of the file plus its kind (the same bytes are
+        parsed differently as a .py, a notebook or a mapped file), the
+        analysis type and version and the given key_parts (dictionary
+        versions, rules flags).
+        """
+        if self.cache is None:
+            return analyze()
+
+        key = self.cache.make_key(source.content_hash, source.kind, self.analysis_type, self.analysis_version,
+                                  *key_parts)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.metrics.count("files_cached")
+            libraries, keywords = cached
+            # Lo stesso contenuto puo' trovarsi in percorsi diversi
+            return libraries, [dict(keyword, file=source.path) for keyword in keywords], []
+
+        libraries, keywords, load_keywords = analyze()
+        self.cache.put(key, libraries,
+                       [{k: v for k, v in keyword.items() if k != 'file'} for keyword in keywords])
+        return libraries, keywords, load_keywords
+
+    def load_source(self, file):
+        """Read a file once for the whole analysis pass; None if it cannot be read."""
+        try:
+            with self.metrics.stage("read"):
+                source = SourceFile.load(file, self.mmap_threshold)
+            self.metrics.count("bytes_read", len(source.data))
+            return source
+        except FileNotFoundError:
+            print(f"Error finding file {file}")
+        except OSError as e:
+            print(f"Error reading file {file}: {e}")
+        return None
+
+    def discover_files(self, repo_contents):
+        """
+        Return the FileManifest of a project: one traversal, shared by progress
+        reporting and analysis, reused across passes and runs while valid.
+        """
+        with self.metrics.stage("discovery"):
+            manifest = get_file_manifest(repo_contents, self.cache, self.path_filter)
+        self.metrics.count("files_discovered", len(manifest))
+        return manifest
+
+    def passes_prefilter(self, source, dictionary):
+        """Byte-level import prefilter (see ImportPrefilter): False if the file cannot use the dictionary."""
+        if dictionary.prefilter.matches(source.data):
+            self.metrics.count("files_analyzed")
+            return True
+        self.metrics.count("files_prefiltered")
+        return False
+
+    def extract_imports(self, source):
+        with self.metrics.stage("import_extraction"):
+            return source.imports
+
+    def scan_keywords(self, matcher, source, libraries):
+        """Keyword hits of a SourceFile, timed and counted in the analysis metrics."""
+        with self.metrics.stage("matching"):
+            # Le righe sono contate durante la scansione (vedi KeywordMatcher.scan)
+            return matcher.scan(source.buffer, libraries, metrics=self.metrics)
+
+    @staticmethod
+    def is_converted_notebook(root, file, names):
+        """
+        True for a .py generated from the notebook next to it: the notebook is
+        analyzed directly (see SourceFile.notebook), so the script is skipped.
+        """
+        if not file.endswith('.py') or file[:-3] + '.ipynb' not in names:
+            return False
+        try:
+            with open(os.path.join(root, file), 'rb') as f:
+                return f.read(len(CONVERTED_NOTEBOOK_HEADER)) == CONVERTED_NOTEBOOK_HEADER
+        except OSError:
+            return False
+
+    def commit_cache(self):
+        if self.cache is not None:
+            self.cache.commit()
+
+    def map_projects(self, method_name: str, tasks, workers: int = 1):
+        """
+        Yield (task, method_name(*task)) for every task, in task order.
+
+        With more than one worker the tasks are fanned out to a process pool;
+        the analyzer is sent once to each worker process and the results are
+        still yielded in submission order, so the merged output is the same
+        as in a sequential run. At most PARALLEL_WINDOW tasks per worker are
+        submitted ahead of the next result to yield, so the tasks are consumed
+        lazily and the pending futures and results stay bounded.
+        """
+        if workers is None or workers <= 1:
+            method = getattr(self, method_name)
+            for task in tasks:
+                # I campioni di AnalysisProfiler sono raggruppati per progetto (task: repo, project, dir, ...)
+                with profile_label(f"{self.analysis_type}:{task[1]}/{task[2]}"):
+                    result = method(*task)
+                yield task, result
+            return
+
+        tasks = iter(tasks)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+            pending = deque((task, executor.submit(_run_in_worker, method_name, task))
+                            for task in islice(tasks, PARALLEL_WINDOW * workers))
+            while pending:
+                task, future = pending.popleft()
+                # Un nuovo task per ogni risultato consumato: la finestra resta di PARALLEL_WINDOW * workers
+                for next_task in islice(tasks, 1):
+                    pending.append((next_task, executor.submit(_run_in_worker, method_name, next_task)))
+                result, metrics = future.result()
+                self.metrics.merge(metrics)
+                yield task, result
 
     @abstractmethod
     def check_training_method(self, file: str, library_dict_path: str):
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+
+def hash_content(data):
+    """Content hash of the bytes of a file, used as the cache key of its analysis."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Persistent per-file analysis cache stored in SQLite.
+
+    Entries are keyed by the content hash of the file plus everything the
+    result depends on (analysis type and version, dictionary versions, rules
+    flags), so an unchanged file is never scanned twice, whatever its path.
+    The connection is opened lazily: the cache can be shipped to worker
+    processes, each of which opens its own connection on the same database.
+    The file manifests of the projects (see FileManifestRegistry) are stored
+    in the same database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS file_results (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS manifests (root TEXT PRIMARY KEY, manifest TEXT NOT NULL)")
+            self._connection.commit()
+        return self._connection
+
+    @staticmethod
+    def make_key(content_hash, *parts):
+        return "|".join([content_hash] + [str(part) for part in parts])
+
+    def get(self, key):
+        """Return the cached (libraries, keywords) of a key, or None."""
+        with self._lock:
+            row = self._connect().execute("SELECT result FROM file_results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result = json.loads(row[0])
+        return result["libraries"], result["keywords"]
+
+    def put(self, key, libraries, keywords):
+        result = json.dumps({"libraries": list(libraries), "keywords": keywords})
+        with self._lock:
+            self._connect().execute("INSERT OR REPLACE INTO file_results (key, result) VALUES (?, ?)",
+                                    (key, result))
+
+    def get_manifest(self, root):
+        with self._lock:
+            row = self._connect().execute("SELECT manifest FROM manifests WHERE root = ?", (root,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put_manifest(self, root, manifest):
+        with self._lock:
+            self._connect().execute("INSERT OR REPLACE INTO manifests (root, manifest) VALUES (?, ?)",
+                                    (root, json.dumps(manifest)))
+
+    def commit(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.commit()
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,139 @@
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Contatori di un passo di analisi, nell'ordine in cui vengono emessi
+COUNTERS = {
+    "files_discovered": "Source files found while walking the projects.",
+    "files_prefiltered": "Files dropped by the import prefilter before being decoded.",
+    "files_cached": "Files whose result was reused from the analysis cache.",
+    "files_analyzed": "Files that passed the prefilter (analyzed or served from the cache).",
+    "bytes_read": "Bytes of the source files loaded.",
+    "lines_scanned": "Lines scanned by the keyword matcher.",
+    "regex_evaluations": "Regex searches run by the keyword matcher.",
+    "hits": "Keyword hits reported.",
+}
+
+# Fasi temporizzate: lettura, estrazione degli import (inclusa la decodifica), matching dei keyword, scrittura
+STAGES = ("discovery", "read", "import_extraction", "matching", "output_writing")
+
+
+class AnalysisMetrics:
+    """
+    Counters and per-stage timings of an analysis pass.
+
+    Plain data, so an analyzer running in a worker process can return its
+    metrics with the results of a project and the parent can merge them
+    (see MLAnalyzerBase.map_projects).
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.stage_seconds = Counter()
+        # (progetto, secondi, file del progetto)
+        self.projects = []
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += time.perf_counter() - start
+
+    def record_project(self, project, seconds, files):
+        self.projects.append((project, seconds, files))
+
+    def merge(self, other):
+        self.counters.update(other.counters)
+        self.stage_seconds.update(other.stage_seconds)
+        self.projects.extend(other.projects)
+
+    def summary(self):
+        """Counters and stage times as a plain dict (every counter and stage is present)."""
+        return {
+            "counters": {name: self.counters[name] for name in COUNTERS},
+            "stage_seconds": {stage: round(self.stage_seconds[stage], 6) for stage in STAGES},
+            "projects": len(self.projects),
+            "project_seconds": round(sum(seconds for _, seconds, _ in self.projects), 6),
+        }
+
+
+def format_json_lines(metrics_by_analysis, run_seconds=None, timestamp=None):
+    """One JSON line per analyzed project, then one summary line per analysis type."""
+    timestamp = time.time() if timestamp is None else timestamp
+    lines = []
+    for analysis, metrics in metrics_by_analysis.items():
+        for project, seconds, files in metrics.projects:
+            lines.append(json.dumps({"type": "project", "timestamp": timestamp, "analysis": analysis,
+                                     "project": project, "seconds": round(seconds, 6), "files": files}))
+    for analysis, metrics in metrics_by_analysis.items():
+        record = {"type": "summary", "timestamp": timestamp, "analysis": analysis}
+        record.update(metrics.summary())
+        if run_seconds is not None:
+            record["run_seconds"] = round(run_seconds, 6)
+        lines.append(json.dumps(record))
+    return "".join(line + "\n" for line in lines)
+
+
+def format_prometheus(metrics_by_analysis, run_seconds=None):
+    """Prometheus text exposition format (e.g. for the node_exporter textfile collector)."""
+    lines = []
+    for name, description in COUNTERS.items():
+        lines.append(f"# HELP mark_{name}_total {description}")
+        lines.append(f"# TYPE mark_{name}_total counter")
+        for analysis, metrics in metrics_by_analysis.items():
+            lines.append(f'mark_{name}_total{{analysis="{analysis}"}} {metrics.counters[name]}')
+
+    lines.append("# HELP mark_stage_seconds_total Time spent in each stage of the analysis.")
+    lines.append("# TYPE mark_stage_seconds_total counter")
+    for analysis, metrics in metrics_by_analysis.items():
+        for stage in STAGES:
+            lines.append(f'mark_stage_seconds_total{{analysis="{analysis}",stage="{stage}"}} '
+                         f'{metrics.stage_seconds[stage]:.6f}')
+
+    # I tempi dei singoli progetti restano nel formato JSON lines: qui solo conteggio, somma e massimo
+    lines.append("# HELP mark_project_seconds Time spent analyzing each project.")
+    lines.append("# TYPE mark_project_seconds summary")
+    for analysis, metrics in metrics_by_analysis.items():
+        seconds = [project_seconds for _, project_seconds, _ in metrics.projects]
+        lines.append(f'mark_project_seconds_sum{{analysis="{analysis}"}} {sum(seconds):.6f}')
+        lines.append(f'mark_project_seconds_count{{analysis="{analysis}"}} {len(seconds)}')
+    lines.append("# HELP mark_project_seconds_max Slowest project of the run.")
+    lines.append("# TYPE mark_project_seconds_max gauge")
+    for analysis, metrics in metrics_by_analysis.items():
+        slowest = max((project_seconds for _, project_seconds, _ in metrics.projects), default=0.0)
+        lines.append(f'mark_project_seconds_max{{analysis="{analysis}"}} {slowest:.6f}')
+
+    if run_seconds is not None:
+        lines.append("# HELP mark_run_seconds Wall time of the whole run.")
+        lines.append("# TYPE mark_run_seconds gauge")
+        lines.append(f"mark_run_seconds {run_seconds:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path, metrics_by_analysis, metrics_format="jsonl", run_seconds=None):
+    """
+    Emit the metrics of a run.
+
+    JSON lines are appended, so successive runs can be compared; the
+    Prometheus text file is replaced atomically, as scrapers expect.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if metrics_format == "prometheus":
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(format_prometheus(metrics_by_analysis, run_seconds))
+        os.replace(tmp_file, path)
+    elif metrics_format == "jsonl":
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(format_json_lines(metrics_by_analysis, run_seconds))
+    else:
+        raise ValueError(f"Unknown metrics format: {metrics_format}")
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from components.path_filter import PathFilter
+
+SOURCE_EXTENSIONS = ('.py', '.ipynb')
+
+# Granularita' massima degli mtime (FAT: 2 s; NFS e SMB possono arrotondare al secondo)
+MTIME_GRANULARITY_NS = 2 * 10 ** 9
+
+
+class FileManifest:
+    """
+    The source files of a project, found with a single os.scandir traversal.
+
+    Files are listed in os.walk order (top-down, directory listing order),
+    without the entries pruned by the PathFilter. The modification time of
+    every visited directory (and of the honored .gitignore files) is
+    recorded: adding, removing or renaming an entry changes the mtime of its
+    directory, so a manifest can be revalidated with one stat per directory
+    instead of a new listing.
+
+    On filesystems with coarse mtimes an entry added in the same tick as the
+    scan leaves the mtime of its directory unchanged, so (as git does for
+    racily clean files) a manifest with a directory modified less than
+    MTIME_GRANULARITY_NS before the scan started is never considered valid.
+    """
+
+    def __init__(self, root, files, dir_mtimes, scanned_at=0):
+        self.root = root
+        # directory relativa -> nomi dei file sorgente, in ordine di visita
+        self.files = files
+        self.dir_mtimes = dir_mtimes
+        # Inizio dell'attraversamento (ns), confrontato con gli mtime registrati
+        self.scanned_at = scanned_at
+
+    @classmethod
+    def scan(cls, root, path_filter=None):
+        path_filter = path_filter or PathFilter()
+        scanned_at = time.time_ns()
+        files = {}
+        dir_mtimes = {}
+        for rel_dir, path, names in path_filter.walk(root):
+            try:
+                dir_mtimes[rel_dir] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if path_filter.use_gitignore and ".gitignore" in names:
+                # Una .gitignore modificata non cambia l'mtime della directory
+                gitignore = os.path.join(rel_dir, ".gitignore")
+                dir_mtimes[gitignore] = os.stat(os.path.join(path, ".gitignore")).st_mtime_ns
+            sources = [name for name in names if name.endswith(SOURCE_EXTENSIONS)]
+            if sources:
+                files[rel_dir] = sources
+        return cls(root, files, dir_mtimes, scanned_at)
+
+    def is_valid(self):
+        """True if no directory of the project changed since the manifest was built."""
+        for rel_dir, mtime in self.dir_mtimes.items():
+            if mtime >= self.scanned_at - MTIME_GRANULARITY_NS:
+                return False  # modificata nello stesso intervallo della scansione: l'mtime non basta
+            path = self.root if rel_dir == "." else os.path.join(self.root, rel_dir)
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def __len__(self):
+        return sum(len(names) for names in self.files.values())
+
+    def __iter__(self):
+        """Yield (directory, file name, set of the source file names of the directory)."""
+        for rel_dir, names in self.files.items():
+            path = self.root if rel_dir == "." else os.path.join(self.root, rel_dir)
+            name_set = set(names)
+            for name in names:
+                yield path, name, name_set
+
+    def to_dict(self):
+        return {"files": self.files, "dirs": self.dir_mtimes, "scanned_at": self.scanned_at}
+
+    @classmethod
+    def from_dict(cls, root, data):
+        # I manifest salvati senza scanned_at non sono mai validi e vengono ricostruiti
+        return cls(root, data["files"], data["dirs"], data.get("scanned_at", 0))
+
+
+class FileManifestRegistry:
+    """
+    Per-project cache of the file manifests.
+
+    Manifests are kept in memory for the process (the producer and consumer
+    passes of a run share them) and, when an AnalysisCache is given, stored
+    in it so that resumed runs and re-runs skip the traversal too. A cached
+    manifest is used only while it is still valid.
+    """
+
+    def __init__(self):
+        self._manifests = {}
+        self._lock = threading.Lock()
+
+    def get(self, root, store=None, path_filter=None):
+        path_filter = path_filter or PathFilter()
+        # Lo stesso progetto ha un manifest diverso per ogni configurazione del filtro
+        key = os.path.abspath(root) + "\n" + path_filter.key
+        with self._lock:
+            manifest = self._manifests.get(key)
+        if manifest is not None and manifest.is_valid():
+            if manifest.root != root:
+                manifest = FileManifest(root, manifest.files, manifest.dir_mtimes, manifest.scanned_at)
+            return manifest
+
+        manifest = None
+        if store is not None:
+            data = store.get_manifest(key)
+            if data is not None:
+                manifest = FileManifest.from_dict(root, data)
+                if not manifest.is_valid():
+                    manifest = None
+        if manifest is None:
+            manifest = FileManifest.scan(root, path_filter)
+            if store is not None:
+                store.put_manifest(key, manifest.to_dict())
+        with self._lock:
+            self._manifests[key] = manifest
+        return manifest
+
+    def clear(self):
+        with self._lock:
+            self._manifests.clear()
+
+
+manifests = FileManifestRegistry()
+
+
+def get_file_manifest(root, store=None, path_filter=None):
+    """Return the (cached) FileManifest of a project directory."""
+    return manifests.get(root, store, path_filter)
@@ -1,29 +1,93 @@
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from components.notebook_reader import load_notebook, notebook_to_script
+from components.path_filter import PathFilter
+
+
+def script_path(file):
+    """Path of the .py script converted from a notebook (only the extension of the file name changes)."""
+    return os.path.splitext(file)[0] + '.py'
+
+
+def convert_notebook(file):
+    """Write the .py script of a notebook next to it and return its path."""
+    # Estrazione in-process delle celle (nessun avvio di jupyter nbconvert per notebook)
+    with open(file, "r", encoding="utf-8") as f:
+        script = notebook_to_script(load_notebook(f.read()))
+    output_file = script_path(file)
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(script.text)
+    return output_file
+
+
+def _convert_notebook_safe(file):
+    # Eseguito nei worker: l'errore viene restituito invece di interrompere il pool
+    try:
+        return file, convert_notebook(file), None
+    except Exception as e:
+        return file, None, e
+
 
 class NotebookConverter:
-    def __init__(self, folder_path="../../../repos/repos2/"):
+    def __init__(self, folder_path="../../../repos/repos2/", workers=1, path_filter=None):
         self.folder_path = folder_path
+        self.workers = max(1, workers or 1)
+        # Stesse regole di esclusione dell'analisi (virtualenv, .git, dipendenze, ...)
+        self.path_filter = path_filter or PathFilter()
+        self.skipped_files = []
 
     def convert_notebook_to_code(self, file):
-        os.system(f"jupyter nbconvert --to script {file}")
-        return file.replace('.ipynb', '.py')
+        return convert_notebook(file)
+
+    @staticmethod
+    def is_fresh(file):
+        """True if the converted .py of a notebook exists and is newer than the notebook."""
+        output_file = script_path(file)
+        try:
+            return os.stat(output_file).st_mtime_ns >= os.stat(file).st_mtime_ns
+        except OSError:
+            return False
+
+    def find_notebooks(self):
+        notebooks = []
+        for _, root, files in self.path_filter.walk(self.folder_path):
+            for file in files:
+                if file.endswith('.ipynb'):
+                    notebooks.append(os.path.join(root, file))
+        return notebooks
 
     def convert_all_notebooks(self):
         converted_files = []
         print(f"[NotebookConverter] Scanning for .ipynb files in: {self.folder_path}")
-        file_count = 0
-        for root, _, files in os.walk(self.folder_path):
-            for file in files:
-                if file.endswith('.ipynb'):
-                    file_count += 1
-                    print(f"[NotebookConverter] Found notebook #{file_count}: {os.path.join(root, file)}")
-                    full_path = os.path.join(root, file)
-                    try:
-                        converted_file = self.convert_notebook_to_code(full_path)
-                        converted_files.append(converted_file)
-                        print(f"Converted: {full_path} -> {converted_file}")
-                    except Exception as e:
-                        print(f"Error converting {full_path}: {e}")
+        notebooks = self.find_notebooks()
+        self.skipped_files = [file for file in notebooks if self.is_fresh(file)]
+        skipped = set(self.skipped_files)
+        pending = [file for file in notebooks if file not in skipped]
+        print(f"[NotebookConverter] Found {len(notebooks)} notebooks, {len(self.skipped_files)} already up to date, "
+              f"converting {len(pending)} with {self.workers} worker(s)")
+
+        start = time.time()
+        if self.workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                chunksize = max(1, len(pending) // (self.workers * 4))
+                results = list(executor.map(_convert_notebook_safe, pending, chunksize=chunksize))
+        else:
+            results = map(_convert_notebook_safe, pending)
+
+        errors = 0
+        for full_path, converted_file, error in results:
+            if error is not None:
+                errors += 1
+                print(f"Error converting {full_path}: {error}")
+                continue
+            converted_files.append(converted_file)
+            print(f"Converted: {full_path} -> {converted_file}")
+
+        elapsed = time.time() - start
+        rate = len(pending) / elapsed if elapsed > 0 else 0.0
+        print(f"[NotebookConverter] Converted {len(converted_files)} notebooks ({errors} errors) "
+              f"in {elapsed:.2f}s: {rate:.1f} notebooks/sec")
         return converted_files
 
     def run(self):
@@ -43,4 +107,4 @@ class NotebookConverter:
 
 if __name__ == "__main__":
     converter = NotebookConverter()
-    converter.run()
\ No newline at end of file
+    converter.run()
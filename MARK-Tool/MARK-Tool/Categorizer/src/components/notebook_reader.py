@@ -0,0 +1,101 @@
+import bisect
+import json
+import re
+from collections import namedtuple
+
+NotebookCell = namedtuple("NotebookCell", ["index", "execution_count", "source"])
+
+# Righe IPython (%magic, %%cell magic, !shell, ?help) che non sono codice Python
+IPYTHON_LINE = re.compile(r"^\s*(%|!|\?)|^\s*[\w.]+\?\s*$")
+
+
+def load_notebook(text):
+    """Parse the JSON of an .ipynb file; raises ValueError if it is not a notebook."""
+    notebook = json.loads(text)
+    if not isinstance(notebook, dict) or not isinstance(notebook.get("cells"), list):
+        raise ValueError("not a Jupyter notebook (nbformat 4 'cells' list missing)")
+    return notebook
+
+
+def _cell_source(cell):
+    source = cell.get("source", "")
+    if isinstance(source, list):
+        source = "".join(source)
+    return source
+
+
+def iter_code_cells(notebook):
+    """Yield the code cells of a parsed notebook; index is the position of the cell in the notebook."""
+    for index, cell in enumerate(notebook["cells"]):
+        if isinstance(cell, dict) and cell.get("cell_type") == "code":
+            yield NotebookCell(index, cell.get("execution_count"), _cell_source(cell))
+
+
+def cell_to_python(source):
+    """
+    Return the Python code of a cell, with the IPython-only lines commented out.
+
+    Lines are never added or removed, so line numbers inside the cell are kept.
+    """
+    if "%" not in source and "!" not in source and "?" not in source:
+        return source
+    return "\n".join("# " + line if IPYTHON_LINE.match(line) else line for line in source.split("\n"))
+
+
+class NotebookScript:
+    """
+    Python script extracted from a notebook (see notebook_to_script and code_cells_script).
+
+    cell_starts maps the code cells to the script: (first script line, cell index),
+    so a line of the script can be traced back to its cell with locate().
+    """
+
+    def __init__(self, text, cell_starts, cells=None):
+        self.text = text
+        self.cell_starts = cell_starts
+        self.cells = cells
+        self._first_lines = [first_line for first_line, _ in cell_starts]
+
+    def locate(self, line_number):
+        """Return (cell index, line number inside the cell) of a script line, or None outside the cells."""
+        position = bisect.bisect_right(self._first_lines, line_number) - 1
+        if position < 0:
+            return None
+        first_line, cell_index = self.cell_starts[position]
+        return cell_index, line_number - first_line + 1
+
+
+def notebook_to_script(notebook):
+    """Build the NotebookScript of a parsed notebook (code cells as code, markdown as comments)."""
+    lines = ["#!/usr/bin/env python", "# coding: utf-8", ""]
+    cell_starts = []
+    for index, cell in enumerate(notebook["cells"]):
+        if not isinstance(cell, dict):
+            continue
+        source = _cell_source(cell)
+        if cell.get("cell_type") == "code":
+            execution_count = cell.get("execution_count")
+            lines += [f"# In[{execution_count if execution_count is not None else ' '}]:", "", ""]
+            cell_starts.append((len(lines) + 1, index))
+            lines += cell_to_python(source).split("\n")
+            lines += ["", ""]
+        elif cell.get("cell_type") == "markdown":
+            lines += [("# " + line).rstrip() for line in source.split("\n")]
+            lines.append("")
+    return NotebookScript("\n".join(lines) + "\n", cell_starts)
+
+
+def code_cells_script(cells):
+    """
+    NotebookScript made only of the given code cells, one after the other.
+
+    This is the virtual source analyzed for a notebook: no markdown, outputs
+    or JSON escaping, and every line can be located in its cell.
+    """
+    cells = list(cells)
+    lines = []
+    cell_starts = []
+    for cell in cells:
+        cell_starts.append((len(lines) + 1, cell.index))
+        lines += cell_to_python(cell.source).split("\n")
+    return NotebookScript("\n".join(lines), cell_starts, cells)
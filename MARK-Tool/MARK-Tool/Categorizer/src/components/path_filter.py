@@ -0,0 +1,151 @@
+import fnmatch
+import os
+import re
+
+# Directory e file mai rilevanti per l'analisi: VCS, cache, ambienti virtuali, dipendenze vendorizzate, build
+DEFAULT_IGNORE = (
+    ".git", ".hg", ".svn", "__pycache__", ".ipynb_checkpoints",
+    ".venv", "venv", ".tox", ".nox", ".eggs", "*.egg-info",
+    "site-packages", "dist-packages", "node_modules",
+    "build", "dist",
+)
+
+# Presente nella radice di ogni virtualenv, qualunque sia il suo nome
+VIRTUALENV_MARKER = "pyvenv.cfg"
+
+
+def _glob_to_regex(pattern):
+    """Translate a .gitignore glob (with **) to a regex source matching a relative posix path."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            parts.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+class GitIgnoreRule:
+    """One pattern of a .gitignore file, relative to the directory that contains it."""
+
+    def __init__(self, base, pattern):
+        self.base = base
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        body = _glob_to_regex(pattern.lstrip("/"))
+        self.regex = re.compile(("^" if anchored else "^(?:.*/)?") + body + "$")
+
+    def matches(self, rel_path):
+        if self.base != ".":
+            if not rel_path.startswith(self.base + "/"):
+                return False
+            rel_path = rel_path[len(self.base) + 1:]
+        return self.regex.match(rel_path) is not None
+
+
+def read_gitignore(path, base):
+    rules = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.rstrip("\n").rstrip()
+                if line and not line.startswith("#"):
+                    rules.append(GitIgnoreRule(base, line))
+    except OSError:
+        pass
+    return rules
+
+
+class PathFilter:
+    """
+    Pruning rules for the traversal of a repository.
+
+    Entries matching an ignore glob are skipped while walking, so ignored
+    directories are never listed. A glob without "/" matches the name of a
+    file or directory at any depth, a glob with "/" matches the path relative
+    to the walked root. Virtualenvs are recognized by their pyvenv.cfg and,
+    with use_gitignore, the .gitignore files of the repository are honored.
+    """
+
+    def __init__(self, ignore=(), use_defaults=True, use_gitignore=False):
+        self.patterns = (DEFAULT_IGNORE if use_defaults else ()) + tuple(ignore or ())
+        self.use_gitignore = use_gitignore
+        name_patterns = [p for p in self.patterns if "/" not in p]
+        path_patterns = [p.strip("/") for p in self.patterns if "/" in p]
+        self._name_regex = re.compile("|".join(fnmatch.translate(p) for p in name_patterns)) if name_patterns else None
+        self._path_regex = re.compile("|".join(fnmatch.translate(p) for p in path_patterns)) if path_patterns else None
+
+    @property
+    def key(self):
+        """Signature of the rules, used to cache the traversal results per configuration."""
+        return "|".join(self.patterns) + ("|gitignore" if self.use_gitignore else "")
+
+    def is_ignored(self, rel_path, name, is_dir, rules=()):
+        if self._name_regex is not None and self._name_regex.match(name):
+            return True
+        if self._path_regex is not None and self._path_regex.match(rel_path):
+            return True
+        ignored = False
+        # .gitignore: vince l'ultima regola che corrisponde
+        for rule in rules:
+            if (not rule.dir_only or is_dir) and rule.matches(rel_path):
+                ignored = not rule.negate
+        return ignored
+
+    def walk(self, root):
+        """
+        Yield (relative dir, dir path, file names) for every directory not pruned, in os.walk order.
+
+        Like os.walk, unreadable directories are skipped and symbolic links to
+        directories are not followed.
+        """
+        stack = [(".", root, ())]
+        while stack:
+            rel_dir, path, rules = stack.pop()
+            try:
+                with os.scandir(path) as entries:
+                    entries = list(entries)
+            except OSError:
+                continue
+            if rel_dir != "." and any(entry.name == VIRTUALENV_MARKER for entry in entries):
+                continue
+            if self.use_gitignore and any(entry.name == ".gitignore" for entry in entries):
+                rules = rules + tuple(read_gitignore(os.path.join(path, ".gitignore"), rel_dir.replace(os.sep, "/")))
+
+            files = []
+            subdirs = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                rel_path = entry.name if rel_dir == "." else os.path.join(rel_dir, entry.name)
+                if self.is_ignored(rel_path.replace(os.sep, "/"), entry.name, is_dir, rules):
+                    continue
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append((rel_path, entry.path, rules))
+                else:
+                    files.append(entry.name)
+            yield rel_dir, path, files
+            stack.extend(reversed(subdirs))
@@ -0,0 +1,100 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Etichetta corrente (es. "producer:owner/repo") per thread, usata come radice degli stack campionati
+_labels = {}
+
+
+@contextmanager
+def profile_label(label):
+    """Label the samples taken on the current thread, e.g. with the project being analyzed."""
+    ident = threading.get_ident()
+    previous = _labels.get(ident)
+    _labels[ident] = label
+    try:
+        yield
+    finally:
+        if previous is None:
+            _labels.pop(ident, None)
+        else:
+            _labels[ident] = previous
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class AnalysisProfiler:
+    """
+    Profiles the analysis passes run inside the context.
+
+    The calling thread is profiled with cProfile (written as <name>.pstats,
+    readable with pstats or snakeviz) and sampled every interval seconds by a
+    background thread; the samples are written as collapsed stacks
+    (<name>.collapsed, one "root;...;leaf count" line per stack) for
+    flamegraph.pl or speedscope. The root frame of every sample is the
+    profile_label active at that moment, so slow projects stand out.
+
+    Only the process that enters the context is profiled: with several
+    workers the analysis runs in the pool processes.
+    """
+
+    def __init__(self, output_dir, name=None, interval=0.005):
+        self.output_dir = output_dir
+        self.name = name or time.strftime("profile_%Y%m%d_%H%M%S")
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._profile = cProfile.Profile()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._target = None
+
+    @property
+    def pstats_path(self):
+        return os.path.join(self.output_dir, self.name + ".pstats")
+
+    @property
+    def collapsed_path(self):
+        return os.path.join(self.output_dir, self.name + ".collapsed")
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if not stack:
+                continue
+            stack.append(_labels.get(self._target, "analysis"))
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="AnalysisProfiler", daemon=True)
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        self._stop.set()
+        self._sampler.join()
+        self.write()
+
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._profile.dump_stats(self.pstats_path)
+        with open(self.collapsed_path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        print(f"[PROFILE] {self.samples} samples, written to: {self.pstats_path} and {self.collapsed_path}")
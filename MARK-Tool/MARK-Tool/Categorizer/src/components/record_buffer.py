@@ -0,0 +1,34 @@
+import pandas as pd
+
+
+class RecordBuffer:
+    """
+    Columnar buffer for result rows.
+
+    Rows are appended to one list per column and materialized as a DataFrame
+    only once. Columns with the same value for every row (e.g. the project
+    name) are stored once and broadcast when the frame is built.
+    """
+
+    def __init__(self, columns, constants=None):
+        self.columns = list(columns)
+        self.constants = dict(constants or {})
+        self._data = {column: [] for column in self.columns if column not in self.constants}
+        self._size = 0
+
+    def append(self, **values):
+        for column, data in self._data.items():
+            data.append(values[column])
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    def to_frame(self):
+        data = {}
+        for column in self.columns:
+            if column in self.constants:
+                data[column] = [self.constants[column]] * self._size
+            else:
+                data[column] = self._data[column]
+        return pd.DataFrame(data, columns=self.columns)
@@ -0,0 +1,169 @@
+import csv
+import json
+import os
+import time
+import pandas as pd
+
+
+def _read_index(index_file):
+    entries = []
+    with open(index_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break  # riga parziale scritta da un'esecuzione interrotta
+    return entries
+
+
+def _write_index(index_file, entries):
+    with open(index_file, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+class StreamingResultsWriter:
+    """
+    Append-only writer for the results CSV of an analysis.
+
+    Only the rows of each newly analyzed project are appended to the results
+    file. Resume state lives in a small side index (one JSON line per
+    completed project with the size of the results file after its rows), so
+    the results file itself is never re-read. Data is flushed after every
+    project and fsync'ed in batches; on reopen, rows written after the last
+    indexed project (e.g. by a run that crashed mid-project) are truncated.
+
+    A header extension rewrites the results file and re-indexes it: the new
+    index is staged next to the rewritten file before either is swapped in,
+    and a run interrupted between the two swaps is completed on reopen.
+    """
+
+    def __init__(self, results_file, index_file, fsync_every=20, fsync_interval=5.0):
+        self.results_file = results_file
+        self.index_file = index_file
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self.completed = set()
+        self._recover_header_rewrite()
+        self.columns = self._read_header()
+        self._offset = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._load_index()
+
+        self._results = open(self.results_file, "ab")
+        self._index = open(self.index_file, "a", encoding="utf-8")
+
+    def _recover_header_rewrite(self):
+        # Indice preparato da _extend_header: valido solo se il file riscritto ha gia' sostituito i risultati
+        staged_results = self.results_file + ".tmp"
+        staged_index = self.index_file + ".pending"
+        if os.path.exists(staged_index):
+            if os.path.exists(staged_results):
+                os.remove(staged_index)
+            else:
+                os.replace(staged_index, self.index_file)
+        if os.path.exists(staged_results):
+            os.remove(staged_results)
+
+    def _read_header(self):
+        with open(self.results_file, "r", encoding="utf-8", newline="") as f:
+            return next(csv.reader(f), [])
+
+    def _load_index(self):
+        size = os.path.getsize(self.results_file)
+        if not os.path.exists(self.index_file):
+            self._bootstrap_index(size)
+            return
+
+        entries = _read_index(self.index_file)
+        # Le voci oltre la dimensione del file non sono arrivate su disco insieme alle righe
+        valid = [entry for entry in entries if entry["offset"] <= size]
+        self.completed = {entry["project"] for entry in valid}
+        self._offset = max((entry["offset"] for entry in valid), default=0)
+        if not valid:
+            self._offset = self._header_size()
+        if size > self._offset:
+            with open(self.results_file, "r+b") as f:
+                f.truncate(self._offset)
+        if len(valid) != len(entries):
+            self._rewrite_index(valid)
+
+    def _header_size(self):
+        with open(self.results_file, "rb") as f:
+            return len(f.readline())
+
+    def _bootstrap_index(self, size):
+        # File di risultati precedente all'indice: i progetti completati si leggono una sola volta
+        if size > self._header_size() and "ProjectName" in self.columns:
+            projects = pd.read_csv(self.results_file, usecols=["ProjectName"])["ProjectName"]
+            self.completed = set(projects.dropna().astype(str))
+        self._offset = size
+        self._rewrite_index([{"project": project, "offset": size} for project in sorted(self.completed)])
+
+    def _rewrite_index(self, entries):
+        tmp_file = self.index_file + ".tmp"
+        _write_index(tmp_file, entries)
+        os.replace(tmp_file, self.index_file)
+
+    def is_completed(self, project_name):
+        return project_name in self.completed
+
+    def _extend_header(self, new_columns):
+        # Nuove colonne (come in pd.concat): il file viene riscritto una sola volta con l'header esteso
+        self._results.close()
+        self.columns = self.columns + new_columns
+        # Riscrittura su file temporaneo: un crash a meta' non tocca i risultati gia' scritti
+        tmp_file = self.results_file + ".tmp"
+        pd.read_csv(self.results_file).reindex(columns=self.columns).to_csv(tmp_file, index=False)
+        # L'indice con i nuovi offset e' scritto prima dello scambio dei file (vedi _recover_header_rewrite)
+        self._offset = os.path.getsize(tmp_file)
+        staged_index = self.index_file + ".pending"
+        _write_index(staged_index, [{"project": project, "offset": self._offset} for project in sorted(self.completed)])
+        os.replace(tmp_file, self.results_file)
+        os.replace(staged_index, self.index_file)
+        self._index.close()
+        self._index = open(self.index_file, "a", encoding="utf-8")
+        self._results = open(self.results_file, "ab")
+
+    def write(self, project_name, frame):
+        """Append the rows of a project and mark it as completed."""
+        new_columns = [column for column in frame.columns if column not in self.columns]
+        if new_columns:
+            self._extend_header(new_columns)
+        if not frame.empty:
+            rows = frame.reindex(columns=self.columns).to_csv(header=False, index=False)
+            self._results.write(rows.encode("utf-8"))
+        self._results.flush()
+        self._offset = self._results.tell()
+
+        self.completed.add(project_name)
+        self._index.write(json.dumps({"project": project_name, "offset": self._offset}) + "\n")
+        self._index.flush()
+
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        # Prima i risultati, poi l'indice che li referenzia
+        os.fsync(self._results.fileno())
+        os.fsync(self._index.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._results.closed:
+            return
+        self._results.flush()
+        self._index.flush()
+        self.sync()
+        self._results.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
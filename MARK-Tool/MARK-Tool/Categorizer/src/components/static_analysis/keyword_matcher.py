@@ -0,0 +1,217 @@
+import re
+import threading
+from collections import namedtuple
+
+KeywordHit = namedtuple("KeywordHit", ["keyword", "library", "line_number", "line"])
+
+# Dimensione dei blocchi usati per contare le righe in un buffer mappato senza copiarlo tutto
+NEWLINE_COUNT_CHUNK = 1 << 20
+
+# Numero massimo di viste per insieme di librerie tenute in memoria da un KeywordMatcher
+MAX_CACHED_VIEWS = 4096
+
+
+def _count_newlines(buffer, start, end):
+    count = 0
+    for chunk_start in range(start, end, NEWLINE_COUNT_CHUNK):
+        count += buffer[chunk_start:min(end, chunk_start + NEWLINE_COUNT_CHUNK)].count(b"\n")
+    return count
+
+
+def _line_count(newlines, length):
+    return newlines + 1 if length else 0
+
+
+def _decode_line(data):
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("ISO-8859-1")
+
+
+def build_keyword_pattern(keyword, flexible_whitespace=True):
+    """
+    Return the regex source used to match a dictionary keyword.
+
+    With flexible_whitespace the spaces inside the keyword match any amount of
+    whitespace (consumer semantics), otherwise the keyword is matched literally.
+    """
+    source = re.escape(str(keyword))
+    if flexible_whitespace:
+        source = source.replace(r"\ ", r"\s*")
+    return source
+
+
+class KeywordMatcherView:
+    """
+    A KeywordMatcher restricted to the keywords of a set of libraries.
+
+    Holds the dictionary rows of the libraries, the keyword -> library index
+    (first row of the dictionary) and the combined pattern of their keywords,
+    so hits are labelled with an O(1) lookup and lines are selected only by
+    the keywords that can produce a hit.
+    """
+
+    def __init__(self, patterns, entries):
+        self.patterns = patterns
+        self.entries = entries
+        self.first_library = {}
+        for keyword, library in entries:
+            self.first_library.setdefault(keyword, library)
+
+        # Longest first, so that the alternation prefers the most specific keyword
+        sources = sorted((patterns[keyword].pattern for keyword in self.first_library), key=len, reverse=True)
+        self.combined = re.compile("|".join(sources), re.IGNORECASE) if sources else None
+        self._combined_bytes = None
+
+    @property
+    def combined_bytes(self):
+        if self._combined_bytes is None:
+            self._combined_bytes = re.compile(self.combined.pattern.encode("utf-8"), re.IGNORECASE)
+        return self._combined_bytes
+
+    def evaluations(self, candidate_lines):
+        """Regex searches of a scan: the combined searches plus the keyword patterns of every candidate line."""
+        return candidate_lines + 1 + candidate_lines * len(self.first_library)
+
+    def line_hits(self, line, line_number):
+        matched = {keyword for keyword in self.first_library if self.patterns[keyword].search(line)}
+        return [KeywordHit(keyword, self.first_library[keyword], line_number, line)
+                for keyword, _ in self.entries if keyword in matched]
+
+
+class KeywordMatcher:
+    """
+    Precompiled multi-keyword matcher built once per library dictionary.
+
+    All the keyword patterns are combined in a single alternation, so a buffer
+    is scanned in one pass to locate the candidate lines; the per-keyword
+    patterns are evaluated only on those lines, which keeps the previous
+    semantics (every matching keyword of a line is reported, even when the
+    keywords overlap).
+
+    The restriction to the libraries imported by a file is a
+    KeywordMatcherView memoized per library set: many files share the same
+    imports, so the view is built once and reused.
+    """
+
+    def __init__(self, entries, flexible_whitespace=True):
+        # entries: (keyword, library) pairs in dictionary order
+        self.entries = [(str(keyword), library) for keyword, library in entries]
+        self.flexible_whitespace = flexible_whitespace
+
+        self.patterns = {}
+        for keyword, _ in self.entries:
+            if keyword not in self.patterns:
+                self.patterns[keyword] = re.compile(
+                    build_keyword_pattern(keyword, flexible_whitespace), re.IGNORECASE)
+
+        self._views = {}
+        self._lock = threading.Lock()
+        self.combined = self.view(None).combined
+
+    @classmethod
+    def from_dataframe(cls, library_dict, flexible_whitespace=True):
+        return cls(zip(library_dict["Keyword"].tolist(), library_dict["library"].tolist()),
+                   flexible_whitespace)
+
+    def view(self, libraries):
+        """The memoized KeywordMatcherView of a set of libraries (None: the whole dictionary)."""
+        key = None if libraries is None else frozenset(libraries)
+        view = self._views.get(key)
+        if view is None:
+            if key is None:
+                entries = self.entries
+            else:
+                entries = [entry for entry in self.entries if entry[1] in key]
+            view = KeywordMatcherView(self.patterns, entries)
+            with self._lock:
+                if len(self._views) >= MAX_CACHED_VIEWS:
+                    self._views.clear()
+                view = self._views.setdefault(key, view)
+        return view
+
+    def iter_hits(self, lines, libraries=None):
+        """
+        Yield the hits of an iterable of lines (e.g. an open file) as they are found.
+
+        Only the keywords of the given libraries are considered; hits are
+        reported once per dictionary row, in dictionary order.
+        """
+        view = self.view(libraries)
+        if not view.entries:
+            return
+        line_number = 0
+        for line in lines:
+            line_number += 1
+            if view.combined.search(line):
+                yield from view.line_hits(line, line_number)
+
+    def scan(self, text, libraries=None, metrics=None):
+        """
+        Return the hits of a whole buffer, located with a single pass of the combined pattern.
+
+        text is either a str or a bytes-like buffer (e.g. an mmap); with a
+        buffer only the lines containing a candidate match are decoded and
+        line numbers are computed from the newline offsets of the hits.
+        metrics (AnalysisMetrics) receives the number of regex searches run
+        and of lines scanned; the newlines before the last hit are already
+        counted for the line numbers, so only the rest of the buffer is
+        counted again.
+        """
+        view = self.view(libraries)
+        if not view.entries:
+            return []
+        if not isinstance(text, str):
+            return self._scan_buffer(text, view, metrics)
+
+        hits = []
+        candidates = 0
+        line_number = 1
+        line_start = 0
+        pos = 0
+        while True:
+            match = view.combined.search(text, pos)
+            if match is None:
+                break
+            start = match.start()
+            line_number += text.count("\n", line_start, start)
+            line_start = text.rfind("\n", 0, start) + 1
+            line_end = text.find("\n", start)
+            line_end = len(text) if line_end == -1 else line_end + 1
+            hits.extend(view.line_hits(text[line_start:line_end], line_number))
+            candidates += 1
+            pos = line_end
+        if metrics is not None:
+            metrics.count("regex_evaluations", view.evaluations(candidates))
+            # Nessun "\n" tra l'inizio della riga dell'ultimo hit e il match stesso
+            metrics.count("lines_scanned", _line_count(line_number - 1 + text.count("\n", line_start), len(text)))
+        return hits
+
+    def _scan_buffer(self, buffer, view, metrics=None):
+        combined = view.combined_bytes
+        hits = []
+        candidates = 0
+        line_number = 1
+        counted = 0
+        pos = 0
+        while True:
+            match = combined.search(buffer, pos)
+            if match is None:
+                break
+            start = match.start()
+            line_number += _count_newlines(buffer, counted, start)
+            counted = start
+            line_start = buffer.rfind(b"\n", 0, start) + 1
+            line_end = buffer.find(b"\n", start)
+            line_end = len(buffer) if line_end == -1 else line_end + 1
+            # I keyword sono verificati sulla riga decodificata, come per il testo
+            line = _decode_line(buffer[line_start:line_end])
+            hits.extend(view.line_hits(line, line_number))
+            candidates += 1
+            pos = line_end
+        if metrics is not None:
+            metrics.count("regex_evaluations", view.evaluations(candidates))
+            newlines = line_number - 1 + _count_newlines(buffer, counted, len(buffer))
+            metrics.count("lines_scanned", _line_count(newlines, len(buffer)))
+        return hits
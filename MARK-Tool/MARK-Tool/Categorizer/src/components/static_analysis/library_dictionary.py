@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+import pandas as pd
+from components.static_analysis.keyword_matcher import KeywordMatcher
+from components.static_analysis.library_extractor import ImportPrefilter
+
+
+class LibraryDictionary:
+    """
+    A parsed library_dictionary/*.csv file with its precomputed indexes.
+
+    The DataFrame is shared by every analyzer of the process and must be
+    treated as read-only.
+    """
+
+    def __init__(self, path, frame, mtime, version=None):
+        self.path = path
+        self.frame = frame
+        self.mtime = mtime
+        # Hash del contenuto del CSV: identifica il dizionario nelle cache persistenti
+        self.version = version
+
+        keywords = [str(keyword) for keyword in frame["Keyword"].tolist()]
+        libraries = frame["library"].tolist()
+        self.entries = list(zip(keywords, libraries))
+        self.libraries = set(libraries)
+
+        # library -> keywords, in ordine di dizionario (vedi keywords_for)
+        self.library_keywords = {}
+        for keyword, library in self.entries:
+            self.library_keywords.setdefault(library, []).append(keyword)
+
+        # Prefiltro sui byte: scarta i file che non importano nessuna libreria del dizionario
+        self.prefilter = ImportPrefilter(self.libraries)
+
+        self._matchers = {}
+        self._imported_libraries = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, mtime=None):
+        if mtime is None:
+            mtime = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            version = hashlib.blake2b(f.read(), digest_size=12).hexdigest()
+        return cls(path, pd.read_csv(path, delimiter=","), mtime, version)
+
+    def libraries_in(self, imports):
+        """Library of every dictionary row imported by a file, in dictionary order (one per row)."""
+        # Memoizzato per insieme di librerie importate: molti file hanno gli stessi import
+        key = frozenset(self.libraries.intersection(imports))
+        libraries = self._imported_libraries.get(key)
+        if libraries is None:
+            libraries = tuple(library for _, library in self.entries if library in key)
+            with self._lock:
+                self._imported_libraries[key] = libraries
+        return list(libraries)
+
+    def keywords_for(self, libraries):
+        """Keywords of the given libraries, grouped by library (dictionary order within each library)."""
+        keywords = []
+        # libraries_in restituisce una libreria per riga: ogni libreria si espande una sola volta
+        for library in dict.fromkeys(libraries):
+            keywords.extend(self.library_keywords.get(library, ()))
+        return keywords
+
+    def matcher(self, flexible_whitespace=True):
+        """The compiled KeywordMatcher of the dictionary, built on first use."""
+        with self._lock:
+            if flexible_whitespace not in self._matchers:
+                self._matchers[flexible_whitespace] = KeywordMatcher(self.entries, flexible_whitespace)
+            return self._matchers[flexible_whitespace]
+
+
+class LibraryDictionaryRegistry:
+    """
+    Process-wide cache of the library dictionaries.
+
+    Each CSV is parsed once; an entry is reloaded only when the modification
+    time of the file changes, so long-running processes (e.g. the web GUI)
+    pick up edited dictionaries without a restart.
+    """
+
+    def __init__(self):
+        self._dictionaries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        key = os.path.abspath(path)
+        mtime = os.stat(key).st_mtime_ns
+        with self._lock:
+            dictionary = self._dictionaries.get(key)
+            if dictionary is None or dictionary.mtime != mtime:
+                dictionary = LibraryDictionary.load(key, mtime)
+                self._dictionaries[key] = dictionary
+            return dictionary
+
+    def clear(self):
+        with self._lock:
+            self._dictionaries.clear()
+
+
+registry = LibraryDictionaryRegistry()
+
+
+def get_library_dictionary(path):
+    """Return the cached LibraryDictionary for a dictionary CSV path."""
+    return registry.get(path)
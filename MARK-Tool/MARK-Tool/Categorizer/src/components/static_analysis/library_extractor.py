@@ -1,44 +1,154 @@
+import ast
+import re
+import warnings
+from components.notebook_reader import load_notebook, iter_code_cells, cell_to_python
+
+# Fallback per i file non parsabili: solo istruzioni di import a inizio riga
+# (eventualmente dentro una stringa JSON di un notebook)
+IMPORT_LINE = re.compile(r'^\s*"?\s*import\s+([^#;"\\\n]+)', re.MULTILINE)
+FROM_IMPORT_LINE = re.compile(r'^\s*"?\s*from\s+([\w.]+)\s+import\b', re.MULTILINE)
+
+
+def _top_level(module):
+    return module.strip().split(".")[0]
+
+
+IMPORT_LINE_BYTES = re.compile(IMPORT_LINE.pattern.encode("utf-8"), re.MULTILINE)
+FROM_IMPORT_LINE_BYTES = re.compile(FROM_IMPORT_LINE.pattern.encode("utf-8"), re.MULTILINE)
+
+IMPORT_KEYWORD_BYTES = re.compile(rb"\b(?:import|from)\b")
+
+
+def _collect_imports(import_names, from_modules):
+    modules = set()
+    for names in import_names:
+        for name in names.split(","):
+            name = name.split(" as ")[0].strip().strip("()")
+            if name:
+                modules.add(_top_level(name.split()[0]))
+    for module in from_modules:
+        if not module.startswith("."):
+            modules.add(_top_level(module))
+    return {module for module in modules if module.isidentifier()}
+
+
+def _extract_imports_by_line(source):
+    return _collect_imports((match.group(1) for match in IMPORT_LINE.finditer(source)),
+                            (match.group(1) for match in FROM_IMPORT_LINE.finditer(source)))
+
+
+def extract_imports_from_buffer(buffer):
+    """
+    Line-based import scan of a bytes-like buffer (e.g. an mmap).
+
+    Used for files too large to be decoded and parsed as a whole.
+    """
+    return _collect_imports(
+        (match.group(1).decode("utf-8", "replace") for match in IMPORT_LINE_BYTES.finditer(buffer)),
+        (match.group(1).decode("utf-8", "replace") for match in FROM_IMPORT_LINE_BYTES.finditer(buffer)))
+
+
+def extract_imports(source):
+    """
+    Return the top-level modules imported by a Python source.
+
+    The source is parsed with ast (covering `import a, b`, parenthesized
+    imports and imports nested in functions or try blocks); relative imports
+    are ignored. Sources that cannot be parsed fall back to a line-based scan
+    of the import statements.
+    """
+    if "import" not in source:
+        return set()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            tree = ast.parse(source)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return _extract_imports_by_line(source)
+
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(_top_level(alias.name) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.add(_top_level(node.module))
+    return modules
+
+
+def extract_notebook_imports(source):
+    """Return the top-level modules imported by the code cells of a notebook (.ipynb JSON)."""
+    try:
+        notebook = load_notebook(source)
+    except ValueError:
+        return _extract_imports_by_line(source)
+
+    modules = set()
+    for cell in iter_code_cells(notebook):
+        modules.update(extract_imports(cell_to_python(cell.source)))
+    return modules
+
+
+class ImportPrefilter:
+    """
+    Byte-level check that a file may import one of a set of libraries.
+
+    A module is imported only if its name appears after an import or from
+    keyword, so a file passes when one of the library names (one combined,
+    case-sensitive pattern) follows the first such keyword. This never
+    rejects a file whose extracted imports include a library (continuation
+    lines and notebook JSON included); files that do not pass are skipped
+    without being decoded or parsed.
+    """
+
+    def __init__(self, libraries):
+        # Solo i nomi che possono comparire in un import (vedi _collect_imports)
+        names = sorted({library for library in libraries if isinstance(library, str) and library.isidentifier()},
+                       key=len, reverse=True)
+        self.pattern = re.compile(rb"\b(?:" + b"|".join(re.escape(name.encode("ascii", "ignore")) for name in names)
+                                  + rb")\b") if names else None
+
+    def matches(self, buffer):
+        """True if buffer (bytes or mmap) may import one of the libraries."""
+        if self.pattern is None:
+            return False
+        keyword = IMPORT_KEYWORD_BYTES.search(buffer)
+        return keyword is not None and self.pattern.search(buffer, keyword.start()) is not None
+
 
 class LibraryAnalyzer:
-    def __init__(self, file_path):
+    def __init__(self, file_path, source=None):
         self.file = file_path
+        # Contenuto gia' letto dall'analisi, per non rileggere il file
+        self.source = source
 
-    def get_libraries(self):
-        libraries = []
+    def read_source(self):
         try:
             with open(self.file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
+                return f.read()
         except UnicodeDecodeError:
+            with open(self.file, "r", encoding="ISO-8859-1") as f:
+                return f.read()
+
+    def get_libraries(self):
+        """Return the set of top-level modules imported by the file."""
+        source = self.source
+        if source is None:
             try:
-                with open(self.file, "r", encoding="ISO-8859-1") as f:
-                    lines = f.readlines()
-            except UnicodeDecodeError:
-                print(f"Error reading file {self.file}")
-                return libraries
-        except FileNotFoundError:
-            print(f"Error finding file {self.file}")
-            return libraries
-
-        # Your analysis logic here
-        for line in lines:
-            # delete trailing whitespaces at start if present
-            line = line.lstrip()
-            if 'import ' in line:
-                if "from" in line:
-                    libraries.append(line.split(' ')[1])
-                else:
-                    libraries.append(line.split(' ')[1])
-        return libraries
-
-    def check_ml_library_usage(self, library_dict, is_consumer=False):
-        file_libraries = self.get_libraries()
-        for i in range(len(file_libraries)):
-            if "." in file_libraries[i]:
-                file_libraries[i] = file_libraries[i].split(".")[0]
-            # solo il consumer
-            if is_consumer:
-                file_libraries[i] = file_libraries[i].replace("\n", "")
-            # filter dict libraries from file libraries
+                source = self.read_source()
+            except FileNotFoundError:
+                print(f"Error finding file {self.file}")
+                return set()
+
+        if str(self.file).endswith(".ipynb"):
+            return extract_notebook_imports(source)
+        return extract_imports(source)
+
+    def check_ml_library_usage(self, library_dict, is_consumer=False, file_libraries=None):
+        # is_consumer e' mantenuto per compatibilita': producer e consumer normalizzano gli import allo stesso modo
+        # file_libraries: import gia' estratti (es. SourceFile.imports), per non rianalizzare il file
+        if file_libraries is None:
+            file_libraries = self.get_libraries()
+        # filter dict libraries from file libraries
         dict_libraries = library_dict[library_dict['library'].isin(file_libraries)]
 
-        return dict_libraries
\ No newline at end of file
+        return dict_libraries
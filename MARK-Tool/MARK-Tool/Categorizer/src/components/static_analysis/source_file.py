@@ -0,0 +1,131 @@
+import mmap
+import os
+from components.analysis_cache import hash_content
+from components.notebook_reader import load_notebook, iter_code_cells, cell_to_python, code_cells_script
+from components.static_analysis.library_extractor import LibraryAnalyzer, extract_imports, extract_imports_from_buffer
+
+
+class SourceFile:
+    """
+    A source file loaded once per analysis pass.
+
+    The bytes are read once; the text is decoded on first use (utf-8, then
+    ISO-8859-1 like LibraryAnalyzer.get_libraries) with the newline
+    translation of text-mode open(), and shared by import extraction,
+    keyword matching and the rules_3 producer check.
+
+    Files of at least mmap_threshold bytes are memory-mapped instead: they
+    are never decoded as a whole, imports come from a line-based scan of the
+    mapped bytes and keyword matching runs directly on the mapping.
+    Notebooks are the exception: their JSON has to be parsed as a whole to
+    reach the code cells, so a .ipynb is always read and decoded in memory.
+
+    A valid .ipynb is a virtual source: only its code cells are analyzed
+    (see notebook), and hit lines are located in their cell.
+    """
+
+    def __init__(self, path, data, mapped=False):
+        self.path = path
+        self.data = data
+        self.mapped = mapped
+        self.encoding = None
+        self._text = None
+        self._hash = None
+        self._imports = None
+        self._notebook = None
+
+    @classmethod
+    def load(cls, path, mmap_threshold=None):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # Soglia positiva: un file vuoto non si puo' mappare (mmap solleva ValueError)
+            # I notebook vanno comunque decodificati per intero: la mappatura non risparmierebbe memoria
+            if mmap_threshold and 0 < mmap_threshold <= size and not str(path).endswith(".ipynb"):
+                return cls(path, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), mapped=True)
+            return cls(path, f.read())
+
+    @property
+    def kind(self):
+        """How the file is parsed: its suffix (".py", ".ipynb", ...), plus "+mmap" when memory-mapped."""
+        suffix = os.path.splitext(str(self.path))[1].lower()
+        return suffix + "+mmap" if self.mapped else suffix
+
+    @property
+    def text(self):
+        if self._text is None:
+            data = self.data[:] if self.mapped else self.data
+            try:
+                text = data.decode("utf-8")
+                self.encoding = "utf-8"
+            except UnicodeDecodeError:
+                text = data.decode("ISO-8859-1")
+                self.encoding = "ISO-8859-1"
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            self._text = text
+        return self._text
+
+    @property
+    def notebook(self):
+        """NotebookScript of the code cells of a valid .ipynb file, None for any other file."""
+        if self._notebook is None:
+            self._notebook = False
+            if str(self.path).endswith(".ipynb"):
+                try:
+                    self._notebook = code_cells_script(iter_code_cells(load_notebook(self.text)))
+                except ValueError:
+                    pass  # JSON non valido: il file e' analizzato come testo
+        return self._notebook or None
+
+    def locate(self, line_number):
+        """Return (cell index, line in cell) of a line of buffer for notebooks, (None, line_number) otherwise."""
+        if self.notebook is None:
+            return None, line_number
+        return self.notebook.locate(line_number)
+
+    @property
+    def buffer(self):
+        """
+        What the keyword matcher scans: the code cells of a notebook, the
+        mapping for large files, the decoded text otherwise.
+        """
+        if self.notebook is not None:
+            return self.notebook.text
+        return self.data if self.mapped else self.text
+
+    @property
+    def content_hash(self):
+        if self._hash is None:
+            self._hash = hash_content(self.data)
+        return self._hash
+
+    @property
+    def imports(self):
+        """Top-level modules imported by the file, extracted once."""
+        if self._imports is None:
+            if self.notebook is not None:
+                self._imports = set()
+                for cell in self.notebook.cells:
+                    self._imports.update(extract_imports(cell_to_python(cell.source)))
+            elif self.mapped:
+                self._imports = extract_imports_from_buffer(self.data)
+            else:
+                self._imports = LibraryAnalyzer(self.path, self.text).get_libraries()
+        return self._imports
+
+    def contains(self, keyword):
+        """Case-sensitive substring check, as in the rules_3 producer check."""
+        buffer = self.buffer
+        if isinstance(buffer, str):
+            return keyword in buffer
+        return buffer.find(keyword.encode("utf-8")) != -1
+
+    def close(self):
+        if self.mapped and not self.data.closed:
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
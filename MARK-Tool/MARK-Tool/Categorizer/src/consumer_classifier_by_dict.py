@@ -1,81 +1,77 @@
 import os
-import pandas as pd
+import time
 import re
-from components.static_analysis.library_extractor import LibraryAnalyzer
 import logging
 from analyzer_base import MLAnalyzerBase
+from components.record_buffer import RecordBuffer
+from components.static_analysis.library_dictionary import get_library_dictionary
 
 logging.basicConfig(level = logging.DEBUG)
 class MLConsumerAnalyzer(MLAnalyzerBase):
-    def __init__(self, output_folder="Consumers/"):
-        super().__init__(output_folder, analysis_type="Consumer")
+    def __init__(self, output_folder="Consumers/", known_training_files=None, cache=None, mmap_threshold=None,
+                 path_filter=None, projects=None):
+        super().__init__(output_folder, analysis_type="Consumer", cache=cache, mmap_threshold=mmap_threshold,
+                         path_filter=path_filter, projects=projects)
+        # File gia' riconosciuti come training dal passo producer (vedi MLProducerAnalyzer.training_files)
+        self.known_training_files = known_training_files if known_training_files is not None else set()
         self.init_analysis_folder()
 
-    def check_training_method(self, file, producer_library):
-        library_analyzer = LibraryAnalyzer(file)
+    def check_training_method(self, file, producer_library, source=None):
+        if file in self.known_training_files:
+            return True
+
+        if source is None:
+            source = self.load_source(file)
+            if source is None:
+                return False
 
         # Implementazione specifica consumer
-        producer_library_dict = self.load_library_dict(producer_library)
-        producer_related_dict = library_analyzer.check_ml_library_usage(producer_library_dict, True)
-        producer_keywords = producer_related_dict['Keyword'].tolist()
-        producer_library_dict_list = producer_related_dict['library'].tolist()
+        producer_dictionary = get_library_dictionary(producer_library)
+        producer_library_dict_list = producer_dictionary.libraries_in(source.imports)
 
         if len(producer_library_dict_list) == 0:
             return False
+        producer_keywords = producer_dictionary.keywords_for(producer_library_dict_list)
 
-        with open(file, "r", encoding="utf-8") as f:
-            file_content = f.read()
-            for keyword in producer_keywords:
-                if keyword in file_content:
-                    return True
-            return False
+        for keyword in producer_keywords:
+            if source.contains(keyword):
+                return True
+        return False
 
-    def check_for_inference_method(self, file, consumer_library, producer_library, rules_3):
+    def check_for_inference_method(self, file, consumer_library, producer_library, rules_3, source=None):
         list_keywords = []
         list_load_keywords = []
-        library_analyzer = LibraryAnalyzer(file)
+        # Il file e' letto una sola volta: lo stesso buffer serve per import, keyword e regola 3
+        if source is None:
+            source = self.load_source(file)
+            if source is None:
+                return [], list_keywords, list_load_keywords
 
-        consumer_library_dict = self.load_library_dict(consumer_library)
-        consumer_related_dict = library_analyzer.check_ml_library_usage(consumer_library_dict, True)
-        consumer_keywords = consumer_related_dict['Keyword'].tolist()
-        consumer_library_dict_list = consumer_related_dict['library'].tolist()
-
-        flag = False
+        matcher = self.get_keyword_matcher(consumer_library)
+        # Librerie del dizionario importate dal file, senza costruire un DataFrame per file
+        consumer_library_dict_list = get_library_dictionary(consumer_library).libraries_in(
+            self.extract_imports(source))
 
         if len(consumer_library_dict_list) != 0:
-            try:
-                with open(file, "r", encoding="utf-8") as f:
-                    line_number = 0
-                    for line in f:
-                        line_number += 1
-                        for keyword in consumer_keywords:
-                            pattern = self.build_regex_pattern(keyword)
-                            if re.search(pattern, line):
-                                if rules_3:
-                                    if self.check_training_method(file, producer_library):
-                                        flag = False
-                                    else:
-                                        flag = True
-                                else:
-                                    flag = True
-
-                            if flag:
-                                keyword_clean = keyword.replace("\\", "")
-                                related_match = consumer_related_dict[consumer_related_dict['Keyword'] == keyword]
-
-                                found_result = {
-                                    'keyword': keyword_clean,
-                                    'library': related_match['library'].values[0],
-                                    'file': file,
-                                    'line': line.strip(),
-                                    'line_number': line_number
-                                }
-                                list_keywords.append(found_result)
-                                flag = False
-            except (UnicodeDecodeError, FileNotFoundError) as e:
-                logging.warning(f"Error reading file {file}: {e}")
+            hits = self.scan_keywords(matcher, source, consumer_library_dict_list)
+            # Regola 3: se il file addestra un modello nessun hit viene riportato
+            if hits and rules_3 and self.check_training_method(file, producer_library, source):
                 return consumer_library_dict_list, list_keywords, list_load_keywords
 
+            for hit in hits:
+                # Nei notebook la riga e' relativa alla cella di codice
+                cell, line_number = source.locate(hit.line_number)
+                found_result = {
+                    'keyword': hit.keyword,
+                    'library': hit.library,
+                    'file': file,
+                    'line': hit.line.strip(),
+                    'line_number': line_number
+                }
+                if cell is not None:
+                    found_result['cell'] = cell
+                list_keywords.append(found_result)
+
         return consumer_library_dict_list, list_keywords, list_load_keywords
 
     def analyze_single_file(self, file, repo, consumer_library, producer_library, rules_3):
@@ -83,56 +79,69 @@ class MLConsumerAnalyzer(MLAnalyzerBase):
         list_load_keywords = []
         libraries = []
         if file:
-            libraries, keywords, list_load_keywords = self.check_for_inference_method(file, consumer_library, producer_library, rules_3)
+            source = self.load_source(file)
+            if source is None:
+                return libraries, keywords, list_load_keywords, file
+            # Con la regola 3 il risultato dipende anche dal dizionario producer
+            dictionary = get_library_dictionary(consumer_library)
+            key_parts = [dictionary.version, f"rules_3={rules_3}"]
+            if rules_3:
+                key_parts.append(get_library_dictionary(producer_library).version)
+            with source:
+                # Prefiltro: senza import di librerie del dizionario il file non viene decodificato ne' analizzato
+                if not self.passes_prefilter(source, dictionary):
+                    return libraries, keywords, list_load_keywords, file
+                libraries, keywords, list_load_keywords = self.cached_file_analysis(
+                    source, key_parts,
+                    lambda: self.check_for_inference_method(file, consumer_library, producer_library, rules_3,
+                                                            source))
+            self.metrics.count("hits", len(keywords))
             if len(keywords) > 0:
                 logging.info(f"Found {file} with ML libraries {libraries} and training instruction {keywords} in {repo}")
             return libraries, keywords, list_load_keywords, file
         return libraries, keywords, list_load_keywords, file
 
     def analyze_project_for_consumers(self, repo_contents, project, in_dir, consumer_library, producer_library, rules_3, rules_4):
-        df = pd.DataFrame(columns=['ProjectName', 'Is ML consumer', 'libraries', "where", "keywords", 'line_number'])
+        records = RecordBuffer(['ProjectName', 'Is ML consumer', 'libraries', "where", "keywords", 'line_number',
+                                'cell'],
+                               constants={'ProjectName': f'{project}/{in_dir}', 'Is ML consumer': 'Yes'})
         
-        # Count total files first
-        total_files = sum(1 for root, dirs, files in os.walk(repo_contents) 
-                         for file in files if file.endswith(('.py', '.ipynb')))
+        # Un solo attraversamento del progetto, usato sia per il progresso che per l'analisi
+        start = time.perf_counter()
+        manifest = self.discover_files(repo_contents)
+        total_files = len(manifest)
         print(f"    [ConsumerAnalyzer] Found {total_files} Python/Notebook files to analyze")
         
         file_count = 0
-        for root, dirs, files in os.walk(repo_contents):
-            for file in files:
-                if file.endswith(('.py', '.ipynb')):
-                    file_count += 1
-                    if file_count % 10 == 0:  # Progress every 10 files
-                        print(f"    [ConsumerAnalyzer] Progress: {file_count}/{total_files} files analyzed")
-                    
-                    if rules_4 and re.search(r"test|example|eval|validat", file, re.IGNORECASE):
-                        continue
-                    file_path = os.path.join(root, file)
-                    libraries, keywords, list_load_keywords, file_path = self.analyze_single_file(
-                        file_path, repo_contents, consumer_library, producer_library, rules_3)
-                    if keywords:
-                        for keyword in keywords:
-                            df = pd.concat([
-                                df,
-                                pd.DataFrame({
-                                    'ProjectName': f'{project}/{in_dir}',
-                                    'Is ML consumer': 'Yes',
-                                    'libraries': keyword['library'],
-                                    'where': file_path,
-                                    'keywords': keyword['keyword'],
-                                    'line_number': keyword['line_number']
-                                }, index=[0])
-                            ], ignore_index=True)
-
-        output_file = os.path.join(self.output_folder, f'{project}_{in_dir}_ml_consumer.csv')
-        if not df.empty:
-            df.to_csv(output_file, index=False)
+        for root, file, names in manifest:
+            file_count += 1
+            if file_count % 10 == 0:  # Progress every 10 files
+                print(f"    [ConsumerAnalyzer] Progress: {file_count}/{total_files} files analyzed")
+            
+            if rules_4 and re.search(r"test|example|eval|validat", file, re.IGNORECASE):
+                continue
+            if self.is_converted_notebook(root, file, names):
+                continue
+            file_path = os.path.join(root, file)
+            libraries, keywords, list_load_keywords, file_path = self.analyze_single_file(
+                file_path, repo_contents, consumer_library, producer_library, rules_3)
+            for keyword in keywords:
+                records.append(libraries=keyword['library'], where=file_path,
+                               keywords=keyword['keyword'], line_number=keyword['line_number'],
+                               cell=keyword.get('cell', ''))
+
+        self.commit_cache()
+        with self.metrics.stage("output_writing"):
+            df = records.to_frame()
+            output_file = os.path.join(self.output_folder, f'{project}_{in_dir}_ml_consumer.csv')
+            if not df.empty:
+                df.to_csv(output_file, index=False)
+        self.metrics.record_project(f'{project}/{in_dir}', time.perf_counter() - start, total_files)
         return df
 
-    def analyze_projects_set_for_consumers(self, input_folder, consumer_library, producer_library, rules_3, rules_4):
-        df = pd.read_csv(self.results_file)
-        
-        projects = [p for p in os.listdir(input_folder) if os.path.isdir(os.path.join(input_folder, p))]
+    def _iter_project_tasks(self, input_folder, consumer_library, producer_library, rules_3, rules_4, completed):
+        projects = [p for p in os.listdir(input_folder)
+                    if os.path.isdir(os.path.join(input_folder, p)) and self.in_scope(p)]
         print(f"\n[ConsumerAnalyzer] Found {len(projects)} projects to analyze in: {input_folder}")
         
         project_count = 0
@@ -143,15 +152,27 @@ class MLConsumerAnalyzer(MLAnalyzerBase):
             subdirs = os.listdir(os.path.join(input_folder, project))
             for dir in subdirs:
                 logging.info(f"Project: {project}")
-                if os.path.isdir(os.path.join(input_folder, project, dir)):
+                if os.path.isdir(os.path.join(input_folder, project, dir)) and self.in_scope(project, dir):
+                    if self.baseline_check(project, dir, completed):
+                        continue
                     print(f"  [ConsumerAnalyzer] Analyzing subdirectory: {dir}")
-                    new_df = self.analyze_project_for_consumers(
-                        os.path.join(input_folder, project, dir),
-                        project,
-                        dir,
-                        consumer_library, producer_library, rules_3, rules_4
-                    )
-                    df = pd.concat([df, new_df], ignore_index=True)
-                    df.to_csv(self.results_file, index=False)
-
-        return df
\ No newline at end of file
+                    yield (os.path.join(input_folder, project, dir), project, dir,
+                           consumer_library, producer_library, rules_3, rules_4)
+
+    def analyze_projects_set_for_consumers(self, input_folder, consumer_library, producer_library, rules_3, rules_4, workers=1):
+        """
+        Analyze every project/dir of input_folder not yet recorded in the results.
+
+        The rows of each project are appended to results_consumer.csv as soon as it is
+        analyzed and not kept in memory; returns the number of projects analyzed.
+        """
+        analyzed = 0
+        with self.open_results_writer() as writer:
+            tasks = self._iter_project_tasks(input_folder, consumer_library, producer_library, rules_3, rules_4,
+                                             writer.completed)
+            for task, new_df in self.map_projects('analyze_project_for_consumers', tasks, workers):
+                _, project, dir = task[:3]
+                with self.metrics.stage("output_writing"):
+                    writer.write(f'{project}/{dir}', new_df)
+                analyzed += 1
+        return analyzed
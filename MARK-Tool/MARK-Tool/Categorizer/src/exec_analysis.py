@@ -1,16 +1,56 @@
 import os
+import sys
 import argparse
+import contextlib
 from consumer_classifier_by_dict import MLConsumerAnalyzer
 from producer_classifier_by_dict import MLProducerAnalyzer
 from components.notebook_converter import NotebookConverter
+from components.analysis_cache import AnalysisCache
+from components.path_filter import PathFilter
+from components.analysis_metrics import write_metrics
+from components.profiler import AnalysisProfiler
+
+DEFAULT_MMAP_THRESHOLD_MB = 16
+
+
+def non_negative_float(value):
+    """argparse type of the size options, which must be >= 0."""
+    number = float(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"expected a value >= 0, got {value}")
+    return number
 
 
 class ExecAnalyzer:
-    def __init__(self, input_path=None, output_path=None):
+    def __init__(self, input_path=None, output_path=None, workers=1, cache_dir=None,
+                 mmap_threshold_mb=DEFAULT_MMAP_THRESHOLD_MB, path_filter=None, metrics_path=None,
+                 metrics_format="jsonl", profile=False, projects=None):
         script_dir = os.path.dirname(os.path.abspath(__file__))
         self.script_dir = script_dir
         self.input_path = input_path or os.path.join(script_dir, "..", "..", "repos")
         self.output_path = output_path or script_dir
+        self.workers = max(1, workers or 1)
+        # Cartella della cache persistente dei risultati per file (disabilitata se None)
+        self.cache_dir = cache_dir
+        # I file piu' grandi della soglia sono analizzati via mmap (0 disabilita)
+        self.mmap_threshold = int(mmap_threshold_mb * 1024 * 1024) if mmap_threshold_mb and mmap_threshold_mb > 0 \
+            else None
+        # Directory escluse dall'attraversamento dei progetti (default: VCS, virtualenv, dipendenze, build)
+        self.path_filter = path_filter or PathFilter()
+        # File delle metriche per fase (JSON lines o testo Prometheus); disabilitato se None
+        self.metrics_path = metrics_path
+        self.metrics_format = metrics_format
+        # AnalysisMetrics per tipo di analisi dell'ultima esecuzione
+        self.metrics = {}
+        # Profila i passi producer e consumer (vedi AnalysisProfiler)
+        self.profile = profile
+        if profile and self.workers > 1:
+            # Il profiler campiona solo il processo principale: con piu' worker il profilo sarebbe vuoto
+            print(f"Note: --profile only profiles the main process, running with 1 worker instead of "
+                  f"{self.workers}.")
+            self.workers = 1
+        # Progetti "owner/repo" da analizzare (tutti se None), es. quelli appena clonati dalla pipeline web
+        self.projects = projects
 
     def run(self):
         import time
@@ -25,12 +65,49 @@ class ExecAnalyzer:
         print(f"Starting Analysis Process")
         print(f"Input path: {self.input_path}")
         print(f"Output path: {self.output_path}")
+        print(f"Workers: {self.workers}")
+        if self.cache_dir:
+            print(f"Cache dir: {self.cache_dir}")
         print(f"{'='*60}\n")
 
+        cache = AnalysisCache(os.path.join(self.cache_dir, "analysis_cache.sqlite")) if self.cache_dir else None
+
+        # Profilo opzionale dei due passi: .pstats e stack compressi (flamegraph) nella cartella di output
+        profiler = AnalysisProfiler(self.output_path) if self.profile else contextlib.nullcontext()
+        with profiler:
+            producer_analyzer = self.run_producers(cache)
+            analyzer = self.run_consumers(cache, producer_analyzer)
+
+        if cache is not None:
+            cache.close()
+
+        self.metrics = {"producer": producer_analyzer.metrics, "consumer": analyzer.metrics}
+        self.report_metrics(time.time() - start_time)
+
+    def report_metrics(self, run_seconds):
+        for analysis, metrics in self.metrics.items():
+            summary = metrics.summary()
+            counters = ", ".join(f"{name}={value}" for name, value in summary["counters"].items())
+            stages = ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in summary["stage_seconds"].items())
+            print(f"[METRICS] {analysis}: {counters}")
+            print(f"[METRICS] {analysis} stages: {stages}, projects={summary['projects']}")
+        if self.metrics_path:
+            write_metrics(self.metrics_path, self.metrics, self.metrics_format, run_seconds)
+            print(f"[METRICS] Written to: {self.metrics_path}")
+
+    @property
+    def producer_dict_path(self):
+        return os.path.join(self.script_dir, "library_dictionary", "library_dict_producers_2.csv")
+
+    @property
+    def consumer_dict_path(self):
+        return os.path.join(self.script_dir, "library_dictionary", "library_dict_consumers_2.csv")
+
+    def create_producer_analyzer(self, cache):
         # --- ML-Model Producers ---
         output_base_folder = os.path.join(self.output_path, "Producers")
         output_folder_producers = os.path.join(output_base_folder, "Producers_Final")
-        producer_dict_path = os.path.join(self.script_dir, "library_dictionary", "library_dict_producers_2.csv")
+        producer_dict_path = self.producer_dict_path
 
         os.makedirs(output_folder_producers, exist_ok=True)
 
@@ -40,13 +117,21 @@ class ExecAnalyzer:
 
         print(f"Analyzing Producers with dictionary: {producer_dict_path}")
         print(f"Results will be written to: {output_folder_producers}")
-        analyzer = MLProducerAnalyzer(output_folder=output_folder_producers)
-        analyzer.analyze_projects_set_for_producers(self.input_path, producer_dict_path)
+        return MLProducerAnalyzer(output_folder=output_folder_producers, cache=cache,
+                                  mmap_threshold=self.mmap_threshold, path_filter=self.path_filter,
+                                  projects=self.projects)
+
+    def run_producers(self, cache):
+        producer_analyzer = self.create_producer_analyzer(cache)
+        producer_analyzer.analyze_projects_set_for_producers(self.input_path, self.producer_dict_path,
+                                                             workers=self.workers)
+        return producer_analyzer
 
+    def create_consumer_analyzer(self, cache, producer_analyzer):
         # --- ML-Model Consumers ---
         output_base_folder = os.path.join(self.output_path, "Consumers")
         output_folder_consumers = os.path.join(output_base_folder, "Consumers_Final")
-        consumer_dict_path = os.path.join(self.script_dir, "library_dictionary", "library_dict_consumers_2.csv")
+        consumer_dict_path = self.consumer_dict_path
 
         os.makedirs(output_folder_consumers, exist_ok=True)
 
@@ -59,14 +144,74 @@ class ExecAnalyzer:
         print("Rules_3 is set to: True")
         print("Rules_4 is set to: True")
 
-        analyzer = MLConsumerAnalyzer(output_folder=output_folder_consumers)
+        # I file producer gia' individuati non vengono riletti per la regola 3
+        return MLConsumerAnalyzer(output_folder=output_folder_consumers,
+                                  known_training_files=producer_analyzer.training_files,
+                                  cache=cache,
+                                  mmap_threshold=self.mmap_threshold,
+                                  path_filter=self.path_filter,
+                                  projects=self.projects)
+
+    def run_consumers(self, cache, producer_analyzer):
+        analyzer = self.create_consumer_analyzer(cache, producer_analyzer)
+        # Il dizionario producer e' usato dalla regola 3
         analyzer.analyze_projects_set_for_consumers(
             self.input_path,
-            consumer_dict_path,
-            producer_dict_path,
+            self.consumer_dict_path,
+            self.producer_dict_path,
             rules_3=True,
-            rules_4=True
+            rules_4=True,
+            workers=self.workers
         )
+        return analyzer
+
+    def run_batches(self, batches):
+        """
+        Analyze batches of "owner/repo" names as they arrive, e.g. one per line of stdin.
+
+        The analyzers, the cache and the results writers stay open for the
+        whole run, so every batch costs only the analysis of its projects.
+        Used by the clone-and-analyze pipeline of the web API, which reads
+        the protocol lines: one "[ANALYZED] owner/repo" line per project
+        already in the results, then "[READY]", then "[BATCH DONE] <count>"
+        after each batch.
+        """
+        import time
+        start_time = time.time()
+        # Nessun progetto finche' non arriva il primo lotto (e nessun backup dei risultati)
+        self.projects = ()
+        cache = AnalysisCache(os.path.join(self.cache_dir, "analysis_cache.sqlite")) if self.cache_dir else None
+
+        profiler = AnalysisProfiler(self.output_path) if self.profile else contextlib.nullcontext()
+        with profiler:
+            producer_analyzer = self.create_producer_analyzer(cache)
+            analyzer = self.create_consumer_analyzer(cache, producer_analyzer)
+            with producer_analyzer.hold_results_writer() as producers, analyzer.hold_results_writer() as consumers:
+                for project in sorted(producers.completed & consumers.completed):
+                    print(f"[ANALYZED] {project}")
+                print("[READY]", flush=True)
+
+                for batch in batches:
+                    if not batch:
+                        continue
+                    producer_analyzer.projects = analyzer.projects = frozenset(batch)
+                    # La regola 3 usa solo i file training dei progetti del lotto
+                    producer_analyzer.training_files.clear()
+                    producer_analyzer.analyze_projects_set_for_producers(self.input_path, self.producer_dict_path,
+                                                                         workers=self.workers)
+                    analyzer.analyze_projects_set_for_consumers(self.input_path, self.consumer_dict_path,
+                                                                self.producer_dict_path, rules_3=True,
+                                                                rules_4=True, workers=self.workers)
+                    # I repository del lotto possono essere cancellati subito dopo: i risultati vanno su disco
+                    producers.sync()
+                    consumers.sync()
+                    print(f"[BATCH DONE] {len(batch)}", flush=True)
+
+        if cache is not None:
+            cache.close()
+
+        self.metrics = {"producer": producer_analyzer.metrics, "consumer": analyzer.metrics}
+        self.report_metrics(time.time() - start_time)
 
     # Metodo per API web
     def run_async(self):
@@ -85,26 +230,62 @@ if __name__ == "__main__":
                         help="Path to the input directory containing project repositories.")
     parser.add_argument("--output_path", type=str, default=script_dir,
                         help="Path to the output directory to store analysis results.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes used to analyze the projects in parallel.")
+    parser.add_argument("--cache_dir", type=str, default=None,
+                        help="Directory of the persistent per-file analysis cache (disabled by default).")
+    parser.add_argument("--mmap_threshold", type=non_negative_float, default=DEFAULT_MMAP_THRESHOLD_MB,
+                        help="Size in MB above which source files are scanned through mmap (0 disables).")
+    parser.add_argument("--convert_notebooks", action="store_true",
+                        help="Also write a .py script next to every notebook before the analysis.")
+    parser.add_argument("--metrics", type=str, default=None, metavar="PATH",
+                        help="Write per-stage counters and timings of the run to PATH.")
+    parser.add_argument("--metrics_format", choices=["jsonl", "prometheus"], default="jsonl",
+                        help="Format of --metrics: appended JSON lines or a Prometheus text file.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile the producer and consumer passes: writes a .pstats and a collapsed-stack "
+                             "(flamegraph) file into the output path.")
+    parser.add_argument("--projects", nargs="+", default=None, metavar="OWNER/REPO",
+                        help="Analyze only these repositories of the input path (results are appended).")
+    parser.add_argument("--projects_from_stdin", action="store_true",
+                        help="Keep running and analyze the OWNER/REPO names read from stdin, one "
+                             "whitespace-separated batch per line (used by the clone-and-analyze pipeline).")
+    parser.add_argument("--ignore", action="append", default=[], metavar="PATTERN",
+                        help="Glob of files or directories to skip while walking the projects (repeatable).")
+    parser.add_argument("--no_default_ignores", action="store_true",
+                        help="Do not skip VCS, virtualenv, dependency and build directories by default.")
+    parser.add_argument("--gitignore", action="store_true",
+                        help="Also skip the paths ignored by the .gitignore files of the projects.")
 
     args = parser.parse_args()
+    path_filter = PathFilter(ignore=args.ignore, use_defaults=not args.no_default_ignores,
+                             use_gitignore=args.gitignore)
     print(f"Starting ablation analysis with input path: {args.input_path} and output path: {args.output_path}")
 
-    # Aggiunta esecuzione processo di conversione dei file . in .py
+    # Conversione opzionale dei notebook in .py: l'analisi legge direttamente le celle dei .ipynb
     import time
-    print(f"\n{'='*60}")
-    print("Step 1: Converting Jupyter Notebooks to Python files")
-    print(f"{'='*60}")
-    conv_start = time.time()
-    converter = NotebookConverter()
-    converter.run()
-    conv_end = time.time()
-    print(f"\n[TIMING] Notebook conversion took: {conv_end - conv_start:.2f} seconds")
-    
+    if args.convert_notebooks:
+        print(f"\n{'='*60}")
+        print("Step 1: Converting Jupyter Notebooks to Python files")
+        print(f"{'='*60}")
+        conv_start = time.time()
+        # Stessa cartella dell'analisi; i notebook gia' convertiti e non modificati sono saltati
+        converter = NotebookConverter(args.input_path, workers=args.workers, path_filter=path_filter)
+        converter.run()
+        conv_end = time.time()
+        print(f"\n[TIMING] Notebook conversion took: {conv_end - conv_start:.2f} seconds")
+
     print(f"\n{'='*60}")
     print("Step 2: Starting Project Analysis")
     print(f"{'='*60}\n")
-    analyzer = ExecAnalyzer(input_path=args.input_path, output_path=args.output_path)
+    analyzer = ExecAnalyzer(input_path=args.input_path, output_path=args.output_path, workers=args.workers,
+                            cache_dir=args.cache_dir, mmap_threshold_mb=args.mmap_threshold,
+                            path_filter=path_filter, metrics_path=args.metrics,
+                            metrics_format=args.metrics_format, profile=args.profile, projects=args.projects)
     analysis_start = time.time()
-    analyzer.run()
+    if args.projects_from_stdin:
+        analyzer.run_batches(line.split() for line in sys.stdin)
+    else:
+        analyzer.run()
     analysis_end = time.time()
     print(f"\n[TIMING] Total analysis took: {analysis_end - analysis_start:.2f} seconds")
@@ -1,73 +1,52 @@
 import os
-import pandas as pd
-import re
+import time
 import logging
 import warnings
-from components.static_analysis.library_extractor import LibraryAnalyzer
 from analyzer_base import MLAnalyzerBase
+from components.record_buffer import RecordBuffer
+from components.static_analysis.library_dictionary import get_library_dictionary
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 logging.basicConfig(level=logging.DEBUG)
 
 class MLProducerAnalyzer(MLAnalyzerBase):
-    def __init__(self, output_folder="Producers/"):
-        super().__init__(output_folder, analysis_type="Producer")
+    def __init__(self, output_folder="Producers/", cache=None, mmap_threshold=None, path_filter=None,
+                 projects=None):
+        super().__init__(output_folder, analysis_type="Producer", cache=cache, mmap_threshold=mmap_threshold,
+                         path_filter=path_filter, projects=projects)
+        # File con keyword di training (case-sensitive), riusati dalla regola 3 del consumer
+        self.training_files = set()
         self.init_analysis_folder()
 
-    def check_training_method(self, file, library_dict_path):
+    def check_training_method(self, file, library_dict_path, source=None):
         # Implementazione specifica producer
-        producer_library_dict = self.load_library_dict(library_dict_path)
+        producer_dictionary = get_library_dictionary(library_dict_path)
+        # I keyword producer sono confrontati letteralmente (senza spazi flessibili)
+        matcher = self.get_keyword_matcher(library_dict_path, flexible_whitespace=False)
         list_keywords = []
         list_load_keywords = []
-        library_analyzer = LibraryAnalyzer(file)
+        # Il file e' letto una sola volta: lo stesso buffer serve per import e keyword
+        if source is None:
+            source = self.load_source(file)
+            if source is None:
+                return [], list_keywords, list_load_keywords
 
-        producer_related_dict = library_analyzer.check_ml_library_usage(producer_library_dict)
-        producer_keywords = producer_related_dict['Keyword'].tolist()
-        producer_library_dict_list = producer_related_dict['library'].tolist()
-        flag = False
+        producer_library_dict_list = producer_dictionary.libraries_in(self.extract_imports(source))
         if len(producer_library_dict_list) != 0:
-            try:
-                with open(file, "r", encoding="utf-8") as f:
-                    line_number = 0
-                    for line in f:
-                        line_number += 1
-                        line.replace("(", "\(")
-                        for keyword in producer_keywords:
-                            # Build regex to handle spaces within keywords
-                            if '.' in str(keyword):
-                                keyword = keyword.replace('.', '\.')
-                            if '\s' in str(keyword):
-                                parts = keyword.split()
-                                regex = r'\s*'.join(parts)  # Allows optional spaces between parts of the keyword
-                                pattern = re.compile(regex, re.IGNORECASE)
-                            else:
-                                if '(' in str(keyword):
-                                    keyword = keyword.replace('(', '\(')
-                                pattern = re.compile(str(keyword), re.IGNORECASE)
-
-                            if re.search(pattern, line):
-                                flag = True
-                                keyword = keyword.replace("\\", "")
-
-                                related_match = producer_related_dict[producer_related_dict['Keyword'] == keyword]
-
-                                found_result = {
-                                    'keyword': keyword,
-                                    'library': related_match['library'].values[0],
-                                    'file': file,
-                                    'line': line.strip(),
-                                    'line_number': line_number
-                                }
-                                list_keywords.append(found_result)
-                            if flag:
-                                flag = False  # Reset flag for next iteration
-            except UnicodeDecodeError:
-                print(f"Error reading file {file}")
-                return producer_library_dict_list, list_keywords, list_load_keywords
-            except FileNotFoundError:
-                print(f"Error finding file {file}")
-                return producer_library_dict_list, list_keywords, list_load_keywords
+            for hit in self.scan_keywords(matcher, source, producer_library_dict_list):
+                # Nei notebook la riga e' relativa alla cella di codice
+                cell, line_number = source.locate(hit.line_number)
+                found_result = {
+                    'keyword': hit.keyword,
+                    'library': hit.library,
+                    'file': file,
+                    'line': hit.line.strip(),
+                    'line_number': line_number
+                }
+                if cell is not None:
+                    found_result['cell'] = cell
+                list_keywords.append(found_result)
 
         return producer_library_dict_list, list_keywords, list_load_keywords
 
@@ -75,7 +54,21 @@ class MLProducerAnalyzer(MLAnalyzerBase):
         keywords = []
         libraries = []
         if file:
-            libraries, keywords, list_load_keywords = self.check_training_method(file, library_dict_path)
+            source = self.load_source(file)
+            if source is None:
+                return libraries, keywords, file
+            dictionary = get_library_dictionary(library_dict_path)
+            with source:
+                # Prefiltro: senza import di librerie del dizionario il file non viene decodificato ne' analizzato
+                if not self.passes_prefilter(source, dictionary):
+                    return libraries, keywords, file
+                libraries, keywords, list_load_keywords = self.cached_file_analysis(
+                    source, [dictionary.version],
+                    lambda: self.check_training_method(file, library_dict_path, source))
+            self.metrics.count("hits", len(keywords))
+            # Keyword di training presente in forma esatta (case-sensitive)
+            if any(keyword['keyword'] in keyword['line'] for keyword in keywords):
+                self.training_files.add(file)
             if len(keywords) > 0:
                 print(f"Found {file} with ML libraries{libraries} and training instruction {keywords} in {repo}")
                 return libraries, keywords, file
@@ -83,49 +76,66 @@ class MLProducerAnalyzer(MLAnalyzerBase):
         return libraries, keywords, file
 
     def analyze_project_for_producers(self, repo_contents, project, dir, library_dict_path):
-        df = pd.DataFrame(columns=['ProjectName', 'Is ML producer', 'libraries', "where", "keywords", 'line_number'])
-        for root, dirs, files in os.walk(repo_contents):
-            for file in files:
-                if file.endswith(('.py','ipynb')):
-                    file_path = os.path.join(root, file)
-                    libraries, keywords, file_path = self.analyze_single_file(file_path, repo_contents, library_dict_path)
-                    if keywords:
-                        for keyword in keywords:
-                            df = pd.concat([
-                                df,
-                                pd.DataFrame({
-                                    'ProjectName': f'{project}/{dir}',
-                                    'Is ML producer': 'Yes',
-                                    'libraries': keyword['library'],
-                                    'where': file_path,
-                                    'keywords': keyword['keyword'],
-                                    'line_number': keyword['line_number']
-                                }, index=[0])
-                            ], ignore_index=True)
-        output_file = os.path.join(self.output_folder, f'{project}_{dir}_ml_producer.csv')
-        if not df.empty:
-            df.to_csv(output_file, index=False)
+        records = RecordBuffer(['ProjectName', 'Is ML producer', 'libraries', "where", "keywords", 'line_number',
+                                'cell'],
+                               constants={'ProjectName': f'{project}/{dir}', 'Is ML producer': 'Yes'})
+        start = time.perf_counter()
+        manifest = self.discover_files(repo_contents)
+        for root, file, names in manifest:
+            if self.is_converted_notebook(root, file, names):
+                continue
+            file_path = os.path.join(root, file)
+            libraries, keywords, file_path = self.analyze_single_file(file_path, repo_contents, library_dict_path)
+            for keyword in keywords:
+                records.append(libraries=keyword['library'], where=file_path,
+                               keywords=keyword['keyword'], line_number=keyword['line_number'],
+                               cell=keyword.get('cell', ''))
+        self.commit_cache()
+        with self.metrics.stage("output_writing"):
+            df = records.to_frame()
+            output_file = os.path.join(self.output_folder, f'{project}_{dir}_ml_producer.csv')
+            if not df.empty:
+                df.to_csv(output_file, index=False)
+        self.metrics.record_project(f'{project}/{dir}', time.perf_counter() - start, len(manifest))
         return df
 
-    def analyze_projects_set_for_producers(self, input_folder, library_dict_path):
-        results_file = os.path.join(self.output_folder, 'results_first_step.csv')
-        df = pd.read_csv(results_file)
+    def _analyze_project_in_worker(self, repo_contents, project, dir, library_dict_path):
+        # Nel worker i training_files sono restituiti al processo principale insieme ai risultati
+        self.training_files = set()
+        df = self.analyze_project_for_producers(repo_contents, project, dir, library_dict_path)
+        return df, self.training_files
 
+    def _iter_project_tasks(self, input_folder, library_dict_path, completed):
         for project in os.listdir(input_folder):
-            if not os.path.isdir(os.path.join(input_folder, project)):
+            if not os.path.isdir(os.path.join(input_folder, project)) or not self.in_scope(project):
                 continue
 
             for dir in os.listdir(os.path.join(input_folder, project)):
                 print("Project:", project)
-                if os.path.isdir(os.path.join(input_folder, project, dir)):
-                    if not self.baseline_check(project, dir, df):
-                        new_df = self.analyze_project_for_producers(
-                            os.path.join(input_folder, project, dir),
-                            project,
-                            dir,
-                            library_dict_path
-                        )
-                        df = pd.concat([df, new_df], ignore_index=True)
-                        df.to_csv(results_file, index=False)
+                if os.path.isdir(os.path.join(input_folder, project, dir)) and self.in_scope(project, dir):
+                    if not self.baseline_check(project, dir, completed):
+                        yield os.path.join(input_folder, project, dir), project, dir, library_dict_path
 
-        return df
+    def analyze_projects_set_for_producers(self, input_folder, library_dict_path, workers=1):
+        """
+        Analyze every project/dir of input_folder not yet recorded in the results.
+
+        The rows of each project are appended to results_first_step.csv as soon as it is
+        analyzed and not kept in memory; returns the number of projects analyzed.
+        """
+        analyzed = 0
+        with self.open_results_writer() as writer:
+            tasks = self._iter_project_tasks(input_folder, library_dict_path, writer.completed)
+            if workers > 1:
+                results = self.map_projects('_analyze_project_in_worker', tasks, workers)
+            else:
+                results = ((task, (new_df, None))
+                           for task, new_df in self.map_projects('analyze_project_for_producers', tasks))
+
+            for (_, project, dir, _), (new_df, training_files) in results:
+                if training_files:
+                    self.training_files.update(training_files)
+                with self.metrics.stage("output_writing"):
+                    writer.write(f'{project}/{dir}', new_df)
+                analyzed += 1
+        return analyzed
@@ -0,0 +1 @@
+# Benchmarks of the Categorizer hot paths
@@ -0,0 +1,70 @@
+"""
+Benchmarks of the Categorizer hot paths on synthetic repositories
+"""
+import os
+import shutil
+
+import pytest
+
+from components.static_analysis.library_extractor import LibraryAnalyzer
+from consumer_classifier_by_dict import MLConsumerAnalyzer
+from exec_analysis import ExecAnalyzer
+from producer_classifier_by_dict import MLProducerAnalyzer
+from synthetic_repos import CONSUMER_DICT, PRODUCER_DICT
+
+# I file generati piu' grandi di questa soglia sono misurati a parte (bench_large_file_scan)
+LARGE_FILE_BYTES = 1024 * 1024
+
+
+def _small_files(files):
+    return [path for path in files if os.path.getsize(path) < LARGE_FILE_BYTES]
+
+
+def _large_files(files):
+    return [path for path in files if os.path.getsize(path) >= LARGE_FILE_BYTES]
+
+
+class BenchFileAnalysis:
+    """Per-file analysis functions, over every source file of the synthetic repositories"""
+
+    def bench_get_libraries(self, benchmark, synthetic_repos):
+        sources = []
+        for path in _small_files(synthetic_repos[1]):
+            with open(path, encoding='utf-8') as f:
+                sources.append((path, f.read()))
+        benchmark(lambda: [LibraryAnalyzer(path, source).get_libraries() for path, source in sources])
+
+    def bench_producer_check_training_method(self, benchmark, synthetic_repos, tmp_path):
+        analyzer = MLProducerAnalyzer(output_folder=str(tmp_path))
+        files = _small_files(synthetic_repos[1])
+        benchmark(lambda: [analyzer.check_training_method(path, PRODUCER_DICT) for path in files])
+
+    def bench_consumer_check_for_inference_method(self, benchmark, synthetic_repos, tmp_path):
+        analyzer = MLConsumerAnalyzer(output_folder=str(tmp_path))
+        files = _small_files(synthetic_repos[1])
+        benchmark(lambda: [analyzer.check_for_inference_method(path, CONSUMER_DICT, PRODUCER_DICT, True)
+                           for path in files])
+
+    def bench_large_file_scan(self, benchmark, synthetic_repos, tmp_path):
+        analyzer = MLProducerAnalyzer(output_folder=str(tmp_path), mmap_threshold=LARGE_FILE_BYTES)
+        files = _large_files(synthetic_repos[1])
+        if not files:
+            pytest.skip("no large files generated")
+        benchmark(lambda: [analyzer.analyze_single_file(path, '', PRODUCER_DICT) for path in files])
+
+
+class BenchEndToEnd:
+    """Complete producer + consumer analysis of the synthetic repositories"""
+
+    def bench_exec_analyzer_run(self, benchmark, synthetic_repos, tmp_path):
+        input_folder = synthetic_repos[0]
+        output_path = str(tmp_path / 'out')
+
+        def setup():
+            # I progetti gia' presenti nei risultati verrebbero saltati: ogni round parte da zero
+            shutil.rmtree(output_path, ignore_errors=True)
+            os.makedirs(output_path)
+
+        analyzer = ExecAnalyzer(input_path=input_folder, output_path=output_path)
+        benchmark.pedantic(analyzer.run, setup=setup, rounds=3, iterations=1)
+        assert os.path.exists(os.path.join(output_path, 'Producers', 'Producers_Final', 'results_first_step.csv'))
@@ -0,0 +1,61 @@
+"""
+Pytest configuration for the Categorizer benchmarks
+"""
+import os
+import sys
+
+import pytest
+
+# I moduli del Categorizer usano import relativi a Categorizer/src
+CATEGORIZER_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src'))
+if CATEGORIZER_SRC not in sys.path:
+    sys.path.insert(0, CATEGORIZER_SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_repos import SyntheticRepoGenerator  # noqa: E402
+
+# Baseline salvate nel repository, usate da --benchmark-compare
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-scale", type=int, default=1,
+                     help="Multiplier of the number of synthetic projects (baselines are stored for scale 1).")
+    parser.addoption("--bench-seed", type=int, default=0, help="Seed of the synthetic repositories.")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Senza pytest-benchmark l'opzione non esiste e i moduli bench_* vengono saltati
+    if getattr(config.option, "benchmark_storage", None) == "file://./.benchmarks":
+        config.option.benchmark_storage = "file://" + BASELINES
+
+
+def pytest_collection_modifyitems(config, items):
+    if not config.pluginmanager.hasplugin("benchmark"):
+        skip = pytest.mark.skip(reason="pytest-benchmark is not installed (see requirements-bench.txt)")
+        for item in items:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def bench_scale(request):
+    return request.config.getoption("--bench-scale")
+
+
+@pytest.fixture(scope="session")
+def synthetic_repos(request, tmp_path_factory, bench_scale):
+    """Input folder with the generated repositories and the list of their source files."""
+    input_folder = str(tmp_path_factory.mktemp("repos"))
+    generator = SyntheticRepoGenerator(scale=bench_scale, seed=request.config.getoption("--bench-seed"))
+    generator.generate(input_folder)
+    files = sorted(os.path.join(root, name) for root, _, names in os.walk(input_folder)
+                   for name in names if name.endswith(('.py', '.ipynb')) and 'site-packages' not in root)
+    return input_folder, files
+
+
+@pytest.fixture(autouse=True)
+def _record_scale(request, bench_scale):
+    # La scala e' salvata con i risultati, per confrontare solo esecuzioni omogenee
+    if "benchmark" in request.fixturenames:
+        request.getfixturevalue("benchmark").extra_info["scale"] = bench_scale
@@ -0,0 +1,130 @@
+"""
+Deterministic generator of synthetic repositories for the Categorizer benchmarks
+"""
+import csv
+import json
+import os
+import random
+
+DICTIONARY_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src',
+                                              'library_dictionary'))
+PRODUCER_DICT = os.path.join(DICTIONARY_DIR, 'library_dict_producers_2.csv')
+CONSUMER_DICT = os.path.join(DICTIONARY_DIR, 'library_dict_consumers_2.csv')
+
+# Righe generiche senza import ML: la maggior parte dei file di un repository reale
+FILLER_LINES = [
+    "    value = compute(index, step)\n",
+    "    result.append(item.strip())\n",
+    "    if not path.exists():\n        return None\n",
+    "    logger.debug('processed %s', name)\n",
+    "    data = {key: value for key, value in pairs}\n",
+]
+IMPORT_TEMPLATES = ["import {library}\n", "from {library} import models\n", "import {library} as lib\n",
+                    "from {library}.utils import (helper,\n    other)\n"]
+
+
+def _read_dictionary(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [(row['library'], row['Keyword']) for row in csv.DictReader(f)]
+
+
+class SyntheticRepoGenerator:
+    """
+    Writes input_folder/<owner>/<repo> trees shaped like the cloned repositories.
+
+    Sizes are multiplied by scale. Every project mixes plain Python modules
+    (ml_ratio of them import a dictionary library and call its keywords),
+    notebooks, deep package trees, a vendored site-packages directory and,
+    optionally, large generated files.
+    """
+
+    def __init__(self, scale=1, seed=0, projects=4, files_per_project=60, ml_ratio=0.2, notebook_ratio=0.1,
+                 depth=6, large_files=1, large_file_mb=4):
+        self.scale = scale
+        self.projects = projects * scale
+        self.files_per_project = files_per_project
+        self.ml_ratio = ml_ratio
+        self.notebook_ratio = notebook_ratio
+        self.depth = depth
+        self.large_files = large_files
+        self.large_file_mb = large_file_mb
+        self.random = random.Random(seed)
+        self.entries = _read_dictionary(PRODUCER_DICT) + _read_dictionary(CONSUMER_DICT)
+        self.libraries = sorted({library for library, _ in self.entries if library.isidentifier()})
+
+    def _ml_lines(self, count):
+        libraries = self.random.sample(self.libraries, self.random.randint(1, 3))
+        lines = [self.random.choice(IMPORT_TEMPLATES).format(library=library) for library in libraries]
+        keywords = [keyword for library, keyword in self.entries if library in libraries]
+        lines.append("\n\ndef run(model, x, y):\n")
+        for _ in range(count):
+            if keywords and self.random.random() < 0.2:
+                lines.append(f"    out = model{self.random.choice(keywords)}x)\n")
+            else:
+                lines.append(self.random.choice(FILLER_LINES))
+        return lines
+
+    def _plain_lines(self, count):
+        lines = ["import os\nimport json\n\n\ndef run(index, step):\n"]
+        lines.extend(self.random.choice(FILLER_LINES) for _ in range(count))
+        return lines
+
+    def _write_module(self, path, lines):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+
+    def _write_notebook(self, path, lines):
+        half = len(lines) // 2
+        notebook = {
+            'cells': [
+                {'cell_type': 'markdown', 'metadata': {}, 'source': ['# Experiment\n']},
+                {'cell_type': 'code', 'execution_count': 1, 'metadata': {}, 'outputs': [], 'source': lines[:half]},
+                {'cell_type': 'code', 'execution_count': 2, 'metadata': {}, 'outputs': [], 'source': lines[half:]},
+            ],
+            'metadata': {}, 'nbformat': 4, 'nbformat_minor': 5,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(notebook, f, indent=1)
+
+    def _write_large_file(self, path):
+        # File generato (es. pesi o tabelle serializzate) con un solo uso ML in coda
+        row = "    0.125, 0.250, 0.375, 0.500, 0.625, 0.750, 0.875, 1.000,\n"
+        rows = self.large_file_mb * 1024 * 1024 // len(row)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("import torch\n\nWEIGHTS = [\n")
+            f.write(row * rows)
+            f.write("]\nmodel.load_state_dict(WEIGHTS)\nmodel.eval()\n")
+
+    def generate(self, input_folder):
+        """Write the repositories and return the list of the generated project directories."""
+        project_dirs = []
+        for index in range(self.projects):
+            project_dir = os.path.join(input_folder, f'owner{index}', f'repo{index}')
+            package_dirs = [project_dir]
+            deep = project_dir
+            for level in range(self.depth):
+                deep = os.path.join(deep, f'pkg{level}')
+                package_dirs.append(deep)
+            package_dirs.append(os.path.join(project_dir, 'notebooks'))
+            for path in package_dirs:
+                os.makedirs(path, exist_ok=True)
+
+            for number in range(self.files_per_project):
+                directory = self.random.choice(package_dirs)
+                count = self.random.randint(20, 200)
+                lines = self._ml_lines(count) if self.random.random() < self.ml_ratio else self._plain_lines(count)
+                name = self.random.choice(['train', 'model', 'infer', 'utils', 'data']) + f'_{number}'
+                if self.random.random() < self.notebook_ratio:
+                    self._write_notebook(os.path.join(directory, name + '.ipynb'), lines)
+                else:
+                    self._write_module(os.path.join(directory, name + '.py'), lines)
+
+            # Dipendenze vendorizzate, escluse dall'attraversamento
+            vendored = os.path.join(project_dir, 'venv', 'lib', 'site-packages', 'torch')
+            os.makedirs(vendored, exist_ok=True)
+            self._write_module(os.path.join(vendored, 'module.py'), self._ml_lines(100))
+
+            if index < self.large_files:
+                self._write_large_file(os.path.join(project_dir, 'generated_weights.py'))
+            project_dirs.append(project_dir)
+        return project_dirs
@@ -0,0 +1,10 @@
+"""
+Pytest configuration for the Categorizer component tests
+"""
+import os
+import sys
+
+# I moduli del Categorizer usano import relativi a Categorizer/src
+CATEGORIZER_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src'))
+if CATEGORIZER_SRC not in sys.path:
+    sys.path.insert(0, CATEGORIZER_SRC)
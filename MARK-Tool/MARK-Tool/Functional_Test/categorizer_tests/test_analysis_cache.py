@@ -0,0 +1,89 @@
+"""
+Unit tests for the persistent per-file analysis cache
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from components.analysis_cache import AnalysisCache
+from producer_classifier_by_dict import MLProducerAnalyzer
+
+PRODUCER_DICT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src',
+                                             'library_dictionary', 'library_dict_producers_2.csv'))
+
+
+class TestAnalysisCache(unittest.TestCase):
+    """Test cases for AnalysisCache and its use by the analyzers"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.test_dir, 'cache', 'analysis_cache.sqlite')
+        self.input_dir = os.path.join(self.test_dir, 'repos')
+        for project in ('owner0', 'owner1'):
+            project_dir = os.path.join(self.input_dir, project, 'repo')
+            os.makedirs(project_dir)
+            # Stesso contenuto in due progetti: la seconda copia e' servita dalla cache
+            with open(os.path.join(project_dir, 'train.py'), 'w', encoding='utf-8') as f:
+                f.write("from sklearn import svm\nclf.fit(X, y)\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _run(self, name):
+        output_dir = os.path.join(self.test_dir, name)
+        os.makedirs(output_dir)
+        cache = AnalysisCache(self.cache_path)
+        analyzer = MLProducerAnalyzer(output_folder=output_dir, cache=cache)
+        with mock.patch.object(analyzer, 'check_training_method',
+                               wraps=analyzer.check_training_method) as check:
+            analyzer.analyze_projects_set_for_producers(self.input_dir, PRODUCER_DICT)
+        cache.close()
+        with open(analyzer.results_file, encoding='utf-8') as f:
+            return f.read(), analyzer.training_files, check.call_count
+
+    def test_get_and_put_round_trip(self):
+        cache = AnalysisCache(self.cache_path)
+        key = cache.make_key('abc', 'Producer', 1)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, ['sklearn'], [{'keyword': 'fit(', 'line_number': 2}])
+        cache.close()
+
+        cache = AnalysisCache(self.cache_path)
+        self.assertEqual(cache.get(key), (['sklearn'], [{'keyword': 'fit(', 'line_number': 2}]))
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        cache.close()
+
+    def test_unchanged_files_are_not_scanned_again(self):
+        first, first_training, first_calls = self._run('out_first')
+        second, second_training, second_calls = self._run('out_second')
+
+        self.assertEqual(first_calls, 1)
+        self.assertEqual(second_calls, 0)
+        self.assertEqual(second, first)
+        self.assertEqual(second_training, first_training)
+        self.assertEqual(len(second_training), 2)
+        self.assertIn(os.path.join('owner1', 'repo', 'train.py'), second)
+
+    def test_same_bytes_as_script_and_notebook_are_cached_separately(self):
+        notebook = json.dumps({'cells': [{'cell_type': 'code', 'execution_count': 1, 'metadata': {}, 'outputs': [],
+                                          'source': 'from sklearn import svm\nclf.fit(X, y)\n'}],
+                               'metadata': {}, 'nbformat': 4, 'nbformat_minor': 5})
+        shutil.rmtree(self.input_dir)
+        project_dir = os.path.join(self.input_dir, 'owner', 'repo')
+        os.makedirs(project_dir)
+        # Lo stesso contenuto e' un notebook valido e uno script senza import (un dict letterale)
+        for name in ('a_train.py', 'b_train.ipynb'):
+            with open(os.path.join(project_dir, name), 'w', encoding='utf-8') as f:
+                f.write(notebook)
+
+        results, training_files, calls = self._run('out_kinds')
+        self.assertEqual(calls, 2)
+        self.assertEqual(training_files, {os.path.join(project_dir, 'b_train.ipynb')})
+        self.assertNotIn('a_train.py', results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Unit tests for the per-stage metrics of the analysis
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from components.analysis_metrics import AnalysisMetrics, format_prometheus, write_metrics
+from producer_classifier_by_dict import MLProducerAnalyzer
+
+PRODUCER_DICT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src',
+                                             'library_dictionary', 'library_dict_producers_2.csv'))
+
+
+class TestAnalysisMetrics(unittest.TestCase):
+    """Test cases for AnalysisMetrics and the metrics of MLProducerAnalyzer"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.test_dir, 'repos')
+        for index in range(2):
+            project_dir = os.path.join(self.input_dir, f'owner{index}', f'repo{index}')
+            os.makedirs(project_dir)
+            with open(os.path.join(project_dir, 'train.py'), 'w', encoding='utf-8') as f:
+                f.write("from sklearn import svm\nclf.fit(X, y)\nclf.fit(X2, y2)\n")
+            with open(os.path.join(project_dir, 'utils.py'), 'w', encoding='utf-8') as f:
+                f.write("import os\nmodel.fit(x)\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _analyze(self, workers):
+        output_dir = os.path.join(self.test_dir, f'out_{workers}')
+        os.makedirs(output_dir)
+        analyzer = MLProducerAnalyzer(output_folder=output_dir)
+        analyzer.analyze_projects_set_for_producers(self.input_dir, PRODUCER_DICT, workers=workers)
+        return analyzer.metrics
+
+    def test_counters_of_a_run(self):
+        metrics = self._analyze(1)
+        self.assertEqual(metrics.counters['files_discovered'], 4)
+        self.assertEqual(metrics.counters['files_prefiltered'], 2)
+        self.assertEqual(metrics.counters['files_analyzed'], 2)
+        self.assertEqual(metrics.counters['hits'], 4)
+        self.assertEqual(metrics.counters['lines_scanned'], 8)
+        self.assertEqual(sorted(project for project, _, _ in metrics.projects), ['owner0/repo0', 'owner1/repo1'])
+
+    def test_worker_metrics_are_merged(self):
+        self.assertEqual(self._analyze(2).counters, self._analyze(1).counters)
+
+    def test_emitted_formats(self):
+        metrics = AnalysisMetrics()
+        metrics.count('hits', 3)
+        metrics.record_project('owner/repo', 1.5, 10)
+        with metrics.stage('matching'):
+            pass
+
+        path = os.path.join(self.test_dir, 'metrics', 'run.jsonl')
+        write_metrics(path, {'producer': metrics}, run_seconds=2.0)
+        write_metrics(path, {'producer': metrics}, run_seconds=2.0)
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record['type'] for record in records], ['project', 'summary'] * 2)
+        self.assertEqual(records[1]['counters']['hits'], 3)
+        self.assertIn('matching', records[1]['stage_seconds'])
+
+        text = format_prometheus({'producer': metrics})
+        self.assertIn('mark_hits_total{analysis="producer"} 3', text)
+        self.assertIn('mark_project_seconds_count{analysis="producer"} 1', text)
+        self.assertEqual(text.count('# TYPE mark_hits_total counter'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
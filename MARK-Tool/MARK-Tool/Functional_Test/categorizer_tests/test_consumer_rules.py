@@ -0,0 +1,54 @@
+"""
+Unit tests for the rules_3 handling of MLConsumerAnalyzer
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from consumer_classifier_by_dict import MLConsumerAnalyzer
+
+DICT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src', 'library_dictionary')
+CONSUMER_DICT = os.path.abspath(os.path.join(DICT_DIR, 'library_dict_consumers_2.csv'))
+PRODUCER_DICT = os.path.abspath(os.path.join(DICT_DIR, 'library_dict_producers_2.csv'))
+
+
+class TestConsumerRules3(unittest.TestCase):
+    """Test cases for the per-file memoization of the rules_3 producer check"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.analyzer = MLConsumerAnalyzer(output_folder=self.test_dir)
+        self.file = os.path.join(self.test_dir, 'infer.py')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _write(self, content):
+        with open(self.file, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_producer_check_runs_once_per_file(self):
+        self._write("import keras\n" + "y = model.predict(x)\n" * 50)
+        with mock.patch.object(self.analyzer, 'check_training_method',
+                               wraps=self.analyzer.check_training_method) as check:
+            _, keywords, _ = self.analyzer.check_for_inference_method(
+                self.file, CONSUMER_DICT, PRODUCER_DICT, True)
+        self.assertEqual(check.call_count, 1)
+        self.assertEqual(len(keywords), 50)
+
+    def test_training_file_reports_no_hits(self):
+        self._write("import keras\nmodel.fit(x, y)\ny = model.predict(x)\n")
+        _, keywords, _ = self.analyzer.check_for_inference_method(
+            self.file, CONSUMER_DICT, PRODUCER_DICT, True)
+        self.assertEqual(keywords, [])
+
+    def test_known_training_files_skip_the_producer_check(self):
+        self._write("import keras\ny = model.predict(x)\n")
+        self.analyzer.known_training_files.add(self.file)
+        self.assertTrue(self.analyzer.check_training_method(self.file, PRODUCER_DICT))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Unit tests for the single-traversal file manifest of a project
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from components.analysis_cache import AnalysisCache
+from components.file_manifest import FileManifest, FileManifestRegistry
+
+
+class TestFileManifest(unittest.TestCase):
+    """Test cases for FileManifest and FileManifestRegistry"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.project = os.path.join(self.test_dir, 'owner', 'repo')
+        for rel_dir in ('', 'src', 'src/deep', 'node_modules/pkg', 'b', 'a'):
+            os.makedirs(os.path.join(self.project, rel_dir), exist_ok=True)
+            for name in ('x.py', 'nb.ipynb', 'README.md'):
+                with open(os.path.join(self.project, rel_dir, name), 'w', encoding='utf-8') as f:
+                    f.write('import os\n')
+        self._age_directories()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _age_directories(self):
+        # Directory modificate lontano dalla scansione: il manifest puo' essere riusato
+        old = time.time_ns() - 3600 * 10 ** 9
+        for root, _, _ in os.walk(self.project):
+            os.utime(root, ns=(old, old))
+
+    def _touch(self, *parts):
+        with open(os.path.join(self.project, *parts), 'w', encoding='utf-8') as f:
+            f.write('')
+
+    def test_files_follow_os_walk_order(self):
+        # node_modules e' escluso dalle regole di default di PathFilter
+        expected = [(root, file) for root, _, files in os.walk(self.project)
+                    for file in files if file.endswith(('.py', '.ipynb')) and 'node_modules' not in root]
+        manifest = FileManifest.scan(self.project)
+        self.assertEqual([(root, file) for root, file, _ in manifest], expected)
+        self.assertEqual(len(manifest), 10)
+
+    def test_new_file_invalidates_the_manifest(self):
+        manifest = FileManifest.scan(self.project)
+        self.assertTrue(manifest.is_valid())
+        self._touch('src', 'deep', 'new.py')
+        self.assertFalse(manifest.is_valid())
+
+    def test_directory_modified_in_the_scan_tick_is_not_trusted(self):
+        self._touch('src', 'racy.py')
+        manifest = FileManifest.scan(self.project)
+        # Mtime grossolano: un file aggiunto subito dopo la scansione lascia invariato l'mtime della directory
+        mtime = os.stat(os.path.join(self.project, 'src')).st_mtime_ns
+        self._touch('src', 'late.py')
+        os.utime(os.path.join(self.project, 'src'), ns=(mtime, mtime))
+        self.assertFalse(manifest.is_valid())
+
+        self._age_directories()
+        manifest = FileManifest.scan(self.project)
+        self.assertTrue(manifest.is_valid())
+        self.assertTrue(FileManifest.from_dict(self.project, manifest.to_dict()).is_valid())
+        # Manifest salvato da una versione precedente, senza l'istante della scansione
+        legacy = {'files': manifest.files, 'dirs': manifest.dir_mtimes}
+        self.assertFalse(FileManifest.from_dict(self.project, legacy).is_valid())
+
+    def test_manifest_is_reused_from_the_cache(self):
+        cache = AnalysisCache(os.path.join(self.test_dir, 'analysis_cache.sqlite'))
+        FileManifestRegistry().get(self.project, cache)
+        cache.commit()
+
+        # Nuovo processo (registry vuoto): il manifest arriva dalla cache senza riattraversare il progetto
+        registry = FileManifestRegistry()
+        with mock.patch.object(FileManifest, 'scan', wraps=FileManifest.scan) as scan:
+            self.assertEqual(len(registry.get(self.project, cache)), 10)
+            self.assertEqual(scan.call_count, 0)
+            self._touch('a', 'added.py')
+            self.assertEqual(len(registry.get(self.project, cache)), 11)
+            self.assertEqual(scan.call_count, 1)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Unit tests for KeywordMatcher
+"""
+import unittest
+
+from components.analysis_metrics import AnalysisMetrics
+from components.static_analysis.keyword_matcher import KeywordMatcher
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Test cases for the single-pass keyword matcher"""
+
+    def setUp(self):
+        self.entries = [
+            ('.fit(', 'sklearn'),
+            ('.fit(', 'keras'),
+            ('.fit_generator(', 'keras'),
+            ('def forward(', 'torch'),
+        ]
+        self.text = (
+            "import keras\n"
+            "model.FIT(x, y)\n"
+            "model.fit_generator(gen)\n"
+            "nothing here\n"
+            "def  forward(self, x):"
+        )
+
+    def test_scan_reports_keyword_library_and_line(self):
+        matcher = KeywordMatcher(self.entries)
+        hits = [(h.keyword, h.library, h.line_number) for h in matcher.scan(self.text, ['keras'])]
+        self.assertEqual(hits, [('.fit(', 'keras', 2), ('.fit_generator(', 'keras', 3)])
+
+    def test_duplicate_keywords_use_first_library(self):
+        matcher = KeywordMatcher(self.entries)
+        hits = [(h.keyword, h.library) for h in matcher.scan(self.text, ['sklearn', 'keras'])]
+        self.assertEqual(hits[:2], [('.fit(', 'sklearn'), ('.fit(', 'sklearn')])
+
+    def test_whitespace_handling(self):
+        flexible = KeywordMatcher(self.entries)
+        literal = KeywordMatcher(self.entries, flexible_whitespace=False)
+        self.assertEqual([h.line_number for h in flexible.scan(self.text, ['torch'])], [5])
+        self.assertEqual(literal.scan(self.text, ['torch']), [])
+
+    def test_scan_matches_line_iteration(self):
+        matcher = KeywordMatcher(self.entries)
+        lines = self.text.splitlines(keepends=True)
+        self.assertEqual(matcher.scan(self.text), list(matcher.iter_hits(lines)))
+
+    def test_lines_are_counted_during_the_scan(self):
+        matcher = KeywordMatcher(self.entries)
+        for text in (self.text, self.text + "\n", "x = 1\n" * 3, ""):
+            for libraries in (['keras'], ['torch'], ['sklearn']):
+                for buffer in (text, text.encode('utf-8')):
+                    metrics = AnalysisMetrics()
+                    matcher.scan(buffer, libraries, metrics=metrics)
+                    expected = text.count("\n") + 1 if text else 0
+                    self.assertEqual(metrics.counters['lines_scanned'], expected, (buffer, libraries))
+
+    def test_no_libraries_no_hits(self):
+        matcher = KeywordMatcher(self.entries)
+        self.assertEqual(matcher.scan(self.text, []), [])
+
+    def test_views_are_memoized_per_library_set(self):
+        matcher = KeywordMatcher(self.entries)
+        view = matcher.view(['keras', 'sklearn'])
+        self.assertIs(matcher.view(('sklearn', 'keras')), view)
+        self.assertEqual(view.first_library, {'.fit(': 'sklearn', '.fit_generator(': 'keras'})
+        # Solo i keyword delle librerie della vista selezionano le righe candidate
+        self.assertIsNone(view.combined.search('def forward(self):'))
+
+
+if __name__ == '__main__':
+    unittest.main()
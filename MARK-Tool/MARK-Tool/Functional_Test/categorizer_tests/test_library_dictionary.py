@@ -0,0 +1,58 @@
+"""
+Unit tests for the process-wide library dictionary registry
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from components.static_analysis.library_dictionary import LibraryDictionaryRegistry
+
+
+class TestLibraryDictionaryRegistry(unittest.TestCase):
+    """Test cases for LibraryDictionaryRegistry"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dict_path = os.path.join(self.test_dir, 'library_dict.csv')
+        self._write("library,Keyword,ML_Category,Link\n"
+                    "sklearn,.fit(,Producer,x\n"
+                    "keras,.fit(,Producer,x\n"
+                    "keras,.train_on_batch(,Producer,x\n")
+        self.registry = LibraryDictionaryRegistry()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _write(self, content, mtime=None):
+        with open(self.dict_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(self.dict_path, ns=(mtime, mtime))
+
+    def test_dictionary_is_parsed_once(self):
+        first = self.registry.get(self.dict_path)
+        self.assertIs(self.registry.get(self.dict_path), first)
+        self.assertIs(first.matcher(), first.matcher())
+
+    def test_indexes(self):
+        dictionary = self.registry.get(self.dict_path)
+        self.assertEqual(dictionary.library_keywords['keras'], ['.fit(', '.train_on_batch('])
+        self.assertEqual(dictionary.keywords_for(['keras']), ['.fit(', '.train_on_batch('])
+        self.assertEqual(dictionary.keywords_for(['keras', 'keras', 'sklearn', 'torch']),
+                         ['.fit(', '.train_on_batch(', '.fit('])
+        self.assertEqual(dictionary.libraries_in({'os', 'keras'}), ['keras', 'keras'])
+        self.assertEqual(dictionary.libraries_in({'keras', 'numpy'}), ['keras', 'keras'])
+        self.assertEqual(len(dictionary._imported_libraries), 1)
+
+    def test_reload_when_mtime_changes(self):
+        first = self.registry.get(self.dict_path)
+        self._write("library,Keyword,ML_Category,Link\ntorch,.backward(,Producer,x\n",
+                    mtime=first.mtime + 10 ** 9)
+        second = self.registry.get(self.dict_path)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.libraries, {'torch'})
+
+
+if __name__ == '__main__':
+    unittest.main()
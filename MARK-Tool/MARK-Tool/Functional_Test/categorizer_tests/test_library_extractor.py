@@ -0,0 +1,79 @@
+"""
+Unit tests for the import extraction of LibraryAnalyzer
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from components.static_analysis.library_extractor import ImportPrefilter, LibraryAnalyzer, extract_imports
+from components.static_analysis.source_file import SourceFile
+from producer_classifier_by_dict import MLProducerAnalyzer
+
+PRODUCER_DICT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src',
+                                             'library_dictionary', 'library_dict_producers_2.csv'))
+
+
+class TestLibraryExtractor(unittest.TestCase):
+    """Test cases for extract_imports and LibraryAnalyzer.get_libraries"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_ast_imports(self):
+        source = ("import os, torch.nn as nn\n"
+                  "from sklearn.svm import (SVC,\n    LinearSVC)\n"
+                  "from .local import helper\n"
+                  "text = 'import fake'\n"
+                  "# import commented\n"
+                  "def load():\n    import keras\n")
+        self.assertEqual(extract_imports(source), {'os', 'torch', 'sklearn', 'keras'})
+
+    def test_unparsable_source_falls_back_to_lines(self):
+        source = "print 'python 2'\nimport numpy, scipy.stats\nfrom torch import nn\nfrom . import x\n"
+        self.assertEqual(extract_imports(source), {'numpy', 'scipy', 'torch'})
+
+    def test_notebook_code_cells(self):
+        notebook = {'cells': [
+            {'cell_type': 'code', 'source': ['%matplotlib inline\n', 'import torch\n']},
+            {'cell_type': 'markdown', 'source': ['import markdown_only\n']},
+            {'cell_type': 'code', 'source': 'from sklearn import svm'},
+        ]}
+        path = os.path.join(self.test_dir, 'nb.ipynb')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(notebook, f, indent=1)
+        self.assertEqual(LibraryAnalyzer(path).get_libraries(), {'torch', 'sklearn'})
+
+    def test_check_ml_library_usage_from_buffer(self):
+        library_dict = pd.DataFrame({'library': ['torch', 'sklearn', 'keras'], 'Keyword': ['a', 'b', 'c']})
+        analyzer = LibraryAnalyzer(os.path.join(self.test_dir, 'missing.py'), source="import torch\n")
+        self.assertEqual(analyzer.check_ml_library_usage(library_dict)['library'].tolist(), ['torch'])
+
+    def test_import_prefilter_never_rejects_an_import(self):
+        prefilter = ImportPrefilter(['torch', 'sklearn', 'scikit-learn'])
+        sources = ["import os, \\\n    torch\n", "from torch.nn import Linear\n", "def f():\n    import sklearn\n",
+                   json.dumps({'cells': [{'cell_type': 'code', 'source': ['import numpy\n', 'import torch']}]})]
+        for source in sources:
+            self.assertTrue(prefilter.matches(source.encode('utf-8')), source)
+        for source in ["# torch\nimport os\n", "import mytorch, torch_utils\n", "model.fit(x)\n"]:
+            self.assertFalse(prefilter.matches(source.encode('utf-8')), source)
+
+    def test_prefiltered_file_is_not_decoded(self):
+        path = os.path.join(self.test_dir, 'utils.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('import os\nmodel.fit(x, y)\n')
+        analyzer = MLProducerAnalyzer(output_folder=self.test_dir)
+        with mock.patch.object(SourceFile, 'text', new_callable=mock.PropertyMock) as text:
+            self.assertEqual(analyzer.analyze_single_file(path, self.test_dir, PRODUCER_DICT), ([], [], path))
+            self.assertEqual(text.call_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
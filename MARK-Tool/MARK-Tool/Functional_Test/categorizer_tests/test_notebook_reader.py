@@ -0,0 +1,114 @@
+"""
+Unit tests for the in-process notebook extraction
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from components.notebook_converter import NotebookConverter
+from components.notebook_reader import iter_code_cells, load_notebook, notebook_to_script
+from producer_classifier_by_dict import MLProducerAnalyzer
+
+PRODUCER_DICT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src',
+                                             'library_dictionary', 'library_dict_producers_2.csv'))
+
+NOTEBOOK = {
+    'cells': [
+        {'cell_type': 'markdown', 'source': ['# Training\n', 'notes']},
+        {'cell_type': 'code', 'execution_count': 1,
+         'source': ['%matplotlib inline\n', '!pip install torch\n', 'from sklearn import svm\n', 'model.fit(x, y)']},
+        {'cell_type': 'code', 'execution_count': None, 'source': 'y = model.predict(x)\n'},
+    ],
+    'metadata': {}, 'nbformat': 4, 'nbformat_minor': 5,
+}
+
+
+class TestNotebookReader(unittest.TestCase):
+    """Test cases for notebook_reader and NotebookConverter"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_code_cells_keep_their_notebook_index(self):
+        cells = list(iter_code_cells(NOTEBOOK))
+        self.assertEqual([cell.index for cell in cells], [1, 2])
+        self.assertEqual(cells[0].execution_count, 1)
+        self.assertTrue(cells[1].source.startswith('y = model.predict'))
+
+    def test_script_lines_map_back_to_cells(self):
+        script = notebook_to_script(NOTEBOOK)
+        lines = script.text.split('\n')
+        self.assertIn('# %matplotlib inline', lines)
+        self.assertIn('# !pip install torch', lines)
+        self.assertEqual(script.locate(lines.index('model.fit(x, y)') + 1), (1, 4))
+        self.assertEqual(script.locate(lines.index('y = model.predict(x)') + 1), (2, 1))
+        self.assertIsNone(script.locate(1))
+
+    def test_invalid_notebook_raises(self):
+        with self.assertRaises(ValueError):
+            load_notebook('{"not": "a notebook"}')
+
+    def test_converter_writes_script_in_process(self):
+        path = os.path.join(self.test_dir, 'train.ipynb')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(NOTEBOOK, f)
+        output_file = NotebookConverter(self.test_dir).convert_notebook_to_code(path)
+        self.assertEqual(output_file, os.path.join(self.test_dir, 'train.py'))
+        with open(output_file, encoding='utf-8') as f:
+            self.assertIn('from sklearn import svm\nmodel.fit(x, y)\n', f.read())
+
+    def test_converter_only_changes_the_extension_of_the_file_name(self):
+        folder = os.path.join(self.test_dir, 'nbs.ipynb')
+        os.makedirs(folder)
+        path = os.path.join(folder, 'a.ipynb')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(NOTEBOOK, f)
+        converter = NotebookConverter(self.test_dir)
+        self.assertEqual(converter.convert_all_notebooks(), [os.path.join(folder, 'a.py')])
+        self.assertTrue(converter.is_fresh(path))
+
+    def test_conversion_skips_fresh_notebooks(self):
+        for index in range(3):
+            with open(os.path.join(self.test_dir, f'nb{index}.ipynb'), 'w', encoding='utf-8') as f:
+                json.dump(NOTEBOOK, f)
+        with open(os.path.join(self.test_dir, 'broken.ipynb'), 'w', encoding='utf-8') as f:
+            f.write('{not json')
+
+        converter = NotebookConverter(self.test_dir, workers=2)
+        self.assertEqual(len(converter.convert_all_notebooks()), 3)
+        self.assertEqual(converter.convert_all_notebooks(), [])
+        self.assertEqual(len(converter.skipped_files), 3)
+
+        # Un notebook modificato dopo la conversione viene riconvertito
+        os.utime(os.path.join(self.test_dir, 'nb0.py'), ns=(0, 0))
+        self.assertEqual(converter.convert_all_notebooks(), [os.path.join(self.test_dir, 'nb0.py')])
+
+    def test_notebook_is_analyzed_from_its_code_cells(self):
+        project_dir = os.path.join(self.test_dir, 'repos', 'owner', 'repo')
+        os.makedirs(project_dir)
+        path = os.path.join(project_dir, 'train.ipynb')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(NOTEBOOK, f, indent=1)
+        # Lo script generato dalla conversione non deve essere analizzato una seconda volta
+        NotebookConverter(project_dir).convert_notebook_to_code(path)
+
+        output_dir = os.path.join(self.test_dir, 'out')
+        os.makedirs(output_dir)
+        analyzer = MLProducerAnalyzer(output_folder=output_dir)
+        self.assertEqual(analyzer.analyze_projects_set_for_producers(os.path.join(self.test_dir, 'repos'),
+                                                                     PRODUCER_DICT), 1)
+        df = pd.read_csv(analyzer.results_file)
+        self.assertEqual(df['where'].tolist(), [path])
+        self.assertEqual(df['cell'].tolist(), [1])
+        self.assertEqual(df['line_number'].tolist(), [4])
+
+
+if __name__ == '__main__':
+    unittest.main()
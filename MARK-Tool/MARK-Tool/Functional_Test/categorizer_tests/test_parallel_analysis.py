@@ -0,0 +1,121 @@
+"""
+Unit tests for the process-pool mode of the project analysis
+"""
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import pandas as pd
+
+from analyzer_base import PARALLEL_WINDOW
+from components.results_writer import StreamingResultsWriter
+from exec_analysis import ExecAnalyzer
+from producer_classifier_by_dict import MLProducerAnalyzer
+
+PRODUCER_DICT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src',
+                                             'library_dictionary', 'library_dict_producers_2.csv'))
+
+
+class EchoAnalyzer(MLProducerAnalyzer):
+    """Analyzer whose task just returns its own arguments"""
+
+    def echo(self, *task):
+        return task
+
+
+class TestParallelProducerAnalysis(unittest.TestCase):
+    """Test cases for analyze_projects_set_for_producers with several workers"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.test_dir, 'repos')
+        for index in range(4):
+            project_dir = os.path.join(self.input_dir, f'owner{index}', f'repo{index}')
+            os.makedirs(project_dir)
+            with open(os.path.join(project_dir, 'train.py'), 'w', encoding='utf-8') as f:
+                f.write("from sklearn import svm\n" + "clf.fit(X, y)\n" * (index + 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _run(self, workers):
+        output_dir = os.path.join(self.test_dir, f'out_{workers}')
+        os.makedirs(output_dir)
+        analyzer = MLProducerAnalyzer(output_folder=output_dir)
+        analyzer.analyze_projects_set_for_producers(self.input_dir, PRODUCER_DICT, workers=workers)
+        with open(os.path.join(output_dir, 'results_first_step.csv'), encoding='utf-8') as f:
+            return f.read(), analyzer.training_files
+
+    def test_parallel_results_match_sequential(self):
+        sequential, sequential_training = self._run(1)
+        parallel, parallel_training = self._run(2)
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(parallel_training, sequential_training)
+        self.assertEqual(len(parallel_training), 4)
+
+    def test_resume_skips_analyzed_projects(self):
+        output_dir = os.path.join(self.test_dir, 'out_resume')
+        os.makedirs(output_dir)
+        MLProducerAnalyzer(output_folder=output_dir).analyze_projects_set_for_producers(
+            self.input_dir, PRODUCER_DICT, workers=2)
+        analyzer = MLProducerAnalyzer(output_folder=output_dir)
+        self.assertEqual(analyzer.analyze_projects_set_for_producers(self.input_dir, PRODUCER_DICT, workers=2), 0)
+        self.assertEqual(analyzer.training_files, set())
+        with open(analyzer.results_file, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 1 + 1 + 2 + 3 + 4)
+
+    def test_projects_restrict_the_analysis_and_extend_the_results(self):
+        output_dir = os.path.join(self.test_dir, 'out_projects')
+        os.makedirs(output_dir)
+        for batch in (['owner2/repo2'], ['owner0/repo0', 'owner3/repo3']):
+            analyzer = MLProducerAnalyzer(output_folder=output_dir, projects=batch)
+            self.assertEqual(analyzer.analyze_projects_set_for_producers(self.input_dir, PRODUCER_DICT), len(batch))
+        projects = pd.read_csv(analyzer.results_file)['ProjectName'].tolist()
+        self.assertEqual(projects[:3], ['owner2/repo2'] * 3)
+        self.assertEqual(sorted(projects[3:]), ['owner0/repo0'] + ['owner3/repo3'] * 4)
+        # Nessun backup dei risultati a ogni lotto della pipeline
+        self.assertEqual([name for name in os.listdir(output_dir) if name.startswith('results_backup')], [])
+
+    def test_batches_from_stdin_share_the_results_writers(self):
+        output_dir = os.path.join(self.test_dir, 'out_batches')
+
+        def run_batches(batches):
+            with redirect_stdout(io.StringIO()) as out:
+                ExecAnalyzer(input_path=self.input_dir, output_path=output_dir).run_batches(batches)
+            return [line for line in out.getvalue().splitlines() if line.startswith(('[ANALYZED]', '[READY]',
+                                                                                      '[BATCH DONE]'))]
+
+        with mock.patch('analyzer_base.StreamingResultsWriter', wraps=StreamingResultsWriter) as writers:
+            lines = run_batches([['owner2/repo2'], [], ['owner0/repo0', 'owner3/repo3']])
+        # Un solo writer per analisi, aperto per tutti i lotti
+        self.assertEqual(writers.call_count, 2)
+        self.assertEqual(lines, ['[READY]', '[BATCH DONE] 1', '[BATCH DONE] 2'])
+        projects = pd.read_csv(os.path.join(output_dir, 'Producers', 'Producers_Final', 'results_first_step.csv'))
+        self.assertEqual(set(projects['ProjectName']), {'owner0/repo0', 'owner2/repo2', 'owner3/repo3'})
+
+        self.assertEqual(run_batches([]), ['[ANALYZED] owner0/repo0', '[ANALYZED] owner2/repo2',
+                                           '[ANALYZED] owner3/repo3', '[READY]'])
+
+    def test_tasks_are_consumed_lazily(self):
+        consumed = []
+
+        def tasks():
+            for index in range(20):
+                consumed.append(index)
+                yield 'repo', 'owner', str(index)
+
+        analyzer = EchoAnalyzer(output_folder=self.test_dir)
+        results = analyzer.map_projects('echo', tasks(), workers=2)
+        for index, (task, result) in enumerate(results):
+            self.assertEqual(result, task)
+            # Oltre al task restituito, al piu' PARALLEL_WINDOW * workers task in volo
+            self.assertLessEqual(len(consumed), index + 1 + PARALLEL_WINDOW * 2)
+        self.assertEqual(len(consumed), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
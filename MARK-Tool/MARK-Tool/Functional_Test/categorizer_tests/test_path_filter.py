@@ -0,0 +1,81 @@
+"""
+Unit tests for the directory pruning rules of the repository traversal
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from components.file_manifest import FileManifest, FileManifestRegistry
+from components.notebook_converter import NotebookConverter
+from components.path_filter import PathFilter
+
+NOTEBOOK = {'cells': [{'cell_type': 'code', 'execution_count': 1, 'source': 'import os\n'}],
+            'metadata': {}, 'nbformat': 4, 'nbformat_minor': 5}
+
+
+class TestPathFilter(unittest.TestCase):
+    """Test cases for PathFilter and its use by FileManifest and NotebookConverter"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.project = os.path.join(self.test_dir, 'repo')
+        for rel_path in ('main.py', 'src/model.py', 'src/__pycache__/model.py', '.git/hooks/hook.py',
+                         'lib/site-packages/torch/nn.py', 'env/lib/dep.py', 'env/pyvenv.cfg',
+                         'tests/test_model.py', 'data/generated/gen.py', 'data/keep.py'):
+            path = os.path.join(self.project, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('import os\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _files(self, path_filter):
+        return sorted(os.path.relpath(os.path.join(root, name), self.project).replace(os.sep, '/')
+                      for _, root, names in path_filter.walk(self.project) for name in names
+                      if name.endswith('.py'))
+
+    def test_default_rules_prune_vcs_dependencies_and_virtualenvs(self):
+        self.assertEqual(self._files(PathFilter()),
+                         ['data/generated/gen.py', 'data/keep.py', 'main.py', 'src/model.py', 'tests/test_model.py'])
+
+    def test_ignore_overrides(self):
+        self.assertEqual(self._files(PathFilter(ignore=['tests', 'data/generated'])),
+                         ['data/keep.py', 'main.py', 'src/model.py'])
+        self.assertIn('lib/site-packages/torch/nn.py', self._files(PathFilter(use_defaults=False)))
+
+    def test_gitignore_is_honored_with_negations(self):
+        with open(os.path.join(self.project, '.gitignore'), 'w', encoding='utf-8') as f:
+            f.write('# generated code\ndata/*\n!data/keep.py\n')
+        with open(os.path.join(self.project, 'src', '.gitignore'), 'w', encoding='utf-8') as f:
+            f.write('model.py\n')
+        self.assertEqual(self._files(PathFilter(use_gitignore=True)),
+                         ['data/keep.py', 'main.py', 'tests/test_model.py'])
+        # Senza use_gitignore le .gitignore non vengono lette
+        self.assertIn('src/model.py', self._files(PathFilter()))
+
+    def test_manifest_is_cached_per_filter(self):
+        registry = FileManifestRegistry()
+        self.assertEqual(len(registry.get(self.project)), 5)
+        self.assertEqual(len(registry.get(self.project, path_filter=PathFilter(ignore=['tests']))), 4)
+
+        path_filter = PathFilter(use_gitignore=True)
+        manifest = FileManifest.scan(self.project, path_filter)
+        with open(os.path.join(self.project, '.gitignore'), 'w', encoding='utf-8') as f:
+            f.write('tests/\n')
+        self.assertFalse(manifest.is_valid())
+        self.assertEqual(len(FileManifest.scan(self.project, path_filter)), 4)
+
+    def test_converter_skips_ignored_directories(self):
+        for rel_dir in ('notebooks', '.ipynb_checkpoints', 'venv'):
+            os.makedirs(os.path.join(self.project, rel_dir), exist_ok=True)
+            with open(os.path.join(self.project, rel_dir, 'nb.ipynb'), 'w', encoding='utf-8') as f:
+                json.dump(NOTEBOOK, f)
+        self.assertEqual(NotebookConverter(self.project).find_notebooks(),
+                         [os.path.join(self.project, 'notebooks', 'nb.ipynb')])
+
+
+if __name__ == '__main__':
+    unittest.main()
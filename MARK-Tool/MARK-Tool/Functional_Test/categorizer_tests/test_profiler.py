@@ -0,0 +1,53 @@
+"""
+Unit tests for the optional profiler of the analysis passes
+"""
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import unittest
+
+from components.profiler import AnalysisProfiler, profile_label
+from exec_analysis import ExecAnalyzer
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+class TestAnalysisProfiler(unittest.TestCase):
+    """Test cases for AnalysisProfiler and profile_label"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_writes_pstats_and_labelled_collapsed_stacks(self):
+        with AnalysisProfiler(self.test_dir, name='run', interval=0.001) as profiler:
+            with profile_label('Producer:owner/repo'):
+                _busy(0.2)
+
+        stats = pstats.Stats(profiler.pstats_path)
+        self.assertTrue(any(function == '_busy' for _, _, function in stats.stats))
+
+        with open(os.path.join(self.test_dir, 'run.collapsed'), encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        roots = {line.split(';', 1)[0] for line in lines}
+        self.assertIn('Producer:owner/repo', roots)
+        self.assertTrue(any('_busy (test_profiler.py' in line for line in lines))
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines), profiler.samples)
+
+    def test_profiled_run_uses_a_single_worker(self):
+        # Solo il processo principale e' profilato: i worker non comparirebbero nel profilo
+        self.assertEqual(ExecAnalyzer(self.test_dir, self.test_dir, workers=4, profile=True).workers, 1)
+        self.assertEqual(ExecAnalyzer(self.test_dir, self.test_dir, workers=4).workers, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
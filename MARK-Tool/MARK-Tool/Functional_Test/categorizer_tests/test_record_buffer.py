@@ -0,0 +1,29 @@
+"""
+Unit tests for RecordBuffer
+"""
+import unittest
+
+from components.record_buffer import RecordBuffer
+
+
+class TestRecordBuffer(unittest.TestCase):
+    """Test cases for RecordBuffer"""
+
+    def test_to_frame_broadcasts_constants(self):
+        records = RecordBuffer(['ProjectName', 'where', 'line_number'], constants={'ProjectName': 'a/b'})
+        records.append(where='x.py', line_number=3)
+        records.append(where='y.py', line_number=7)
+        df = records.to_frame()
+        self.assertEqual(len(records), 2)
+        self.assertEqual(list(df.columns), ['ProjectName', 'where', 'line_number'])
+        self.assertEqual(df['ProjectName'].tolist(), ['a/b', 'a/b'])
+        self.assertEqual(df['line_number'].tolist(), [3, 7])
+
+    def test_empty_buffer_keeps_columns(self):
+        df = RecordBuffer(['ProjectName', 'where'], constants={'ProjectName': 'a/b'}).to_frame()
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), ['ProjectName', 'where'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit tests for StreamingResultsWriter
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from components.results_writer import StreamingResultsWriter
+
+
+class TestStreamingResultsWriter(unittest.TestCase):
+    """Test cases for the append-only results writer and its resume index"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.results_file = os.path.join(self.test_dir, 'results.csv')
+        self.index_file = os.path.join(self.test_dir, 'results.index.jsonl')
+        pd.DataFrame(columns=['ProjectName', 'where']).to_csv(self.results_file, index=False)
+        self.first = pd.DataFrame({'ProjectName': ['p/1'], 'where': ['a.py'], 'keywords': ['.fit(']})
+        self.second = pd.DataFrame({'ProjectName': ['p/2', 'p/2'], 'where': ['b.py', 'c.py'],
+                                    'keywords': ['.train(', '.fit(']})
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _read(self):
+        return pd.read_csv(self.results_file)
+
+    def test_rows_match_concat(self):
+        with StreamingResultsWriter(self.results_file, self.index_file) as writer:
+            writer.write('p/1', self.first)
+            writer.write('p/2', self.second)
+            writer.write('p/3', self.first.iloc[0:0])
+        expected = pd.concat([pd.DataFrame(columns=['ProjectName', 'where']), self.first, self.second],
+                             ignore_index=True)
+        pd.testing.assert_frame_equal(self._read(), expected, check_dtype=False)
+
+    def test_resume_from_index(self):
+        with StreamingResultsWriter(self.results_file, self.index_file) as writer:
+            writer.write('p/1', self.first)
+            writer.write('p/3', self.first.iloc[0:0])
+        with StreamingResultsWriter(self.results_file, self.index_file) as writer:
+            self.assertEqual(writer.completed, {'p/1', 'p/3'})
+            self.assertEqual(writer.columns, ['ProjectName', 'where', 'keywords'])
+
+    def test_unindexed_rows_are_truncated(self):
+        with StreamingResultsWriter(self.results_file, self.index_file) as writer:
+            writer.write('p/1', self.first)
+        # Righe di un progetto interrotto prima di essere registrato nell'indice
+        with open(self.results_file, 'a', encoding='utf-8') as f:
+            f.write('p/2,b.py,.train(\n')
+        with StreamingResultsWriter(self.results_file, self.index_file) as writer:
+            self.assertFalse(writer.is_completed('p/2'))
+        self.assertEqual(self._read()['ProjectName'].tolist(), ['p/1'])
+
+    def test_interrupted_header_rewrite_keeps_previous_results(self):
+        narrow = self.first[['ProjectName', 'where']]
+        writer = StreamingResultsWriter(self.results_file, self.index_file)
+        writer.write('p/1', narrow)
+        writer.close()
+        with open(self.results_file, encoding='utf-8') as f:
+            before = f.read()
+        writer = StreamingResultsWriter(self.results_file, self.index_file)
+        def partial_write(frame, path, **kwargs):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('ProjectName,wh')
+            raise OSError('disk full')
+
+        # Crash a meta' della riscrittura con l'header esteso dalla colonna keywords
+        with mock.patch.object(pd.DataFrame, 'to_csv', autospec=True, side_effect=partial_write):
+            with self.assertRaises(OSError):
+                writer.write('p/2', self.second)
+        with open(self.results_file, encoding='utf-8') as f:
+            self.assertEqual(f.read(), before)
+
+    def test_crash_between_header_rewrite_and_index_swap_keeps_results(self):
+        with StreamingResultsWriter(self.results_file, self.index_file) as writer:
+            writer.write('p/1', self.first[['ProjectName', 'where']])
+        writer = StreamingResultsWriter(self.results_file, self.index_file)
+        real_replace = os.replace
+        replaced = []
+
+        def crash_after_results(src, dst):
+            # Il primo scambio (file dei risultati riscritto) riesce, il processo muore prima del secondo
+            if replaced:
+                raise OSError('killed')
+            replaced.append(dst)
+            real_replace(src, dst)
+
+        with mock.patch('components.results_writer.os.replace', side_effect=crash_after_results):
+            with self.assertRaises(OSError):
+                writer.write('p/2', self.second)
+        self.assertEqual(replaced, [self.results_file])
+
+        with StreamingResultsWriter(self.results_file, self.index_file) as writer:
+            self.assertEqual(writer.completed, {'p/1'})
+            writer.write('p/2', self.second)
+        df = self._read()
+        self.assertEqual(df['ProjectName'].tolist(), ['p/1', 'p/2', 'p/2'])
+        self.assertEqual(df['where'].tolist(), ['a.py', 'b.py', 'c.py'])
+        self.assertEqual(df['keywords'].tolist()[1:], ['.train(', '.fit('])
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ['results.csv', 'results.index.jsonl'])
+
+    def test_bootstrap_index_from_legacy_results(self):
+        self.second.to_csv(self.results_file, index=False)
+        with StreamingResultsWriter(self.results_file, self.index_file) as writer:
+            self.assertEqual(writer.completed, {'p/2'})
+        with open(self.index_file, encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline())['project'], 'p/2')
+        self.assertEqual(len(self._read()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Unit tests for SourceFile, the per-file buffer shared by an analysis pass
+"""
+import builtins
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from components.static_analysis.source_file import SourceFile
+from consumer_classifier_by_dict import MLConsumerAnalyzer
+
+DICT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'Categorizer', 'src', 'library_dictionary')
+CONSUMER_DICT = os.path.abspath(os.path.join(DICT_DIR, 'library_dict_consumers_2.csv'))
+PRODUCER_DICT = os.path.abspath(os.path.join(DICT_DIR, 'library_dict_producers_2.csv'))
+
+
+class TestSourceFile(unittest.TestCase):
+    """Test cases for SourceFile decoding and single-read analysis"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.test_dir, 'infer.py')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _write(self, data):
+        with open(self.file, 'wb') as f:
+            f.write(data)
+
+    def test_decoding_falls_back_to_latin1(self):
+        self._write("import keras\r\n# caf\xe9\r\n".encode('ISO-8859-1'))
+        source = SourceFile.load(self.file)
+        self.assertEqual(source.text, "import keras\n# caf\xe9\n")
+        self.assertEqual(source.encoding, 'ISO-8859-1')
+        self.assertEqual(source.imports, {'keras'})
+
+    def test_consumer_reads_each_file_once(self):
+        self._write(b"import keras\ny = model.predict(x)\n")
+        analyzer = MLConsumerAnalyzer(output_folder=self.test_dir)
+        real_open = builtins.open
+        with mock.patch('builtins.open', side_effect=real_open) as opened:
+            _, keywords, _, _ = analyzer.analyze_single_file(self.file, self.test_dir, CONSUMER_DICT,
+                                                             PRODUCER_DICT, True)
+        self.assertEqual(len(keywords), 1)
+        self.assertEqual([call.args[0] for call in opened.call_args_list].count(self.file), 1)
+
+    def test_mmap_scan_matches_text_scan(self):
+        self._write(b"import keras\r\n" + b"x = 1\r\n" * 1000 + b"y = model.predict(x)\r\nz = caf\xe9\r\n"
+                    + b"y = model.PREDICT(x)")
+        results = []
+        for threshold in (None, 1):
+            analyzer = MLConsumerAnalyzer(output_folder=self.test_dir, mmap_threshold=threshold)
+            libraries, keywords, _, _ = analyzer.analyze_single_file(self.file, self.test_dir, CONSUMER_DICT,
+                                                                     PRODUCER_DICT, True)
+            results.append((libraries, keywords))
+        self.assertEqual(results[1], results[0])
+        self.assertEqual([keyword['line_number'] for keyword in results[1][1]], [1002, 1004])
+
+    def test_mapped_source_is_closed(self):
+        self._write(b"import keras\nfrom torch import nn\n")
+        with SourceFile.load(self.file, mmap_threshold=1) as source:
+            self.assertTrue(source.mapped)
+            self.assertEqual(source.imports, {'keras', 'torch'})
+            self.assertTrue(source.contains('from torch'))
+        self.assertTrue(source.data.closed)
+
+    def test_empty_file_and_negative_threshold_are_not_mapped(self):
+        self._write(b"")
+        for threshold in (-1, 1):
+            with SourceFile.load(self.file, mmap_threshold=threshold) as source:
+                self.assertFalse(source.mapped)
+                self.assertEqual(source.text, "")
+        self._write(b"import keras\n")
+        with SourceFile.load(self.file, mmap_threshold=-1) as source:
+            self.assertFalse(source.mapped)
+
+    def test_notebook_is_never_mapped(self):
+        notebook = os.path.join(self.test_dir, 'train.ipynb')
+        with open(notebook, 'w', encoding='utf-8') as f:
+            f.write('{"cells": [{"cell_type": "code", "source": "import keras\\n"}], '
+                    '"metadata": {}, "nbformat": 4, "nbformat_minor": 5}')
+        with SourceFile.load(notebook, mmap_threshold=1) as source:
+            self.assertFalse(source.mapped)
+            self.assertEqual(source.kind, '.ipynb')
+            self.assertEqual(source.imports, {'keras'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+# Offline tests for the repository cloner (local bare repositories cloned through file:// URLs)
@@ -0,0 +1,10 @@
+"""
+Pytest configuration for the cloner tests
+"""
+import os
+import sys
+
+# cloner.py importa i moduli accanto a se' (es. async_cloner)
+CLONER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'cloner'))
+if CLONER_DIR not in sys.path:
+    sys.path.insert(0, CLONER_DIR)
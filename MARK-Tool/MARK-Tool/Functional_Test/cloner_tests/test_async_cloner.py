@@ -0,0 +1,206 @@
+"""
+Unit tests for the asyncio cloner, run against local bare repositories through file:// URLs
+"""
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from async_cloner import AsyncRepoCloner, CloneResult, HostRateLimiter, SPARSE_PATTERNS
+from clone_journal import CloneJournal, load_cloned, read_journal
+from cloner import GitHubRepoCloner
+
+GIT_IDENTITY = ['-c', 'user.name=MARK', '-c', 'user.email=mark@example.com']
+
+
+def make_bare_repo(server_dir, project, files=None, allow_filter=False):
+    """Create <server_dir>/<project>.git with a single commit of files (relative path -> bytes)."""
+    work = tempfile.mkdtemp()
+    try:
+        for rel_path, content in (files or {'train.py': b'import torch\n'}).items():
+            path = os.path.join(work, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+        subprocess.run(['git', 'init', '-q', work], check=True)
+        subprocess.run(['git', *GIT_IDENTITY, '-C', work, 'add', '.'], check=True)
+        subprocess.run(['git', *GIT_IDENTITY, '-C', work, 'commit', '-q', '-m', 'init'], check=True)
+        bare = os.path.join(server_dir, project + '.git')
+        subprocess.run(['git', 'clone', '-q', '--bare', work, bare], check=True)
+        if allow_filter:
+            subprocess.run(['git', '-C', bare, 'config', 'uploadpack.allowFilter', 'true'], check=True)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def tree_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def checked_out(path):
+    return sorted(os.path.relpath(os.path.join(root, name), path).replace(os.sep, '/')
+                  for root, dirs, names in os.walk(path) if '.git' not in root.split(os.sep) for name in names)
+
+
+class TestAsyncRepoCloner(unittest.TestCase):
+    """Test cases for AsyncRepoCloner and GitHubRepoCloner with file:// remotes"""
+
+    @classmethod
+    def setUpClass(cls):
+        if shutil.which('git') is None:
+            raise unittest.SkipTest('git is not installed')
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.server_dir = os.path.join(self.test_dir, 'server')
+        self.output_dir = os.path.join(self.test_dir, 'out')
+        self.projects = ['alice/vision', 'alice/nlp', 'bob/tabular']
+        for project in self.projects:
+            make_bare_repo(self.server_dir, project)
+        self.base_url = Path(self.server_dir).as_uri()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_clones_with_bounded_concurrency(self):
+        cloner = AsyncRepoCloner(base_url=self.base_url, concurrency=2, backoff=0)
+        jobs = [(project, os.path.join(self.output_dir, project)) for project in self.projects]
+        results = cloner.run(jobs)
+
+        self.assertEqual(sorted(result.project for result in results), sorted(self.projects))
+        self.assertTrue(all(result.ok and result.attempts == 1 for result in results))
+        for project in self.projects:
+            self.assertTrue(os.path.isfile(os.path.join(self.output_dir, project, 'train.py')))
+        self.assertEqual((cloner.progress.completed, cloner.progress.failed, cloner.progress.remaining), (3, 0, 0))
+
+    def test_failed_clone_is_retried_and_cleaned_up(self):
+        cloner = AsyncRepoCloner(base_url=self.base_url, retries=2, backoff=0)
+        missing = os.path.join(self.output_dir, 'alice/missing')
+        results = cloner.run([('alice/missing', missing)])
+
+        self.assertFalse(results[0].ok)
+        self.assertEqual(results[0].attempts, 3)
+        self.assertTrue(results[0].error)
+        self.assertFalse(os.path.exists(missing))
+        self.assertEqual((cloner.progress.completed, cloner.progress.failed), (0, 1))
+
+    def test_backoff_does_not_hold_a_concurrency_slot(self):
+        cloner = AsyncRepoCloner(base_url=self.base_url, concurrency=1, retries=1, backoff=1.0)
+        results = cloner.run([(project, os.path.join(self.output_dir, project))
+                              for project in ('alice/missing', 'alice/vision')])
+
+        # Il clone sano parte mentre quello fallito attende il nuovo tentativo
+        self.assertEqual([result.project for result in results], ['alice/vision', 'alice/missing'])
+        self.assertLess(results[0].seconds, 1.0)
+        self.assertEqual(results[1].attempts, 2)
+
+    def test_sparse_clone_fetches_only_python_and_notebook_files(self):
+        files = {'train.py': b'import torch\n', 'nbs/explore.ipynb': b'{}', 'src/pkg/model.py': b'import keras\n',
+                 '.gitignore': b'*.pyc\n', 'README.md': b'# repo\n', 'data/weights.bin': os.urandom(1 << 20)}
+        make_bare_repo(self.server_dir, 'carol/assets', files, allow_filter=True)
+        make_bare_repo(self.server_dir, 'carol/nofilter', files)
+        cloner = AsyncRepoCloner(base_url=self.base_url, backoff=0, sparse_patterns=SPARSE_PATTERNS)
+        results = cloner.run([(project, os.path.join(self.output_dir, project))
+                              for project in ('carol/assets', 'carol/nofilter')])
+
+        self.assertTrue(all(result.ok for result in results))
+        expected = ['.gitignore', 'nbs/explore.ipynb', 'src/pkg/model.py', 'train.py']
+        for project in ('carol/assets', 'carol/nofilter'):
+            self.assertEqual(checked_out(os.path.join(self.output_dir, project)), expected)
+        # Con il filtro il blob dei pesi non viene scaricato, senza filtro il server lo invia comunque
+        self.assertLess(tree_size(os.path.join(self.output_dir, 'carol/assets')), 1 << 19)
+        self.assertGreater(tree_size(os.path.join(self.output_dir, 'carol/nofilter')), 1 << 20)
+
+    @unittest.skipIf(os.name == 'nt', 'the git wrapper is a shell script')
+    def test_sparse_clone_falls_back_to_a_full_clone(self):
+        wrapper = os.path.join(self.test_dir, 'git-without-sparse')
+        with open(wrapper, 'w', encoding='utf-8') as f:
+            f.write('#!/bin/sh\n'
+                    'for arg in "$@"; do [ "$arg" = sparse-checkout ] && echo "unknown command" >&2 && exit 1; done\n'
+                    'exec git "$@"\n')
+        os.chmod(wrapper, 0o755)
+        cloner = AsyncRepoCloner(base_url=self.base_url, retries=0, git=wrapper, sparse_patterns=SPARSE_PATTERNS)
+        results = cloner.run([('alice/vision', os.path.join(self.output_dir, 'alice/vision'))])
+
+        self.assertTrue(results[0].ok)
+        self.assertTrue(os.path.isfile(os.path.join(self.output_dir, 'alice/vision', 'train.py')))
+
+    def test_rate_limiter_spaces_starts_per_host(self):
+        limiter = HostRateLimiter(rate=20)
+
+        async def starts():
+            loop = asyncio.get_running_loop()
+            times = []
+            for host in ('github.com', 'github.com', 'github.com', 'gitlab.com'):
+                await limiter.wait(host)
+                times.append((host, loop.time()))
+            return times
+
+        times = asyncio.run(starts())
+        github = [t for host, t in times if host == 'github.com']
+        self.assertGreaterEqual(github[2] - github[0], 0.09)
+        # Un host diverso non aspetta il turno degli altri
+        self.assertLess(times[3][1] - times[2][1], 0.04)
+
+    def test_github_repo_cloner_records_results(self):
+        input_csv = os.path.join(self.test_dir, 'projects.csv')
+        pd.DataFrame({'ProjectName': self.projects + ['bob/missing'], 'repo_url': '', 'ml_libs': 'torch',
+                      'count': 1}).to_csv(input_csv, index=False)
+        cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        try:
+            cloner = GitHubRepoCloner(input_csv, self.output_dir, True, base_url=self.base_url, retries=0)
+            results = cloner.run()
+            journal = read_journal('cloned_log.jsonl')
+            with open('errors.csv', encoding='utf-8') as f:
+                errors = f.read()
+            # Ripresa: solo il progetto fallito viene ritentato
+            resumed = cloner.run()
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(sum(result.ok for result in results), 3)
+        self.assertEqual(sorted(entry['ProjectName'] for entry in journal if entry['status'] == 'cloned'),
+                         sorted(self.projects))
+        self.assertEqual(journal[0]['ml_libs'], 'torch')
+        self.assertIn('bob/missing', errors)
+        self.assertEqual([result.project for result in resumed], ['bob/missing'])
+        self.assertEqual(cloner.top_level_dir('bob/tabular'), os.path.join(self.output_dir, 'bob'))
+
+
+
+class TestCloneJournal(unittest.TestCase):
+    """Test cases for the clone journal and the resume set"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'journal.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_resume_set_merges_journal_and_legacy_log(self):
+        row = pd.Series({'ProjectName': 'a/one', 'ml_libs': 'torch', 'count': 3})
+        with CloneJournal(self.path) as journal:
+            journal.record(row, CloneResult('a/one', 'url', 'path', True, 1, None, 0.5))
+            journal.record(row, CloneResult('a/two', 'url', 'path', False, 3, 'timed out', 9.0))
+        # Riga troncata di un'esecuzione interrotta
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"ProjectName": "a/thr')
+        legacy_log = os.path.join(self.test_dir, 'cloned_log.csv')
+        pd.DataFrame({'ProjectName': ['b/legacy'], 'repo_url': [''], 'ml_libs': [''], 'count': [1]}).to_csv(
+            legacy_log, index=False)
+
+        self.assertEqual(len(read_journal(self.path)), 2)
+        self.assertEqual(read_journal(self.path)[0]['count'], 3)
+        self.assertEqual(load_cloned(self.path, legacy_log), {'a/one', 'b/legacy'})
+        self.assertEqual(load_cloned(os.path.join(self.test_dir, 'missing.jsonl'), None), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Unit tests for the clone-and-analyze pipeline, run against local bare repositories through file:// URLs
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from clone_pipeline import ClonePipeline
+from cloner import GitHubRepoCloner
+from .test_async_cloner import make_bare_repo
+
+
+class TestClonePipeline(unittest.TestCase):
+    """Test cases for ClonePipeline"""
+
+    @classmethod
+    def setUpClass(cls):
+        if shutil.which('git') is None:
+            raise unittest.SkipTest('git is not installed')
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.server_dir = os.path.join(self.test_dir, 'server')
+        self.output_dir = os.path.join(self.test_dir, 'out')
+        self.projects = [f'owner{i % 2}/repo{i}' for i in range(6)]
+        for project in self.projects:
+            make_bare_repo(self.server_dir, project)
+        self.cwd = os.getcwd()
+        os.chdir(self.test_dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _cloner(self, projects, concurrency=2):
+        input_csv = os.path.join(self.test_dir, 'projects.csv')
+        pd.DataFrame({'ProjectName': projects}).to_csv(input_csv, index=False)
+        return GitHubRepoCloner(input_csv, self.output_dir, True, base_url=Path(self.server_dir).as_uri(),
+                                concurrency=concurrency, retries=0)
+
+    def _repos_on_disk(self):
+        return sorted(f'{owner}/{repo}' for owner in os.listdir(self.output_dir)
+                      for repo in os.listdir(os.path.join(self.output_dir, owner)))
+
+    def test_repositories_are_analyzed_as_cloned_and_deleted(self):
+        repo_cloner = self._cloner(self.projects + ['owner0/missing'])
+        batches = []
+
+        def analyze(projects):
+            on_disk = self._repos_on_disk()
+            # Coda dell'analisi (2) piu' i clone in corso (concurrency 2)
+            self.assertLessEqual(len(on_disk), 4)
+            self.assertTrue(set(projects) <= set(on_disk))
+            batches.append(projects)
+            return True
+
+        pipeline = ClonePipeline(repo_cloner, analyze, queue_size=2, batch_size=2, delete_after_analysis=True)
+        self.assertTrue(pipeline.run(repo_cloner.pending_rows()))
+
+        self.assertEqual(sorted(sum(batches, [])), sorted(self.projects))
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+        self.assertEqual(pipeline.analyzed, 6)
+        self.assertEqual(os.listdir(self.output_dir), [])
+        self.assertEqual(repo_cloner.async_cloner.progress.failed, 1)
+
+    def test_clones_are_not_limited_by_the_analysis_queue(self):
+        repo_cloner = self._cloner(self.projects, concurrency=3)
+        on_disk = []
+
+        def analyze(projects):
+            if not on_disk:
+                # I clone gia' ammessi finiscono anche con la coda piena
+                deadline = time.monotonic() + 10
+                while len(self._repos_on_disk()) < 3 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+            on_disk.append(len(self._repos_on_disk()))
+            return True
+
+        pipeline = ClonePipeline(repo_cloner, analyze, queue_size=1, batch_size=1, delete_after_analysis=True)
+        self.assertTrue(pipeline.run(repo_cloner.pending_rows()))
+
+        self.assertEqual(on_disk[0], 3)
+        self.assertLessEqual(max(on_disk), 1 + 3)
+        self.assertEqual(pipeline.analyzed, 6)
+
+    def test_failed_analysis_stops_the_clones(self):
+        repo_cloner = self._cloner(self.projects)
+        pipeline = ClonePipeline(repo_cloner, lambda projects: False, queue_size=1, batch_size=1)
+        self.assertFalse(pipeline.run(repo_cloner.pending_rows()))
+
+        self.assertEqual(pipeline.analyzed, 0)
+        self.assertLess(len(self._repos_on_disk()), len(self.projects))
+
+    def test_ready_repositories_are_analyzed_without_cloning(self):
+        repo_cloner = self._cloner(self.projects)
+        ready = self.projects[:2]
+        for project in ready:
+            os.makedirs(os.path.join(self.output_dir, project))
+        batches = []
+
+        def analyze(projects):
+            batches.append(projects)
+            return True
+
+        pipeline = ClonePipeline(repo_cloner, analyze, queue_size=1, batch_size=2)
+        rows = [row for row in repo_cloner.pending_rows() if row['ProjectName'] not in ready]
+        self.assertTrue(pipeline.run(rows, ready))
+
+        self.assertEqual(batches[0], ready)
+        self.assertEqual(sorted(sum(batches, [])), sorted(self.projects))
+        self.assertEqual(repo_cloner.async_cloner.progress.total, 4)
+
+    def test_stop_skips_the_remaining_analyses(self):
+        repo_cloner = self._cloner(self.projects)
+        batches = []
+
+        def analyze(projects):
+            batches.append(projects)
+            pipeline.stop()
+            return True
+
+        pipeline = ClonePipeline(repo_cloner, analyze, queue_size=2, batch_size=1)
+        self.assertFalse(pipeline.run(repo_cloner.pending_rows()))
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(pipeline.analyzed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Unit tests for the dataset selection (offset, limit, shards) and the merge of the shard journals
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from clone_journal import load_cloned, merge_journals, read_journal, shard_journal_path
+from cloner import GitHubRepoCloner, parse_shard
+
+
+class TestSharding(unittest.TestCase):
+    """Test cases for GitHubRepoCloner.select_rows and the shard journals"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dataset = pd.DataFrame({'ProjectName': [f'owner{i % 7}/repo{i}' for i in range(200)]})
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _select(self, **kwargs):
+        cloner = GitHubRepoCloner('projects.csv', self.test_dir, True, **kwargs)
+        return list(cloner.select_rows(self.dataset)['ProjectName'])
+
+    def test_shards_partition_the_dataset_deterministically(self):
+        shards = [self._select(shard=(index, 4)) for index in range(4)]
+        self.assertEqual(sorted(sum(shards, [])), sorted(self.dataset['ProjectName']))
+        self.assertTrue(all(shards))
+        # Lo shard di un progetto non dipende dall'ordine del dataset
+        self.dataset = self.dataset.iloc[::-1]
+        self.assertEqual(sorted(self._select(shard=(1, 4))), sorted(shards[1]))
+
+    def test_offset_and_limit(self):
+        self.assertEqual(len(self._select()), 200)
+        self.assertEqual(self._select(offset=10, limit=5), [f'owner{i % 7}/repo{i}' for i in range(10, 15)])
+        self.assertEqual(self._select(offset=195, limit=50), [f'owner{i % 7}/repo{i}' for i in range(195, 200)])
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('2/8'), (2, 8))
+        for value in ('8/8', '-1/4', '1/0', 'two/4', '3'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_each_shard_keeps_its_journal_and_merge_combines_them(self):
+        self.assertEqual(GitHubRepoCloner('projects.csv', self.test_dir, True, shard=(1, 4)).journal_path,
+                         'cloned_log.shard-1-of-4.jsonl')
+        journals = [os.path.join(self.test_dir, shard_journal_path('cloned_log.jsonl', (index, 2)))
+                    for index in range(2)]
+        entries = [[{'ProjectName': 'a/one', 'status': 'cloned'}, {'ProjectName': 'a/two', 'status': 'failed'}],
+                   [{'ProjectName': 'a/two', 'status': 'cloned'}, {'ProjectName': 'a/one', 'status': 'failed'},
+                    {'ProjectName': 'a/three', 'status': 'failed'}]]
+        for path, shard_entries in zip(journals, entries):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(entry) + '\n' for entry in shard_entries)
+
+        merged_path = os.path.join(self.test_dir, 'cloned_log.jsonl')
+        self.assertEqual(merge_journals(journals, merged_path), 3)
+        self.assertEqual(len(read_journal(merged_path)), 3)
+        self.assertEqual(load_cloned(merged_path, None), {'a/one', 'a/two'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+Test Suite for the clone-and-analyze pipeline of the Analysis Service
+Runs AnalysisService._run_job against local bare repositories through file:// URLs
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from web_gui.services.analysis_service import AnalysisService
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent.parent
+EXEC_ANALYSIS_PATH = str(PROJECT_ROOT / 'Categorizer' / 'src' / 'exec_analysis.py')
+CLONER_PATH = str(PROJECT_ROOT / 'cloner' / 'cloner.py')
+GIT_IDENTITY = ['-c', 'user.name=MARK', '-c', 'user.email=mark@example.com']
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason='git is not installed')
+
+
+def make_bare_repo(server_dir, project):
+    """Create <server_dir>/<project>.git with a single commit of a training script."""
+    work = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(work, 'train.py'), 'w') as f:
+            f.write('import torch\nmodel.fit(x, y)\n')
+        subprocess.run(['git', 'init', '-q', work], check=True)
+        subprocess.run(['git', *GIT_IDENTITY, '-C', work, 'add', '.'], check=True)
+        subprocess.run(['git', *GIT_IDENTITY, '-C', work, 'commit', '-q', '-m', 'init'], check=True)
+        subprocess.run(['git', 'clone', '-q', '--bare', work, os.path.join(server_dir, project + '.git')],
+                       check=True)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+@pytest.fixture(scope='function')
+def pipeline_env(tmp_path, monkeypatch):
+    """Bare repositories, dataset CSV and input/output folders of a pipeline job"""
+    # Il journal dei clone e errors.csv sono scritti nella cartella corrente
+    monkeypatch.chdir(tmp_path)
+    server_dir = tmp_path / 'server'
+    projects = [f'owner{i % 2}/repo{i}' for i in range(6)]
+    for project in projects:
+        make_bare_repo(str(server_dir), project)
+    github_csv = tmp_path / 'projects.csv'
+    github_csv.write_text('ProjectName\n' + '\n'.join(projects) + '\n')
+    service = AnalysisService(EXEC_ANALYSIS_PATH, CLONER_PATH, clone_base_url=server_dir.as_uri())
+    return {
+        'service': service,
+        'projects': projects,
+        'github_csv': str(github_csv),
+        'input_path': str(tmp_path / 'input'),
+        'output_path': str(tmp_path / 'output'),
+    }
+
+
+def analyzed_projects(output_path):
+    """Projects recorded as completed in the index of the consumer results"""
+    index_file = os.path.join(output_path, 'Consumers', 'Consumers_Final', 'Consumer_Analysis',
+                              'results_consumer.index.jsonl')
+    if not os.path.exists(index_file):
+        return set()
+    with open(index_file) as f:
+        return {json.loads(line)['project'] for line in f}
+
+
+class TestAnalysisPipeline:
+    """Test cases for AnalysisService._run_pipeline"""
+
+    def _run(self, env, analysis=None, monkeypatch=None, **options):
+        service = env['service']
+        job_id = service.create_job(env['input_path'], env['output_path'], env['github_csv'],
+                                    pipeline=True, **options)
+        batches = []
+        progress = []
+        analyze_batch = service._analyze_batch
+        update_job = service._update_job
+
+        def recording_analysis(worker, job_id, projects):
+            batches.append(list(projects))
+            if analysis is not None:
+                return analysis(len(batches), job_id, lambda: analyze_batch(worker, job_id, projects))
+            return analyze_batch(worker, job_id, projects)
+
+        def recording_update(job_id, **kwargs):
+            if 'progress' in kwargs:
+                progress.append(kwargs['progress'])
+            update_job(job_id, **kwargs)
+
+        monkeypatch.setattr(service, '_analyze_batch', recording_analysis)
+        monkeypatch.setattr(service, '_update_job', recording_update)
+        service.start_job(job_id, run_cloner=True)
+        service.get_job(job_id).thread.join(timeout=120)
+        return service.get_job(job_id), batches, progress
+
+    def test_pipeline_job_completes(self, pipeline_env, monkeypatch):
+        """
+        Every repository is cloned and analyzed once
+
+        Expected: completed, progress only moves forward up to 100
+        """
+        job, batches, progress = self._run(pipeline_env, monkeypatch=monkeypatch, queue_size=3, batch_size=2)
+
+        assert job.status == 'completed', job.error
+        assert job.progress == 100
+        assert progress == sorted(progress)
+        assert sorted(sum(batches, [])) == sorted(pipeline_env['projects'])
+        assert all(len(batch) <= 2 for batch in batches)
+        assert analyzed_projects(pipeline_env['output_path']) == set(pipeline_env['projects'])
+
+    def test_pipeline_does_not_import_the_analysis(self, pipeline_env, monkeypatch):
+        """
+        The batches are analyzed by a separate exec_analysis.py process
+
+        Expected: the Categorizer modules (and their logging setup) are not imported into the server
+        and the cloner folder is not left on sys.path
+        """
+        sys_path = list(sys.path)
+        job, _, _ = self._run(pipeline_env, monkeypatch=monkeypatch)
+
+        assert job.status == 'completed', job.error
+        assert sys.path == sys_path
+        assert 'exec_analysis' not in sys.modules
+        assert 'consumer_classifier_by_dict' not in sys.modules
+
+    def test_pipeline_resumes_after_analysis_failure(self, pipeline_env, monkeypatch):
+        """
+        A job whose first analysis failed is run again
+
+        Expected: the repositories cloned by the first run are analyzed without cloning them again
+        """
+        def fail_first(batch, job_id, analyze):
+            return (False, 'analysis crashed') if batch == 1 else analyze()
+
+        job, _, _ = self._run(pipeline_env, fail_first, monkeypatch)
+        assert job.status == 'failed'
+        assert analyzed_projects(pipeline_env['output_path']) == set()
+        cloned = {f'{owner}/{repo}' for owner in os.listdir(pipeline_env['input_path'])
+                  for repo in os.listdir(os.path.join(pipeline_env['input_path'], owner))}
+        assert cloned
+
+        job, batches, _ = self._run(pipeline_env, monkeypatch=monkeypatch)
+        assert job.status == 'completed', job.error
+        assert sorted(sum(batches, [])) == sorted(pipeline_env['projects'])
+        assert set(batches[0]) <= cloned
+        assert analyzed_projects(pipeline_env['output_path']) == set(pipeline_env['projects'])
+
+        # Nulla da fare: i repository analizzati non vengono rianalizzati
+        job, batches, _ = self._run(pipeline_env, monkeypatch=monkeypatch)
+        assert job.status == 'completed', job.error
+        assert batches == []
+
+    def test_cancel_stops_the_pipeline(self, pipeline_env, monkeypatch):
+        """
+        The job is cancelled while its first batch is being analyzed
+
+        Expected: no further batch is analyzed and the job stays cancelled
+        """
+        service = pipeline_env['service']
+        cancelled = []
+
+        def cancel_during_first(batch, job_id, analyze):
+            result = analyze()
+            cancelled.append(service.cancel_job(job_id))
+            return result
+
+        job, batches, _ = self._run(pipeline_env, cancel_during_first, monkeypatch)
+
+        assert cancelled == [(True, "Job cancelled successfully")]
+        assert len(batches) == 1
+        assert job.status == 'failed'
+        assert job.error == 'Job cancelled by user'
+        assert job.progress < 100
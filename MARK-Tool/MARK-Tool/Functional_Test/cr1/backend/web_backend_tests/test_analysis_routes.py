@@ -109,6 +109,80 @@ class TestAnalysisRoutes:
         assert response_data['success'] is False
     
     
+    def test_start_analysis_with_profile(self, client, test_input_dir, test_output_dir):
+        """
+        Start an analysis with the optional profile flag
+
+        Expected: 200, the job records that exec_analysis.py runs with --profile
+        """
+        data = {
+            'input_path': test_input_dir,
+            'output_path': test_output_dir,
+            'profile': True
+        }
+
+        response = client.post(
+            '/api/analysis/start',
+            data=json.dumps(data),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        response_data = json.loads(response.data)
+        assert response_data['job']['profile'] is True
+
+    def test_start_analysis_with_pipeline(self, client, test_input_dir, test_output_dir):
+        """
+        Start an analysis with the clone-and-analyze pipeline options
+
+        Expected: 200, the job records the pipeline options
+        """
+        data = {
+            'input_path': test_input_dir,
+            'output_path': test_output_dir,
+            'pipeline': True,
+            'delete_after_analysis': True,
+            'queue_size': 8,
+            'batch_size': 2
+        }
+
+        response = client.post(
+            '/api/analysis/start',
+            data=json.dumps(data),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        response_data = json.loads(response.data)
+        assert response_data['job']['pipeline'] is True
+        assert response_data['job']['delete_after_analysis'] is True
+        assert response_data['job']['queue_size'] == 8
+        assert response_data['job']['batch_size'] == 2
+
+    def test_start_analysis_with_invalid_queue_size(self, client, test_input_dir, test_output_dir):
+        """
+        Start a pipeline analysis with a queue size that is not a positive integer
+
+        Expected: 400
+        """
+        for queue_size in (0, -1, '4', True):
+            data = {
+                'input_path': test_input_dir,
+                'output_path': test_output_dir,
+                'pipeline': True,
+                'queue_size': queue_size
+            }
+
+            response = client.post(
+                '/api/analysis/start',
+                data=json.dumps(data),
+                content_type='application/json'
+            )
+
+            assert response.status_code == 400
+            assert 'queue_size' in json.loads(response.data)['message']
+
+    
     # ============================================================================
     # TC-A05 to TC-A06: GET /api/analysis/status/<job_id>
     # ============================================================================
@@ -0,0 +1,205 @@
+import asyncio
+import os
+import shutil
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+GITHUB_URL = "https://github.com"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 2.0
+
+# Errori per cui un nuovo tentativo non serve (repository inesistente, privato o gia' clonato)
+PERMANENT_ERRORS = ("not found", "does not exist", "could not read username", "authentication failed",
+                    "already exists and is not an empty directory")
+
+# File letti dall'analisi (e i .gitignore, per --gitignore): gli unici estratti da un clone sparse
+SPARSE_PATTERNS = ("*.py", "*.ipynb", ".gitignore")
+
+CloneResult = namedtuple("CloneResult", ["project", "url", "path", "ok", "attempts", "error", "seconds"])
+
+
+def is_permanent(error):
+    return any(pattern in error.lower() for pattern in PERMANENT_ERRORS)
+
+
+class HostRateLimiter:
+    """Spaces the start of the clones towards the same host by at least 1/rate seconds."""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        # Nessun await tra lettura e aggiornamento: sicuro nel singolo event loop
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class CloneProgress:
+    """Completed / failed / remaining counters of a cloning run, printed after every repository."""
+
+    def __init__(self, total):
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def remaining(self):
+        return self.total - self.completed - self.failed
+
+    def update(self, result):
+        if result.ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        print(f"[Cloner] completed={self.completed} failed={self.failed} remaining={self.remaining} "
+              f"({result.project}: {'ok' if result.ok else 'failed'}, {result.seconds:.1f}s)", flush=True)
+
+
+class AsyncRepoCloner:
+    """
+    Clones repositories with git subprocesses driven by an asyncio event loop.
+
+    At most concurrency clones run at the same time and, with rate, the clones
+    towards the same host start at most rate times per second. Failed clones
+    are retried up to retries times with exponential backoff, unless git
+    reports a permanent error; a clone waiting for its retry does not hold
+    one of the concurrency slots. Repositories are fetched from
+    <base_url>/<owner>/<repo>.git, so a file:// base URL pointing to a folder
+    of bare repositories works offline.
+
+    With sparse_patterns the clone is blobless (--filter=blob:none) and only
+    the files matching the patterns are checked out, so the blobs of
+    datasets, weights and media are never downloaded. A server without
+    filter support sends every blob (git ignores the filter), and if the
+    sparse checkout fails the repository is cloned again normally.
+    """
+
+    def __init__(self, base_url=GITHUB_URL, concurrency=DEFAULT_CONCURRENCY, rate=None, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, depth=1, timeout=None, git="git", sparse_patterns=None):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, concurrency or 1)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.depth = depth
+        self.timeout = timeout
+        self.git = git
+        self.sparse_patterns = tuple(sparse_patterns or ())
+        self.rate_limiter = HostRateLimiter(rate)
+        self.progress = None
+
+    def repo_url(self, project):
+        return f"{self.base_url}/{project}.git"
+
+    def clone_command(self, url, path, options=()):
+        command = [self.git, "clone", "--quiet"]
+        if self.depth:
+            command += ["--depth", str(self.depth)]
+        return command + list(options) + [url, path]
+
+    async def _git(self, command):
+        """Run a git command; return (returncode, stderr)."""
+        # Nessun prompt di credenziali: un repository privato o rimosso fallisce subito
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.DEVNULL,
+                                                       stderr=asyncio.subprocess.PIPE, env=env)
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return -1, f"timed out after {self.timeout}s"
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        return process.returncode, stderr.decode("utf-8", "replace").strip()
+
+    async def _sparse_clone(self, url, path):
+        returncode, error = await self._git(self.clone_command(url, path, ["--filter=blob:none", "--no-checkout"]))
+        if returncode == 0:
+            returncode, error = await self._git(
+                [self.git, "-C", path, "sparse-checkout", "set", "--no-cone", *self.sparse_patterns])
+        if returncode == 0:
+            # Il checkout scarica in un'unica richiesta solo i blob dei file selezionati
+            returncode, error = await self._git([self.git, "-C", path, "checkout", "--quiet"])
+        return returncode, error
+
+    async def _clone_once(self, url, path):
+        if not self.sparse_patterns:
+            return await self._git(self.clone_command(url, path))
+        existed = os.path.exists(path)
+        returncode, error = await self._sparse_clone(url, path)
+        if returncode == 0 or is_permanent(error):
+            return returncode, error
+        if not existed:
+            shutil.rmtree(path, ignore_errors=True)
+        print(f"[Cloner] sparse clone of {url} failed ({error}), falling back to a full clone", flush=True)
+        return await self._git(self.clone_command(url, path))
+
+    async def clone(self, project, path, semaphore):
+        url = self.repo_url(project)
+        host = urlparse(url).netloc or "local"
+        existed = os.path.exists(path)
+        start = time.monotonic()
+        error = None
+        attempt = 0
+        while attempt <= self.retries:
+            attempt += 1
+            async with semaphore:
+                await self.rate_limiter.wait(host)
+                returncode, error = await self._clone_once(url, path)
+            if returncode == 0:
+                return CloneResult(project, url, path, True, attempt, None, time.monotonic() - start)
+            if not existed:
+                # Un clone interrotto lascia una cartella parziale che farebbe fallire il tentativo successivo
+                shutil.rmtree(path, ignore_errors=True)
+            if is_permanent(error):
+                break
+            if attempt <= self.retries:
+                # Il backoff avviene fuori dal semaforo: l'attesa non occupa lo slot di un altro clone
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+        return CloneResult(project, url, path, False, attempt, error, time.monotonic() - start)
+
+    async def _admitted_clone(self, project, path, semaphore, admit):
+        if await admit() is False:
+            return None
+        return await self.clone(project, path, semaphore)
+
+    async def clone_all(self, jobs, on_result=None, admit=None):
+        """
+        Clone every (project, path) job; return the CloneResults in completion order.
+
+        on_result is called in the event loop thread as soon as each clone
+        finishes, so it does not need any locking. admit, if given, is awaited
+        before each clone starts, e.g. to bound the repositories waiting for
+        the next stage (see ClonePipeline); if it returns False the clone is
+        skipped and has no result.
+        """
+        jobs = list(jobs)
+        self.progress = CloneProgress(len(jobs))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if admit is None:
+            tasks = [asyncio.ensure_future(self.clone(project, path, semaphore)) for project, path in jobs]
+        else:
+            tasks = [asyncio.ensure_future(self._admitted_clone(project, path, semaphore, admit))
+                     for project, path in jobs]
+        results = []
+        for future in asyncio.as_completed(tasks):
+            result = await future
+            if result is None:
+                continue
+            self.progress.update(result)
+            if on_result is not None:
+                on_result(result)
+            results.append(result)
+        return results
+
+    def run(self, jobs, on_result=None):
+        return asyncio.run(self.clone_all(jobs, on_result))
@@ -0,0 +1,124 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+DEFAULT_JOURNAL = "cloned_log.jsonl"
+LEGACY_CLONED_LOG = "cloned_log.csv"
+
+_STOP = object()
+
+
+class CloneJournal:
+    """
+    Append-only JSON lines journal of the clone outcomes.
+
+    record() only puts the entry on a queue: a single writer thread appends
+    it to the file and flushes it, so recording a clone is O(1) and never
+    blocks the event loop or other writers. Use it as a context manager, the
+    queue is drained on exit.
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL):
+        self.path = path
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def _write_entries(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                entry = self._queue.get()
+                if entry is _STOP:
+                    break
+                f.write(json.dumps(entry) + "\n")
+                # Flush per riga: dopo un'interruzione il journal contiene tutti i clone completati
+                f.flush()
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = threading.Thread(target=self._write_entries, name="CloneJournal", daemon=True)
+        self._writer.start()
+        return self
+
+    def record(self, row, result):
+        """Queue the outcome of a clone; row holds the dataset columns (ml_libs, count, ...)."""
+        entry = {"ProjectName": result.project, "status": "cloned" if result.ok else "failed",
+                 "repo_url": result.url, "attempts": result.attempts, "seconds": round(result.seconds, 3),
+                 "timestamp": time.time()}
+        for column in ("ml_libs", "count"):
+            if column in row and pd.notna(row[column]):
+                value = row[column]
+                entry[column] = value.item() if hasattr(value, "item") else value
+        if not result.ok:
+            entry["error"] = result.error
+        self._queue.put(entry)
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def shard_journal_path(path, shard):
+    """Journal of a shard (index, count), e.g. cloned_log.shard-0-of-4.jsonl."""
+    index, count = shard
+    base, ext = os.path.splitext(path)
+    return f"{base}.shard-{index}-of-{count}{ext or '.jsonl'}"
+
+
+def read_journal(path):
+    """Entries of a journal, skipping a truncated last line left by an interrupted run."""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def load_cloned(path=DEFAULT_JOURNAL, legacy_log=LEGACY_CLONED_LOG):
+    """Set of the ProjectNames already cloned, from the journal and the CSV log of older versions."""
+    cloned = {entry["ProjectName"] for entry in read_journal(path) if entry.get("status") == "cloned"}
+    if legacy_log and os.path.exists(legacy_log):
+        try:
+            cloned.update(pd.read_csv(legacy_log, usecols=["ProjectName"])["ProjectName"])
+        except pd.errors.EmptyDataError:
+            pass
+    return cloned
+
+
+def merge_journals(paths, output):
+    """
+    Merge the journals of several shards into output, one entry per project.
+
+    A successful clone wins over the failures recorded for the same project,
+    otherwise the last entry wins. output may be one of the merged journals.
+    """
+    merged = {}
+    for path in paths:
+        for entry in read_journal(path):
+            previous = merged.get(entry["ProjectName"])
+            if previous is None or previous.get("status") != "cloned" or entry.get("status") == "cloned":
+                merged[entry["ProjectName"]] = entry
+    tmp_file = output + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        for entry in merged.values():
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp_file, output)
+    return len(merged)
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import queue
+import shutil
+import threading
+from collections import Counter
+
+DEFAULT_QUEUE_SIZE = 4
+DEFAULT_BATCH_SIZE = 4
+
+_DONE = object()
+
+
+class ClonePipeline:
+    """
+    Overlaps the cloning of a dataset with the analysis of the repositories already cloned.
+
+    The clones run on an event loop in a background thread. Every cloned
+    repository is put on a queue and analyze is called in the calling thread
+    with the "owner/repo" names of up to batch_size repositories as soon as
+    they are available; it returns whether the analysis succeeded.
+
+    The clones and the analysis queue are bounded separately. Up to the
+    concurrency of the cloner clones run at once, and each one frees its
+    place as soon as it finishes. A new clone starts only while fewer than
+    queue_size cloned repositories are waiting for (or in) their analysis.
+    With delete_after_analysis at most queue_size + concurrency repositories
+    are on disk, however large the dataset is.
+
+    Repositories already on disk (e.g. cloned by an interrupted run but not
+    analyzed yet) can be passed to run as ready: they are analyzed first,
+    without cloning them, and count in the analysis queue.
+    """
+
+    def __init__(self, repo_cloner, analyze, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 delete_after_analysis=False, on_result=None):
+        self.repo_cloner = repo_cloner
+        self.analyze = analyze
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.delete_after_analysis = delete_after_analysis
+        # Chiamato nel thread dell'event loop con il CloneResult di ogni repository
+        self.on_result = on_result
+        self.analyzed = 0
+        # Il limite e' imposto da _admit: la coda stessa non e' limitata, cosi' il segnale di fine non blocca mai
+        self._queue = queue.Queue()
+        self._loop = None
+        # Clone in corso e repository messi in coda (pronti o clonati), aggiornati nel thread dell'event loop;
+        # quelli in attesa dell'analisi sono _queued - analyzed
+        self._cloning = 0
+        self._queued = 0
+        self._room = None
+        self._stopping = False
+        self._error = None
+        # Repository ancora da completare per owner: la cartella dell'owner si rimuove solo dopo l'ultimo
+        self._pending_owners = Counter()
+        self._owners_lock = threading.Lock()
+
+    def _on_result(self, result):
+        # Il clone terminato libera subito il suo posto; se riuscito, il repository entra nella coda dell'analisi
+        self._cloning -= 1
+        if result.ok:
+            self._queued += 1
+            self._queue.put(result.project)
+        else:
+            self._done(result.project)
+        self._room.set()
+        if self.on_result is not None:
+            self.on_result(result)
+
+    async def _admit(self):
+        concurrency = self.repo_cloner.async_cloner.concurrency
+        while not self._stopping and (self._queued - self.analyzed >= self.queue_size
+                                      or self._cloning >= concurrency):
+            self._room.clear()
+            await self._room.wait()
+        if self._stopping:
+            return False
+        self._cloning += 1
+        return True
+
+    async def _clone(self, rows):
+        # Prima l'evento e poi il loop: chi vede il loop puo' sempre svegliare i clone in attesa
+        self._room = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self._stopping:
+            return
+        await self.repo_cloner.clone_rows(rows, on_result=self._on_result, admit=self._admit)
+
+    def _clone_stage(self, rows):
+        try:
+            asyncio.run(self._clone(rows))
+        except Exception as e:
+            self._error = e
+        finally:
+            self._queue.put(_DONE)
+
+    def _wake(self):
+        # Senza loop (non ancora avviato o gia' chiuso) nessun clone e' in attesa: _admit rilegge i contatori
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._room.set)
+            except RuntimeError:
+                pass
+
+    def _done(self, project, delete=False):
+        if delete:
+            shutil.rmtree(self.repo_cloner.clone_path(project), ignore_errors=True)
+        owner = project.split("/")[0]
+        with self._owners_lock:
+            self._pending_owners[owner] -= 1
+            last = self._pending_owners[owner] <= 0
+        if last and self.delete_after_analysis:
+            # Nessun altro repository dell'owner in coda o in clonazione; resta se contiene altri file
+            try:
+                os.rmdir(self.repo_cloner.top_level_dir(project))
+            except OSError:
+                pass
+
+    def stop(self):
+        """
+        Skip the clones not started yet; run returns before the next analysis.
+
+        The clones already running are not cancelled (at most concurrency):
+        they finish and are recorded in the journal, so a later run can
+        analyze them without cloning them again.
+        """
+        self._stopping = True
+        # Ogni clone in attesa di posto viene svegliato e, con la pipeline ferma, saltato
+        self._wake()
+
+    def run(self, rows, ready=()):
+        """
+        Clone and analyze rows, after the ready repositories.
+
+        Return False (and stop cloning) as soon as an analysis fails or the
+        pipeline is stopped.
+        """
+        ready = set(ready)
+        names = {row["ProjectName"] for row in rows} | ready
+        self._pending_owners = Counter(name.split("/")[0] for name in names)
+        self._queued = len(ready)
+        for project in sorted(ready):
+            self._queue.put(project)
+        clone_thread = threading.Thread(target=self._clone_stage, args=(rows,), name="ClonePipeline", daemon=True)
+        clone_thread.start()
+        done = False
+        ok = True
+        try:
+            while not done:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size and batch[-1] is not _DONE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch[-1] is _DONE:
+                    batch.pop()
+                    done = True
+                if not batch:
+                    continue
+                if self._stopping:
+                    ok = False
+                    break
+                if not self.analyze(batch):
+                    ok = False
+                    break
+                for project in batch:
+                    self._done(project, delete=self.delete_after_analysis)
+                # Il lotto lascia la coda dell'analisi solo dopo l'eventuale cancellazione dei repository
+                self.analyzed += len(batch)
+                self._wake()
+        finally:
+            if not done:
+                self.stop()
+            clone_thread.join()
+        if self._error is not None:
+            raise self._error
+        return ok and not self._stopping
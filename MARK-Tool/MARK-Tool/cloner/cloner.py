@@ -1,79 +1,125 @@
-import git
+import asyncio
 import pandas as pd
-from git import Repo
-import concurrent.futures
-from threading import Lock
 import os
 import argparse
+import zlib
+
+from async_cloner import AsyncRepoCloner, GITHUB_URL, DEFAULT_CONCURRENCY, DEFAULT_RETRIES, SPARSE_PATTERNS
+from clone_journal import CloneJournal, DEFAULT_JOURNAL, load_cloned, merge_journals, shard_journal_path
+
+
+def shard_of(repo_full_name, count):
+    # crc32 e' stabile tra macchine ed esecuzioni, a differenza di hash()
+    return zlib.crc32(repo_full_name.encode("utf-8")) % count
+
+
+def parse_shard(value):
+    """Parse an "i/N" shard specification (0 <= i < N) into (i, N)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', expected i/N (e.g. 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', expected 0 <= i < N")
+    return index, count
 
 
 class GitHubRepoCloner:
-    def __init__(self, input_file, output_path, no_repos2):
+    def __init__(self, input_file, output_path, no_repos2, base_url=GITHUB_URL, concurrency=DEFAULT_CONCURRENCY,
+                 rate=None, retries=DEFAULT_RETRIES, timeout=None, journal_path=None, offset=0, limit=None,
+                 shard=None, sparse=False):
         self.input_file = input_file
         self.output_path = output_path
         self.no_repos2 = no_repos2
+        self.offset = offset
+        self.limit = limit
+        self.shard = shard
+        # Ogni shard ha il proprio journal, da unire con merge_journals a fine lavoro
+        if journal_path is None:
+            journal_path = shard_journal_path(DEFAULT_JOURNAL, shard) if shard else DEFAULT_JOURNAL
+        self.journal_path = journal_path
+        self.async_cloner = AsyncRepoCloner(base_url=base_url, concurrency=concurrency, rate=rate, retries=retries,
+                                            timeout=timeout, sparse_patterns=SPARSE_PATTERNS if sparse else None)
 
-    def __search(self, row, lock):
-        repo_full_name = row["ProjectName"]
-        repo_url = f'https://github.com/{repo_full_name}.git'
-
-        # Cloning path
+    def clone_path(self, repo_full_name):
         if self.no_repos2:
-            clone_path = f'{self.output_path}/{repo_full_name}'
-        else:
-            clone_path = f'{self.output_path}/repos2/{repo_full_name}'
-
-        try:
-            print(f'cloning {repo_full_name}')
-            Repo.clone_from(repo_url, clone_path, depth=1)
-            print(f'cloned {repo_full_name}')
-        except git.exc.GitError as e:
-            print(f'error cloning  {repo_full_name}')
-            with lock:
-                with open('errors.csv', 'a', encoding='utf-8') as error_log:
-                    error = e.__str__().replace("'", "").replace("\n", "")
-                    str = f"{repo_full_name},{repo_url},'{error}'"
-                    error_log.write(str + '\n')
-                return
-        print(f'analyzed {repo_full_name}')
-        print(f'saving {repo_full_name}')
-        with lock:
-            try:
-                cloned_log = pd.read_csv('cloned_log.csv')
-                cloned_log = cloned_log.append(row, ignore_index=True)
-                cloned_log.to_csv('cloned_log.csv', index=False)
-            except:
-                print(f'error saving {repo_full_name}')
-        print(f'saved {repo_full_name}')
-
-        # Return top-level directory to optionally delete
+            return f'{self.output_path}/{repo_full_name}'
+        return f'{self.output_path}/repos2/{repo_full_name}'
+
+    def top_level_dir(self, repo_full_name):
+        """Top-level (owner) directory of a cloned repository, to optionally delete."""
         if self.no_repos2:
             return os.path.join(self.output_path, repo_full_name.split("/")[0])
-        else:
-            return os.path.join(self.output_path, "repos2", repo_full_name.split("/")[0])
+        return os.path.join(self.output_path, "repos2", repo_full_name.split("/")[0])
+
+    def _record(self, journal, row, result):
+        # Chiamato nel thread dell'event loop: il journal accoda l'esito, la scrittura avviene nel suo thread
+        repo_full_name = row["ProjectName"]
+        journal.record(row, result)
+        if not result.ok:
+            print(f'error cloning  {repo_full_name} after {result.attempts} attempt(s)')
+            with open('errors.csv', 'a', encoding='utf-8') as error_log:
+                error = result.error.replace("'", "").replace("\n", "")
+                error_log.write(f"{repo_full_name},{result.url},'{error}'\n")
+            return
+        print(f'cloned {repo_full_name}')
 
     def start_search(self, iterable, max_workers=None):
-        writer_lock = Lock()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            for repo in iterable:
-                _ = executor.submit(self.__search, repo, writer_lock)
+        """Clone the rows of the dataset; return the CloneResults (max_workers overrides the concurrency)."""
+        if max_workers:
+            self.async_cloner.concurrency = max_workers
+        return asyncio.run(self.clone_rows(iterable))
 
-    def run(self):
-        df = pd.read_csv(f'{self.input_file}', delimiter=",")
-        df = df.head(10)
-        if os.path.exists('cloned_log.csv'):
-            cloned_log = pd.read_csv('cloned_log.csv', delimiter=",")
-            df = df[~df['ProjectName'].isin(cloned_log['ProjectName'])]
-            print(len(df))
-        else:
-            cloned_log = pd.DataFrame(columns=['ProjectName', 'repo_url', 'ml_libs', 'count'])
-            cloned_log.to_csv('cloned_log.csv', index=False)
+    async def clone_rows(self, iterable, on_result=None, admit=None):
+        """
+        Coroutine variant of start_search for callers driving their own event loop.
+
+        on_result and admit are passed to AsyncRepoCloner.clone_all; on_result
+        is called after the outcome has been recorded.
+        """
+        rows = {row["ProjectName"]: row for row in iterable}
+        jobs = [(repo_full_name, self.clone_path(repo_full_name)) for repo_full_name in rows]
+
+        def record(result):
+            self._record(journal, rows[result.project], result)
+            if on_result is not None:
+                on_result(result)
+
+        with CloneJournal(self.journal_path) as journal:
+            return await self.async_cloner.clone_all(jobs, on_result=record, admit=admit)
+
+    def select_rows(self, df):
+        """Rows of the dataset handled by this run: the offset/limit slice, then the rows of the shard."""
+        if self.offset:
+            df = df.iloc[self.offset:]
+        if self.limit is not None:
+            df = df.head(self.limit)
+        if self.shard:
+            index, count = self.shard
+            df = df[df['ProjectName'].map(lambda repo_full_name: shard_of(repo_full_name, count) == index)]
+        return df
 
+    def selected_rows(self):
+        """DataFrame of the dataset rows selected for this run (see select_rows), cloned or not."""
+        return self.select_rows(pd.read_csv(f'{self.input_file}', delimiter=","))
+
+    def pending_rows(self):
+        """Rows of the dataset selected for this run and not cloned yet."""
+        df = self.selected_rows()
+        # Ripresa: i progetti gia' clonati (journal e cloned_log.csv delle versioni precedenti) vengono saltati
+        cloned = load_cloned(self.journal_path)
+        df = df[~df['ProjectName'].isin(cloned)]
         print("The size of results is " + str(len(df)))
+        return [x for _, x in df.iterrows()]
+
+    def run(self):
+        iterable = self.pending_rows()
         os.makedirs(f'{self.output_path}/repos', exist_ok=True)
-        iterable = [x for _, x in df.iterrows()]
         print(f'to analyze: {len(iterable)} repos')
-        self.start_search(iterable)
+        results = self.start_search(iterable)
+        failed = sum(1 for result in results if not result.ok)
+        print(f'cloned: {len(results) - failed} repos, failed: {failed} repos')
+        return results
 
 
 if __name__ == "__main__":
@@ -82,7 +128,34 @@ if __name__ == "__main__":
     parser.add_argument("--input", type=str, help="Path to the input folder")
     parser.add_argument("--output", type=str, help="Path to the output folder")
     parser.add_argument("--no_repos2", action="store_true", help="If set, the repositories will be cloned in the output folder directly, ")
+    parser.add_argument("--base_url", type=str, default=GITHUB_URL,
+                        help="Base URL of the repositories, cloned from <base_url>/<owner>/<repo>.git "
+                             "(e.g. file:///srv/mirrors for local bare repositories)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of clones running at the same time")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Maximum number of clones started per second towards the same host")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="Retries of a failed clone, with exponential backoff")
+    parser.add_argument("--timeout", type=float, default=None, help="Timeout in seconds of a single clone")
+    parser.add_argument("--sparse", action="store_true",
+                        help="Blobless clone checking out only the .py and .ipynb files (and .gitignore)")
+    parser.add_argument("--journal", type=str, default=None,
+                        help=f"JSON lines journal of the clone outcomes, used to resume an interrupted run "
+                             f"(default {DEFAULT_JOURNAL}, or one journal per shard)")
+    parser.add_argument("--offset", type=int, default=0, help="Skip the first OFFSET rows of the dataset")
+    parser.add_argument("--limit", type=int, default=None, help="Clone at most LIMIT rows of the dataset")
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="Clone only the shard i of N (0 <= i < N) of the dataset, e.g. 0/4")
+    parser.add_argument("--merge", nargs="+", metavar="JOURNAL",
+                        help="Merge the journals of the shards into --journal and exit")
     args = parser.parse_args()
+    if args.merge:
+        merged_journal = args.journal or DEFAULT_JOURNAL
+        merged = merge_journals(args.merge, merged_journal)
+        print(f"Merged {len(args.merge)} journals into {merged_journal}: {merged} repos")
+        exit(0)
+
     input_file = args.input
     output_path = args.output
     no_repos2 = args.no_repos2
@@ -96,5 +169,8 @@ if __name__ == "__main__":
         print("Usa il comando: python cloner.py --input <input_file.csv> --output <output_folder>")
         exit(0)
 
-    cloner = GitHubRepoCloner(input_file, output_path, no_repos2)
+    cloner = GitHubRepoCloner(input_file, output_path, no_repos2, base_url=args.base_url,
+                              concurrency=args.concurrency, rate=args.rate, retries=args.retries,
+                              timeout=args.timeout, journal_path=args.journal, offset=args.offset,
+                              limit=args.limit, shard=args.shard, sparse=args.sparse)
     cloner.run()
\ No newline at end of file
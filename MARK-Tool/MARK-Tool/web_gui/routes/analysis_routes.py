@@ -28,7 +28,12 @@ def start_analysis():
         "input_path": "/path/to/repos",
         "output_path": "/path/to/results",
         "github_csv": "/path/to/csv" (optional),
-        "run_cloner": true/false (optional, default: false)
+        "run_cloner": true/false (optional, default: false),
+        "profile": true/false (optional, default: false),
+        "pipeline": true/false (optional, default: false),
+        "delete_after_analysis": true/false (optional, default: false),
+        "queue_size": positive integer (optional, pipeline only),
+        "batch_size": positive integer (optional, pipeline only)
     }
     
     Response JSON:
@@ -67,9 +72,22 @@ def start_analysis():
         # Optional fields
         github_csv = data.get('github_csv')
         run_cloner = data.get('run_cloner', False)
+        profile = bool(data.get('profile', False))
+        pipeline = bool(data.get('pipeline', False))
+        delete_after_analysis = bool(data.get('delete_after_analysis', False))
+        queue_size = data.get('queue_size')
+        batch_size = data.get('batch_size')
+        
+        for name, value in (('queue_size', queue_size), ('batch_size', batch_size)):
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+                return jsonify({
+                    'success': False,
+                    'message': f'{name} must be a positive integer'
+                }), 400
         
         # Create job
-        job_id = analysis_service.create_job(input_path, output_path, github_csv)
+        job_id = analysis_service.create_job(input_path, output_path, github_csv, profile, pipeline,
+                                             delete_after_analysis, queue_size, batch_size)
         
         # Start job
         success, message = analysis_service.start_job(job_id, run_cloner)
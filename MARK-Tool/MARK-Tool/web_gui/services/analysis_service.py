@@ -7,18 +7,26 @@ import subprocess
 import threading
 import time
 import uuid
-from typing import Optional, Dict, Tuple
+from collections import deque
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
 
 
 class AnalysisJob:
     """Represents an analysis job"""
     
-    def __init__(self, job_id: str, input_path: str, output_path: str, github_csv: Optional[str] = None):
+    def __init__(self, job_id: str, input_path: str, output_path: str, github_csv: Optional[str] = None,
+                 profile: bool = False, pipeline: bool = False, delete_after_analysis: bool = False,
+                 queue_size: Optional[int] = None, batch_size: Optional[int] = None):
         self.job_id = job_id
         self.input_path = input_path
         self.output_path = output_path
         self.github_csv = github_csv
+        self.profile = profile  # Run exec_analysis.py with --profile
+        self.pipeline = pipeline  # Analyze each repository as soon as it is cloned
+        self.delete_after_analysis = delete_after_analysis  # Pipeline only: remove analyzed repositories
+        self.queue_size = queue_size  # Pipeline only: cloned repositories waiting for analysis (None: default)
+        self.batch_size = batch_size  # Pipeline only: repositories per analysis batch (None: default)
         self.status = 'pending'  # pending, running, completed, failed
         self.progress = 0
         self.message = 'Job created'
@@ -27,6 +35,8 @@ class AnalysisJob:
         self.error = None
         self.process = None
         self.thread = None
+        self.pipeline_runner = None  # ClonePipeline of a pipeline job, stopped on cancellation
+        self.cancelled = False
         self.output_log = []
     
     def to_dict(self) -> Dict:
@@ -36,6 +46,11 @@ class AnalysisJob:
             'input_path': self.input_path,
             'output_path': self.output_path,
             'github_csv': self.github_csv,
+            'profile': self.profile,
+            'pipeline': self.pipeline,
+            'delete_after_analysis': self.delete_after_analysis,
+            'queue_size': self.queue_size,
+            'batch_size': self.batch_size,
             'status': self.status,
             'progress': self.progress,
             'message': self.message,
@@ -49,20 +64,24 @@ class AnalysisJob:
 class AnalysisService:
     """Service for managing analysis jobs"""
     
-    def __init__(self, exec_analysis_path: str, cloner_path: str):
+    def __init__(self, exec_analysis_path: str, cloner_path: str, clone_base_url: Optional[str] = None):
         """
         Initialize the analysis service
         
         Args:
             exec_analysis_path: Path to exec_analysis.py
             cloner_path: Path to cloner.py
+            clone_base_url: Optional base URL the pipeline clones from (default GitHub)
         """
         self.exec_analysis_path = exec_analysis_path
         self.cloner_path = cloner_path
+        self.clone_base_url = clone_base_url
         self.jobs: Dict[str, AnalysisJob] = {}
         self.lock = threading.Lock()
     
-    def create_job(self, input_path: str, output_path: str, github_csv: Optional[str] = None) -> str:
+    def create_job(self, input_path: str, output_path: str, github_csv: Optional[str] = None,
+                   profile: bool = False, pipeline: bool = False, delete_after_analysis: bool = False,
+                   queue_size: Optional[int] = None, batch_size: Optional[int] = None) -> str:
         """
         Create a new analysis job
         
@@ -70,6 +89,13 @@ class AnalysisService:
             input_path: Path to input folder
             output_path: Path to output folder
             github_csv: Optional path to GitHub CSV file
+            profile: Whether to profile the analysis (.pstats and collapsed stacks in output_path)
+            pipeline: With the cloner, analyze each repository as soon as its clone finishes
+            delete_after_analysis: In pipeline mode, delete each repository once analyzed
+            queue_size: In pipeline mode, cloned repositories that may wait for their analysis
+                before new clones are paused (default: cloner/clone_pipeline.py)
+            batch_size: In pipeline mode, repositories sent to the analysis at once
+                (default: cloner/clone_pipeline.py)
             
         Returns:
             Job ID
@@ -77,7 +103,8 @@ class AnalysisService:
         job_id = str(uuid.uuid4())
         
         with self.lock:
-            job = AnalysisJob(job_id, input_path, output_path, github_csv)
+            job = AnalysisJob(job_id, input_path, output_path, github_csv, profile, pipeline,
+                              delete_after_analysis, queue_size, batch_size)
             self.jobs[job_id] = job
         
         return job_id
@@ -150,6 +177,24 @@ class AnalysisService:
             return
         
         try:
+            # Clone and analysis overlapped: each repository is analyzed as soon as it is cloned
+            if run_cloner and job.github_csv and job.pipeline:
+                self._update_job(job_id, status='running', progress=10,
+                               message='Running clone and analysis pipeline...')
+                
+                success, message = self._run_pipeline(job_id)
+                
+                # Lo stato di un job annullato e' gia' stato impostato da cancel_job
+                if job.cancelled:
+                    return
+                
+                if not success:
+                    self._update_job(job_id, status='failed', error=message)
+                    return
+                
+                self._update_job(job_id, status='completed', progress=100, message=message)
+                return
+            
             # Step 1: Run cloner if requested and GitHub CSV provided
             if run_cloner and job.github_csv:
                 self._update_job(job_id, status='running', progress=10, 
@@ -157,6 +202,9 @@ class AnalysisService:
                 
                 success, message = self._run_cloner(job.input_path, job.github_csv)
                 
+                if job.cancelled:
+                    return
+                
                 if not success:
                     self._update_job(job_id, status='failed', 
                                    error=f"Cloner failed: {message}")
@@ -171,6 +219,9 @@ class AnalysisService:
             
             success, message = self._run_analysis(job.input_path, job.output_path, job_id)
             
+            if job.cancelled:
+                return
+            
             if not success:
                 self._update_job(job_id, status='failed', 
                                error=f"Analysis failed: {message}")
@@ -181,8 +232,9 @@ class AnalysisService:
                            message='Analysis completed successfully')
             
         except Exception as e:
-            self._update_job(job_id, status='failed', 
-                           error=f"Unexpected error: {str(e)}")
+            if not job.cancelled:
+                self._update_job(job_id, status='failed', 
+                               error=f"Unexpected error: {str(e)}")
     
     def _run_cloner(self, input_path: str, github_csv: str) -> Tuple[bool, str]:
         """
@@ -223,6 +275,223 @@ class AnalysisService:
         except Exception as e:
             return False, f"Error running cloner: {str(e)}"
     
+    def _import_cloner(self):
+        """
+        Import the pipeline modules of the cloner
+
+        Their folder is on sys.path only for the import (cloner.py imports async_cloner
+        and clone_journal next to it), so it does not shadow modules of the server.
+        """
+        cloner_dir = os.path.dirname(os.path.abspath(self.cloner_path))
+        sys.path.insert(0, cloner_dir)
+        try:
+            from cloner import GitHubRepoCloner
+            from clone_journal import load_cloned
+            from clone_pipeline import ClonePipeline
+        finally:
+            sys.path.remove(cloner_dir)
+        return GitHubRepoCloner, load_cloned, ClonePipeline
+    
+    def _run_pipeline(self, job_id: str) -> Tuple[bool, str]:
+        """
+        Clone the repositories of the job's GitHub CSV and analyze each one as soon as it is cloned
+        
+        The clones run in this process (see cloner/clone_pipeline.py); the batches of
+        cloned repositories are sent to a single exec_analysis.py --projects_from_stdin
+        process, which keeps the analyzers and the results open for the whole job.
+        Repositories already analyzed in the output path are skipped, and those cloned
+        by an interrupted run but not analyzed yet are analyzed without cloning them again.
+        
+        Args:
+            job_id: Job ID
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        job = self.get_job(job_id)
+        if not job:
+            return False, "Job not found"
+        
+        GitHubRepoCloner, load_cloned, ClonePipeline = self._import_cloner()
+        options = {'base_url': self.clone_base_url} if self.clone_base_url else {}
+        repo_cloner = GitHubRepoCloner(job.github_csv, job.input_path, True, **options)
+        
+        worker, analyzed, message = self._start_analysis_worker(job_id)
+        if worker is None:
+            return False, f"Analysis failed: {message}"
+        
+        try:
+            # Ripresa: il lavoro si sceglie dai risultati dell'analisi, non solo dal journal dei clone
+            cloned = load_cloned(repo_cloner.journal_path)
+            rows, ready = [], []
+            for _, row in repo_cloner.selected_rows().iterrows():
+                project = row['ProjectName']
+                if project in analyzed:
+                    continue
+                if project in cloned and os.path.isdir(repo_cloner.clone_path(project)):
+                    ready.append(project)
+                else:
+                    rows.append(row)
+            total = len(rows) + len(ready)
+            failure = []
+            
+            def on_result(result):
+                if result.ok:
+                    self._add_log(job_id, f"Cloned {result.project}")
+                else:
+                    self._add_log(job_id, f"Clone failed {result.project}: {result.error}")
+            
+            def analyze(projects: List[str]) -> bool:
+                success, message = self._analyze_batch(worker, job_id, projects)
+                if not success:
+                    failure.append(message)
+                    return False
+                analyzed = pipeline.analyzed + len(projects)
+                self._update_job(job_id, progress=10 + int(80 * analyzed / max(total, 1)),
+                                 message=f'Analyzed {analyzed}/{total} repositories')
+                return True
+            
+            sizes = {name: size for name, size in (('queue_size', job.queue_size), ('batch_size', job.batch_size))
+                     if size is not None}
+            pipeline = ClonePipeline(repo_cloner, analyze, delete_after_analysis=job.delete_after_analysis,
+                                     on_result=on_result, **sizes)
+            with self.lock:
+                job.pipeline_runner = pipeline
+                cancelled = job.cancelled
+            if cancelled:
+                return False, "Job cancelled by user"
+            if ready:
+                self._add_log(job_id, f"Resuming: {len(ready)} cloned repositories to analyze")
+            if not pipeline.run(rows, ready):
+                return False, f"Analysis failed: {failure[0] if failure else 'cancelled'}"
+        finally:
+            stopped, stop_message = self._stop_analysis_worker(worker, job_id)
+        if not stopped:
+            return False, f"Analysis failed: {stop_message}"
+        
+        progress = repo_cloner.async_cloner.progress
+        failed = progress.failed if progress else 0
+        return True, f"Pipeline completed: {pipeline.analyzed} repositories analyzed, {failed} clones failed"
+    
+    def _start_analysis_worker(self, job_id: str) -> Tuple[Optional[subprocess.Popen], set, str]:
+        """
+        Start the exec_analysis.py process that analyzes the batches of a pipeline job
+        
+        Args:
+            job_id: Job ID
+            
+        Returns:
+            Tuple of (process or None if it failed to start, "owner/repo" names already
+            analyzed in the output path, error message)
+        """
+        job = self.get_job(job_id)
+        cmd = [
+            sys.executable,
+            self.exec_analysis_path,
+            '--input_path', job.input_path,
+            '--output_path', job.output_path,
+            '--projects_from_stdin'
+        ]
+        if job.profile:
+            cmd.append('--profile')
+        try:
+            # stderr nello stesso flusso: un processo di lunga durata non deve bloccarsi su una pipe mai letta
+            process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
+        except Exception as e:
+            return None, set(), f"Error running analysis: {str(e)}"
+        
+        with self.lock:
+            job.process = process
+            if job.cancelled:
+                process.terminate()
+        
+        # Il worker riporta i progetti gia' nei risultati prima di accettare lotti
+        analyzed = set()
+        ready, output = self._read_worker_output(process, job_id, '[READY]', analyzed)
+        if not ready:
+            process.wait()
+            return None, set(), output
+        return process, analyzed, ''
+    
+    def _analyze_batch(self, worker: subprocess.Popen, job_id: str, projects: List[str]) -> Tuple[bool, str]:
+        """
+        Analyze a batch of cloned repositories in the analysis worker of a pipeline job
+        
+        Args:
+            worker: Process started by _start_analysis_worker
+            job_id: Job ID for logging
+            projects: "owner/repo" names to analyze
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        try:
+            worker.stdin.write(' '.join(projects) + '\n')
+            worker.stdin.flush()
+        except OSError:
+            pass  # worker terminato: l'errore e' nel suo output
+        done, output = self._read_worker_output(worker, job_id, '[BATCH DONE]')
+        if not done:
+            return False, output
+        return True, "Batch analyzed successfully"
+    
+    def _stop_analysis_worker(self, worker: subprocess.Popen, job_id: str) -> Tuple[bool, str]:
+        """
+        Close the input of the analysis worker and wait for it to write its metrics and exit
+        
+        Args:
+            worker: Process started by _start_analysis_worker
+            job_id: Job ID for logging
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        try:
+            worker.stdin.close()
+        except OSError:
+            pass
+        _, output = self._read_worker_output(worker, job_id, None)
+        worker.wait()
+        if worker.returncode != 0:
+            return False, output
+        return True, "Analysis completed successfully"
+    
+    def _read_worker_output(self, worker: subprocess.Popen, job_id: str, marker: Optional[str],
+                            analyzed: Optional[set] = None) -> Tuple[bool, str]:
+        """
+        Log the output lines of the analysis worker up to the next line starting with marker
+        
+        Args:
+            worker: Process started by _start_analysis_worker
+            job_id: Job ID for logging
+            marker: Protocol line to wait for (None reads up to the end of the output)
+            analyzed: Optional set collecting the names of the [ANALYZED] lines
+            
+        Returns:
+            Tuple of (whether the marker was found, last output lines as error message)
+        """
+        recent = deque(maxlen=20)
+        for line in worker.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            if marker is not None and line.startswith(marker):
+                return True, ''
+            if line.startswith('[ANALYZED] '):
+                if analyzed is not None:
+                    analyzed.add(line[len('[ANALYZED] '):])
+                continue
+            self._add_log(job_id, line)
+            recent.append(line)
+        return False, '\n'.join(recent) or "Analysis failed"
+    
     def _run_analysis(self, input_path: str, output_path: str, job_id: str) -> Tuple[bool, str]:
         """
         Run the MARK analysis
@@ -243,6 +512,9 @@ class AnalysisService:
                 '--input_path', input_path,
                 '--output_path', output_path
             ]
+            job = self.get_job(job_id)
+            if job and job.profile:
+                cmd.append('--profile')
             
             # Run the analysis
             process = subprocess.Popen(
@@ -259,6 +531,8 @@ class AnalysisService:
             if job:
                 with self.lock:
                     job.process = process
+                    if job.cancelled:
+                        process.terminate()
             
             # Read output in real-time
             progress_step = 50 / 100  # Remaining 50% progress divided by expected steps
@@ -306,6 +580,14 @@ class AnalysisService:
             return False, "Job is not running"
         
         try:
+            with self.lock:
+                job.cancelled = True
+                pipeline = job.pipeline_runner
+            
+            # Stop the clones of a pipeline job before its current analysis
+            if pipeline:
+                pipeline.stop()
+            
             # Terminate the process if it exists
             if job.process:
                 job.process.terminate()